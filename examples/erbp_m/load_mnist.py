@@ -86,47 +86,56 @@ def load_mnist(data_url, labels_url, n_samples=None, nc_perlabel=1, with_labels=
     data_vectors = np.concatenate([iv_seq, np.zeros([iv_seq.shape[0],labels_offset]), iv_label_seq], axis = 1)
     return data_vectors, iv_l_seq
 
-def SimSpikingStimulus(stim, time = 1000, t_sim = None, with_labels = True):
+def SimSpikingStimulus(stim, time = 1000, t_sim = None, with_labels = True, seed = None):
     '''
-    Times must be sorted. ex: times = [0, 1, 2] ; scale = [1,0]
-    *poisson*: integer, output is a poisson process with mean
-    data/poisson, scaled by *poisson*.
+    Rate coded stimulus: Poisson trains of rates
+    stim[t] during [t*time, (t+1)*time) for the data inputs, regular trains
+    with a random phase for the 10 label inputs (if *with_labels*).
+    Returns the external events (see pyNSATlib.stimuli).
+    t_sim unused
     '''
-    from pyNCSre import pyST
+    from pyNSATlib import stimuli
+    stim = np.array(stim, dtype='float')
     n = np.shape(stim)[1]
     nc = 10
-    stim[stim<=0] = 1e-5
-    SL = pyST.SpikeList(id_list = list(range(n)))
-    SLd = pyST.SpikeList(id_list = list(range(n-nc)))
-    SLc = pyST.SpikeList(id_list = list(range(n-nc,n)))
-    for i in range(n-nc):
-        SLd[i] = pyST.STCreate.inh_poisson_generator(stim[:,i],
-                                                    list(range(0,len(stim)*time,time)),
-                                                    t_stop=t_sim, refractory = 4.)
-    if with_labels:
-        for t in range(0,len(stim)):
-            SLt= pyST.SpikeList(id_list = list(range(n-nc,n)))
-            for i in range(n-nc,n):
-                if stim[t,i]>1e-2:
-                    SLt[i] = pyST.STCreate.regular_generator(stim[t,i],
-                                                        jitter=True,
-                                                        t_start=t*time,
-                                                        t_stop=(t+1)*time)            
-            if len(SLt.raw_data())>0: SLc = pyST.merge_spikelists(SLc, SLt)
-
-    if len(SLc.raw_data())>0: 
-        SL = pyST.merge_spikelists(SLd,SLc)
-    else:
-        SL = SLd
-    return SL
+    if not with_labels:
+        stim[:, n-nc:] = 0
+    chunks = stimuli.poisson_trains(stim, time, regular = np.arange(n-nc, n),
+                                    seed = seed)
+    return stimuli.to_ext_events(chunks)
 
-def create_spike_train(data_train, t_sample, scaling=1, n_mult=1, with_labels = True): 
+def create_spike_train(data_train, t_sample, scaling=1, n_mult=1, with_labels = True, seed = None): 
     data_train = np.array(data_train)
-    N_train = len(data_train)
     data = np.concatenate([data_train for _ in range(n_mult)])
-    t_sim = len(data)*t_sample*n_mult
-    return SimSpikingStimulus(scaling*data, t_sample, t_sim = t_sim, with_labels = with_labels)
+    return SimSpikingStimulus(scaling*data, t_sample, with_labels = with_labels, seed = seed)
+
+def load_mnist_images(data_url):
+    '''
+    Maps the images of an MNIST idx3 file as a uint8 np.memmap of shape
+    (Nimages, dimx*dimy), without reading them. The engine maps the same
+    file when it is passed to ConfigurationNSAT.set_ext_dataset.
+    '''
+    with open(data_url, 'rb') as f_image:
+        m, Nimages, dimx, dimy = np.frombuffer(f_image.read(16), dtype='>i4')
+    return np.memmap(data_url, dtype='uint8', mode='r', offset=16,
+                     shape=(Nimages, dimx*dimy))
 
+def set_dataset_stimulus(cfg, data, t_sample, scaling=1, n_mult=1, with_labels = True, core = 0, regular = False):
+    '''
+    Rate coded stimulus read by the engine from the dataset: the inputs of
+    *core* fire at rates scaling*data[t] during [t*t_sample, (t+1)*t_sample),
+    as with create_spike_train, without generating the events. *data* are
+    load_mnist vectors (or uint8 images, scaling is then the rate of 255).
+    The rows are presented n_mult times. The 10 label inputs are silenced
+    if not *with_labels*.
+    '''
+    from pyNSATlib import stimuli
+    if not with_labels:
+        data = np.array(data)
+        data[:, -10:] = 0
+    idx = np.tile(np.arange(len(data)), n_mult)
+    cfg.set_ext_dataset(data, stimuli.sample_schedule(idx, t_sample),
+                        core = core, max_rate = scaling, regular = regular)
 
 
 data_train, targets_train = load_mnist(
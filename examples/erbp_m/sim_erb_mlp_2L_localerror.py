@@ -191,13 +191,12 @@ for i in range(setup.ncores):
 #data_classify = data_train
 #targets_classify = targets_train
 
-SL_train = create_spike_train(data_train[:N_train], t_sample_train, scaling = inp_fact, with_labels = True)
-ext_evts_data_train = nsat.exportAER(SL_train)
+ext_evts_data_train = create_spike_train(data_train[:N_train], t_sample_train, scaling = inp_fact, with_labels = True)
 
-SL_test = create_spike_train(data_classify[:N_test], t_sample_test, scaling = inp_fact, with_labels = False)
-ext_evts_data_test = nsat.exportAER(SL_test)
+# Test samples run independently, read by the engine from the dataset
+set_dataset_stimulus(cfg_test, data_classify[:N_test], t_sample_test, scaling = inp_fact, with_labels = False)
+cfg_test.set_inference()
 
-cfg_test.set_ext_events(ext_evts_data_test)
 cfg_train.set_ext_events(ext_evts_data_train)
 
 print("################## Writing Parameters Files ##################")
@@ -238,7 +237,7 @@ if __name__ == '__main__':
         if test_every>0:
             if i%test_every == test_every-1:
                 nsat.run_c_nsat(fname_test)
-                acc, slout = test_accuracy(
+                acc = test_accuracy(
                         c_nsat_reader_test,
                         targets = targets_classify[:N_test],
                         pop = pop_out1,
@@ -247,7 +246,7 @@ if __name__ == '__main__':
 
                 pip.append([i, acc])
 
-                acc, slout = test_accuracy(
+                acc = test_accuracy(
                         c_nsat_reader_test,
                         targets = targets_classify[:N_test],
                         pop = pop_out2,
@@ -256,7 +255,7 @@ if __name__ == '__main__':
 
                 pip.append([i, acc])
 
-                acc, slout = test_accuracy(
+                acc = test_accuracy(
                         c_nsat_reader_test,
                         targets = targets_classify[:N_test],
                         pop = pop_out3,
@@ -265,7 +264,7 @@ if __name__ == '__main__':
 
                 pip.append([i, acc])
 
-                acc, slout = test_accuracy(
+                acc = test_accuracy(
                         c_nsat_reader_test,
                         targets = targets_classify[:N_test],
                         pop = pop_out4,
@@ -14,9 +14,15 @@ def test_accuracy(reader, targets, pop, sim_ticks, duration):
     import pyNSATlib as nsat
     import numpy as np
     N_samples = len(targets)
-    SL = reader.read_spikelist(sim_ticks = sim_ticks, id_list = pop.addr, core = pop.core).id_slice(pop.addr)
-    pred = np.argmax(SL.firing_rate(duration),axis=0)
+    if reader.cfg.spk_count_window == duration or \
+            reader.cfg.inference_workers > 0:
+        # Per sample spike counts accumulated by the simulator
+        counts = reader.read_spike_counts(core = pop.core, id_list = pop.addr)
+        pred = np.argmax(counts, axis=1)
+    else:
+        SL = reader.read_spikelist(sim_ticks = sim_ticks, id_list = pop.addr, core = pop.core).id_slice(pop.addr)
+        pred = np.argmax(SL.firing_rate(duration),axis=0)
     assert len(pred) == N_samples
-    return float(sum( pred == targets[:N_samples]))/N_samples*100, SL
+    return float(sum( pred == targets[:N_samples]))/N_samples*100
 
 
@@ -74,9 +74,11 @@ list_id *alloc_list_id(void);
 void push_spk(list_spk **, unsigned long long, unsigned long long);
 void push_back_spk(list_spk **, unsigned long long);
 void push_syn(list_syn **, unsigned long long, WTYPE *);
+void push_syn_node(list_syn **, syn_list_node *, unsigned long long, WTYPE *);
 void push_id(list_id **, unsigned long long);
 void destroy_list_spk(list_spk **);
 void destroy_list_syn(list_syn **);
+void detach_list_syn(list_syn **);
 void destroy_list_id(list_id **);
 void print_list_spk(list_spk *);
 void print_list_syn(list_syn *);
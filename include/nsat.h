@@ -34,6 +34,8 @@
 #include <fcntl.h>
 #include <time.h>
 #include <inttypes.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
 
 #include <pthread.h>
 
@@ -71,6 +73,38 @@
 
 #define DAVIS 0
 
+/* Compact synaptic pointer table format */
+#define PTR_TABLE_MAGIC "NSPT"
+#define PTR_TABLE_VERSION 1
+
+/* Default number of spike events per chunk written to disk */
+#define SPK_CHUNK_SIZE 65536
+
+/* Spike events file formats */
+#define SPK_FORMAT_LEGACY 0             /* All ids then all times (uint64) */
+#define SPK_FORMAT_COMPACT 1            /* Per-tick uint32 ids */
+#define SPK_FORMAT_BITMAP 2             /* Compact, bitmaps for busy ticks */
+#define SPK_EVENTS_MAGIC "NSEV"
+#define SPK_EVENTS_VERSION 2
+#define SPK_BITMAP_FLAG 0x80000000u
+
+/* Profiled phases of a tick (see update_profile) */
+#define PROF_EXT_INGEST 0               /* External events and sources */
+#define PROF_INTEGRATE 1
+#define PROF_SPIKE_DETECTION 2          /* Refractory period and spikes */
+#define PROF_BARRIER_WAIT 3
+#define PROF_ROUTING 4
+#define PROF_ACCUMULATION 5
+#define PROF_STDP 6
+#define PROF_RESET 7
+#define PROF_MONITOR_IO 8
+#define PROF_NUM_PHASES 9
+
+/* Default and maximum numbers of traced phases kept per core (32 bytes
+ * per phase) */
+#define TRACE_SIZE 65536
+#define TRACE_SIZE_MAX 4194304
+
 #define ANSI_COLOR_RED     "\x1b[31m"
 #define ANSI_COLOR_GREEN   "\x1b[32m"
 #define ANSI_COLOR_YELLOW  "\x1b[33m"
@@ -134,6 +168,15 @@ struct global_pms_s {
     bool is_bm_rng_on;
     bool is_clock_on;
     bool is_check_wlim_on;
+    unsigned long long spk_chunk_size;
+    unsigned int spk_format;
+    unsigned int num_workers;           /* Sample-parallel inference (0 is off) */
+    unsigned int decision_core;         /* Core of the decision neurons */
+    unsigned long long decision_lead;   /* Stop when the first leads by (0 is off) */
+    unsigned long long decision_count;  /* Stop when the first reaches (0 is off) */
+    bool is_profile_on;                 /* Per-phase wall-clock counters */
+    unsigned long long trace_stride;    /* Traced ticks period (0 is off) */
+    unsigned long long trace_size;      /* Traced phases kept per core */
 } __attribute__ ((aligned));
 typedef struct global_pms_s global_params;
 
@@ -153,6 +196,10 @@ struct cores_params_s {
     bool is_learning_on;
     bool is_ext_evts_on;
     bool is_learning_gated;
+    bool is_rate_src_on;
+    bool is_data_src_on;
+    int replica_of;                     /* Replicated core (-1 is none) */
+    bool is_wgt_copy_on;                /* Replica owns a copy of the weights */
 } __attribute__ ((aligned));
 typedef struct cores_params_s cores_params;
 
@@ -165,6 +212,12 @@ struct monitors_params_s {
     bool mon_final_weights;
     bool mon_spikes; 
     bool mon_stats; 
+    unsigned int num_rec_states;        /* Number of recorded states */
+    unsigned int *rec_states;           /* Recorded state components */
+    unsigned long long rec_stride;      /* Record states every stride stamps */
+    unsigned long long count_window;    /* Spike counts window (0 is off) */
+    unsigned long long num_count_ids;   /* Number of counted neurons */
+    unsigned long long *count_ids;      /* Counted neurons */
 } __attribute__ ((aligned));
 typedef struct monitors_params_s monitors_params;
 
@@ -228,19 +281,121 @@ typedef struct fname_s {
     char *stats_ext;
     char *l1_conn;
     char *shared_mem;
+    char *spk_counts;
+    char *ext_rates;
+    char *ext_dataset;
+    char *decisions;
+    char *profile;
+    char *trace;
 } fnames;
 
 
 /* Monitor files pointers struct */
+/* Synaptic weights monitor record (time, pre, post, state, weight) */
+typedef struct syn_mon_record_s {
+    uint64_t time;
+    uint64_t pre;
+    uint64_t post;
+    uint32_t state;
+    WTYPE w;
+} syn_mon_record;
+
+
 typedef struct mon_files_s {
     FILE *fs;
     FILE *fw;
     FILE *fsa;
     FILE *fr;
     FILE *event_file;
+    STATETYPE *states_buf;              /* One state monitor record */
+    unsigned long long *rec_ids;        /* Neurons in the state monitor */
+    unsigned long long num_rec_ids;
+    syn_mon_record *syn_buf;            /* One weights monitor snapshot */
+    WTYPE **syn_w_ptrs;                 /* Monitored weights */
+    unsigned long long num_syn_mon;
+    FILE *fc;
+    uint32_t *counts;                   /* Spike counts of current window */
+    long long *count_slot;              /* Neuron to counts index (or -1) */
 } mon_files;
 
 
+/* Spike events stream, one per core. Recorded spikes are handed over in
+ * chunks to a writer thread. They are written to a partial file, renamed
+ * to the events file once complete. In the legacy format ids go to the
+ * partial file and times to a temporary file which is appended at the end. The
+ * compact formats are written as a header followed by one record per
+ * tick: uint32 time delta, uint32 count (SPK_BITMAP_FLAG set for a bitmap)
+ * and the uint32 neuron ids or bitmap words, and end with the index of the
+ * records (uint64 offset of each record, in uint32 words). */
+typedef struct spk_stream_s {
+    FILE *fp;                           /* Partial events file (ids) */
+    FILE *ft;                           /* Temporary times file (legacy) */
+    uint32_t *words;                    /* One compact tick record */
+    char *fname;
+    char *part_fname;                   /* Events file until complete */
+    char *tmp_fname;
+    unsigned long long *ids;            /* Chunk owned by the writer */
+    unsigned long long *times;
+    unsigned long long length;
+    unsigned long long total;
+    unsigned long long num_records;     /* Compact tick records */
+    unsigned long long num_words;       /* Compact words written so far */
+    uint64_t *offsets;                  /* Offsets of the tick records */
+    unsigned long long offsets_size;
+    unsigned long long last_time;
+    unsigned long long num_neurons;
+    unsigned int format;
+    bool is_pending;
+    bool is_done;
+    pthread_t writer;
+    pthread_mutex_t lock;
+    pthread_cond_t cond;
+} spk_stream;
+
+
+/* Rate coded Poisson input sources, one per core. The rates file holds
+ * a header (uint64 t_start, t_sample, number of windows, number of inputs)
+ * followed by one row per sample window of uint32 spike thresholds
+ * (probability per tick * 2^32), one per input. Rows are loaded as the
+ * windows advance and the inputs spike when the core's RNG draws below
+ * their threshold. */
+typedef struct rate_src_s {
+    FILE *fp;
+    uint32_t *thr;                      /* Thresholds of the loaded window */
+    unsigned long long t_start;
+    unsigned long long t_sample;
+    unsigned long long num_windows;
+    unsigned long long num_inputs;
+    unsigned long long window;          /* Loaded window */
+    pcg32_random_t rng;
+} rate_src;
+
+
+/* Dataset input sources, one per core. The dataset file (one row of
+ * uint8 intensities per sample, one column per input) is memory mapped and
+ * a schedule of (sample index, start tick, duration) entries selects the
+ * row presented to the inputs. The intensities are mapped to spike
+ * thresholds through a lookup table and the inputs spike either when the
+ * core's RNG draws below their threshold (Poisson) or when their phase
+ * accumulator overflows (regular). */
+typedef struct data_src_s {
+    unsigned char *map;                 /* Mapped dataset file */
+    size_t map_size;
+    unsigned char *data;                /* First row of the dataset */
+    unsigned long long num_rows;
+    unsigned long long num_inputs;
+    unsigned long long num_entries;
+    unsigned long long *schedule;       /* (index, t_start, duration) */
+    unsigned long long entry;           /* Next schedule entry */
+    unsigned long long t_end;           /* End of the presented sample */
+    uint32_t lut[256];                  /* Intensity to threshold */
+    uint32_t *thr;                      /* Thresholds of the sample */
+    uint32_t *phase;                    /* Regular mode accumulators */
+    bool is_regular;
+    pcg32_random_t rng;
+} data_src;
+
+
 /* Temporary cores' variables */
 struct core_vars_s {
     STATETYPE *tX;
@@ -252,6 +407,36 @@ struct core_vars_s {
 typedef struct core_vars_s core_vars;
 
 
+/* Phase of a traced tick */
+typedef struct trace_event_s {
+    uint64_t tick;
+    uint64_t start_ns;
+    uint64_t end_ns;
+    unsigned int phase;
+} trace_event;
+
+
+/* Profile of a core, wall-clock time per tick phase and work counters */
+typedef struct core_profile_s {
+    uint64_t phase_ns[PROF_NUM_PHASES]; /* Time per phase (ns) */
+    uint64_t syn_events;                /* Accumulated synaptic events */
+    uint64_t wgt_updates;               /* STDP weight updates */
+    uint64_t last_ns;                   /* End of the last phase */
+    trace_event *trace;                 /* Ring buffer, NULL unless tracing */
+    uint64_t trace_count;               /* Traced phases (the last are kept) */
+} core_profile;
+
+
+/* Simulation context struct, the state shared by the threads of one
+ * simulation (several simulations can run in the same process) */
+typedef struct nsat_context_s {
+    pthread_mutex_t lock;               /* Routing lock */
+    pthread_barrier_t barrier;          /* Cores' ticks barrier */
+    pcg32_random_t rng;                 /* Cores' RNG */
+    uint64_t t0_ns;                     /* Start of the simulation */
+} nsat_context;
+
+
 /* NSAT core struct */
 struct nsat_core_s {
     cores_params core_pms;
@@ -267,19 +452,60 @@ struct nsat_core_s {
     array_list *nsat_events;
     array_list *trans_events;
     array_list *mon_events;
+    spk_stream *spk_stream;
+    rate_src *rate_src;
+    data_src *data_src;
     array_list *nsat_caspk;
     array_list *ext_caspk;
     global_params *g_pms;
+    nsat_context *ctx;
     core_vars *vars;
     WTYPE *shared_memory;
+    syn_list_node *syn_pool;
     unsigned int core_id;
     unsigned long long curr_time;
     size_t sm_size;
     char *ext_evts_fname;
+    pcg32_random_t rng;                 /* Replica's RNG */
+    core_profile *prof;                 /* NULL unless profiling or tracing */
 } __attribute__ ((aligned));
 typedef struct nsat_core_s nsat_core;
 
 
+/* A replica of a core shares its synapses lists, its inputs (external
+ * events, rate coded and dataset sources) and, unless it owns a copy, its
+ * synaptic weights. It has its own parameters groups, states and RNG. */
+#define is_replica(core) ((core).core_pms.replica_of >= 0)
+#define base_core_id(core) (is_replica(core) ? \
+                            (unsigned int) (core).core_pms.replica_of : \
+                            (core).core_id)
+#define is_sharing_synapses(core) (is_replica(core) && \
+                                   !(core).core_pms.is_wgt_copy_on)
+
+
+/* A tick starts with profile_tick, then the phases are closed in the order
+ * of the tick, the time since the end of the previous phase is charged to
+ * the phase */
+#define profile_tick(core) {if ((core)->prof != NULL) { \
+                            start_profile(core); }}
+#define profile_phase(core, phase) {if ((core)->prof != NULL) { \
+                                    update_profile(core, phase); }}
+#define profile_count(core, counter, n) {if ((core)->prof != NULL) { \
+                                         (core)->prof->counter += (n); }}
+
+
+/* Sample-parallel inference worker struct */
+typedef struct nsat_worker_s {
+    nsat_core *cores;                   /* Shared cores */
+    unsigned int num_cores;
+    unsigned long long num_samples;
+    unsigned long long *next_sample;    /* Next sample to run (shared) */
+    pthread_mutex_t *lock;
+    uint32_t **counts;                  /* Spike counts per core */
+    unsigned long long *decisions;      /* Decision tick per sample */
+} nsat_worker;
+
+
 
 /********************************************************************/
 /*  Functions declarations 
@@ -298,7 +524,10 @@ void store_fpga_states(nsat_core *);
 void update_state_monitor_file(nsat_core *);
 void update_monitor_stats(int, int, int, int, FILE *, int, bool);
 void update_state_monitor_online(nsat_core *);
+bool is_state_monitor_tick(nsat_core *, int);
+void update_spike_count_monitor(nsat_core *);
 void update_synaptic_strength_monitor_file(nsat_core *);
+void index_synaptic_strength_monitor(nsat_core *);
 void update_monitor_next_state(int *, FILE *, int, int);
 void open_online_spike_monitor(nsat_core **, fnames *);
 
@@ -320,11 +549,29 @@ void get_external_events(FILE *, nsat_core **, unsigned long long,
                          unsigned int);
 void get_external_events_per_core(FILE *, nsat_core **, unsigned long long);
 void get_davis_events(int fd, nsat_core **cores);
+void open_rate_sources(fnames *, nsat_core *, int);
+void get_rate_source_events(nsat_core *, unsigned long long);
+void close_rate_sources(nsat_core *, int);
+void open_dataset_sources(fnames *, nsat_core *, int);
+void get_dataset_source_events(nsat_core *, unsigned long long);
+void close_dataset_sources(nsat_core *, int);
+void open_spikes_streams(fnames *, nsat_core *, int);
+void stream_spikes_events(nsat_core *);
 void write_spikes_events(fnames *, nsat_core *, int);
 void write_final_weights(fnames *, nsat_core *, unsigned int);
 void write_shared_memories(fnames *, nsat_core *, int);
 void write_spikes_events_online(nsat_core *);
 void write_spike_statistics(fnames *, nsat_core *, int);
+void remove_stale_output(char *);
+
+
+/* Profiling functions declarations */
+uint64_t monotonic_ns(void);
+void open_profiles(nsat_core *, unsigned int);
+void start_profile(nsat_core *);
+void update_profile(nsat_core *, unsigned int);
+void write_profiles(fnames *, nsat_core *, unsigned int);
+void write_traces(fnames *, nsat_core *, unsigned int);
 
 
 /* Read/Load parameters functions declarations */
@@ -342,6 +589,7 @@ void initialize_cores_neurons(nsat_core **, unsigned int);
 void initialize_monitor_spk(char *, unit **);
 void initialize_cores_connections(char *, nsat_core *);
 void initialize_incores_connections(fnames *, nsat_core **, unsigned int);
+void initialize_replicas(fnames *, nsat_core *, unsigned int);
 
 
 /* Cleanup functions declarations */
@@ -383,6 +631,9 @@ int iterate_nsat(fnames *);
 int iterate_nsat_new(fnames *);
 int iterate_nsat_old(fnames *);
 
+/* Sample-parallel inference functions declarations */
+void run_inference(fnames *, nsat_core *, global_params *);
+
 /* Core NSAT functions declarations */
 void refractory_period(STATETYPE **, unit *, unsigned long long, unsigned int);
 void state_reset(STATETYPE **, unit *, array_list *, unsigned int);
@@ -394,15 +645,18 @@ void integrate_nsat(STATETYPE **, STATETYPE *, unit *, unsigned long long,
                     unsigned int);
 void expand_spike_list(unit *, array_list *, array_list **, unsigned long long,
                        unsigned long long, int);        
-void accumulate_synaptic_events(STATETYPE **, unit *, unit *, array_list *,
-                                unsigned int, unsigned int, unsigned long long);
+unsigned long long accumulate_synaptic_events(STATETYPE **, unit *, unit *,
+                                              array_list *, unsigned int,
+                                              unsigned int, unsigned long long);
 void spike_events(STATETYPE *, unit *, array_list *, array_list *, array_list *,
                   array_list *, unsigned long long, unsigned long long,
                   unsigned int, unsigned int);
-void causal_stdp(unit *, unit *, STATETYPE *, STATETYPE *, array_list *,
-                 unsigned long long, unsigned int, int, bool, bool);
-void acausal_stdp(unit *, unit *, STATETYPE *, array_list *, unsigned long long,
-                  unsigned int, int, bool, bool);
+unsigned long long causal_stdp(unit *, unit *, STATETYPE *, STATETYPE *,
+                               array_list *, unsigned long long, unsigned int,
+                               int, bool, bool);
+unsigned long long acausal_stdp(unit *, unit *, STATETYPE *, array_list *,
+                                unsigned long long, unsigned int, int, bool,
+                                bool);
 
 
 /********************************************************************/
@@ -47,5 +47,6 @@ inline int sign(int x) {
 
 /* normal distribution function - For more details see nsat_math.c */
 double normal(double, double);
+void normal_reset(void);
 
 #endif /* NSAT_MATH_H */
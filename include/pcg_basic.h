@@ -71,6 +71,11 @@ uint32_t pcg32_random_r(pcg32_random_t* rng);
 uint32_t pcg32_boundedrand(uint32_t bound);
 uint32_t pcg32_boundedrand_r(pcg32_random_t* rng, uint32_t bound);
 
+// pcg32_thread_rng(rng)
+//     Use rng for the global RNG functions called by the current thread
+
+void pcg32_thread_rng(pcg32_random_t* rng);
+
 #if __cplusplus
 }
 #endif
@@ -13,7 +13,6 @@
 # ---------------------------------------------------------------------------
 import os
 import numpy as np
-from pyNCSre import pyST
 from .global_vars import *
 import copy
 
@@ -31,25 +30,59 @@ def find_nsat_library():
                         directory to LD_LIBRARY_PATH')
 
 
-def run_c_nsat(fname):
-    from ctypes import POINTER, cdll, c_int
-    from .nsat_writer import c_nsat_fnames
+# NSAT library and thread pool of the process, created on first use
+_nsat = None
+_nsat_executor = None
+
+
+def load_nsat_library():
+    '''
+    Loads the NSAT library (see find_nsat_library) and declares the
+    arguments of its functions, once per process.
+    *outputs*: ctypes handle of libnsat.so
+    '''
+    global _nsat
+    if _nsat is None:
+        from ctypes import POINTER, cdll, c_int
+        from .nsat_writer import c_nsat_fnames
 
-    _nsat = cdll.LoadLibrary(find_nsat_library())
+        lib = cdll.LoadLibrary(find_nsat_library())
+        lib.iterate_nsat.argtypes = (POINTER(c_nsat_fnames),)
+        lib.iterate_nsat.restype = c_int
+        _nsat = lib
+    return _nsat
 
-    # handle = _nsat._handle
-    _nsat.iterate_nsat.argtypes = (POINTER(c_nsat_fnames),)
-    _nsat.iterate_nsat.restype = c_int
 
-    flag = _nsat.iterate_nsat(fname)
+def run_c_nsat(fname):
+    flag = load_nsat_library().iterate_nsat(fname)
     return flag
 
 
+def run_c_nsat_async(fname, executor=None):
+    '''
+    Runs a simulation in a thread, so that independent simulations run
+    concurrently in one process (the library releases the GIL). Each
+    simulation must be written in its own files (path or prefix).
+    *fname*: file names of the simulation (C_NSATWriter.fname)
+    *executor*: concurrent.futures executor of the simulation. By default,
+    a thread pool shared by the process.
+    *outputs*: concurrent.futures.Future of the flag returned by run_c_nsat
+    '''
+    global _nsat_executor
+    if executor is None:
+        if _nsat_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _nsat_executor = ThreadPoolExecutor()
+        executor = _nsat_executor
+    return executor.submit(run_c_nsat, fname)
+
+
 def build_SpikeList(evs_time,
                     evs_addr,
                     dt=1e-3,
                     id_list=None,
-                    sim_ticks=None):
+                    sim_ticks=None,
+                    spike_array=False):
     '''
     build a pyST spikelist. pyST is a submodule of pyNCSre
     (https://github.com/nmi-lab/pyNCS)
@@ -60,13 +93,18 @@ def build_SpikeList(evs_time,
     *dt*: scaling of timesteps (default is ms)
     *id_list*: list of neuron ids (optional). If no id_list is provided,
     neurons that have never spikes will not be represented explicitely.
+    *spike_array*: return a numpy backed SpikeArray instead
 
     outputs:
     pyST.SpikeList object
     '''
-    from pyNCSre.pyST.spikes import SpikeList
     evs_time = np.array(evs_time) / dt * 1e-3
-    SL = SpikeList(list(zip(evs_addr, evs_time)), np.unique(evs_addr))
+    if spike_array:
+        from .spikes import SpikeArray
+        return SpikeArray(evs_time, evs_addr, t_start=0, t_stop=sim_ticks)
+    from pyNCSre.pyST.spikes import SpikeList
+    SL = SpikeList(np.column_stack([evs_addr, evs_time]).astype('float'),
+                   np.unique(evs_addr))
     SL.t_start = 0
     if sim_ticks is not None:
         SL.t_stop = sim_ticks
@@ -85,16 +123,70 @@ def _extract_submatrix(matrix,
     return matrix[start_row:end_row, start_col:end_col]
 
 
-class multicoreEvents(pyST.channelEvents):
+# External events as plain numpy records (see ConfigurationNSAT.set_ext_events)
+EXT_EVENTS_DTYPE = np.dtype([('time', '<u8'),
+                             ('core', '<u4'),
+                             ('addr', '<u8')])
+
+
+def ext_events_array(events):
+    '''
+    Converts external events to a structured array of EXT_EVENTS_DTYPE.
+    *events*: structured array with fields time, core and addr, or an array
+    of shape (n, 3) with columns (time, core, addr)
+    '''
+    events = np.asarray(events)
+    out = np.empty(len(events), dtype=EXT_EVENTS_DTYPE)
+    if events.dtype.names is not None:
+        for f in EXT_EVENTS_DTYPE.names:
+            out[f] = events[f]
+    else:
+        events = events.reshape(-1, 3)
+        out['time'], out['core'], out['addr'] = events.T
+    return out
+
+
+def _inference_inputs_error(inputs):
+    '''
+    Returns the ValueError of the inputs that the inference mode (see
+    ConfigurationNSAT.set_inference) does not support.
+    '''
+    return ValueError('{0} are not supported in inference mode, see '
+                      'set_ext_dataset'.format(inputs))
+
+
+def _multicore_events():
+    '''
+    Returns the multicoreEvents class. It derives from pyST.channelEvents,
+    so it is defined on first use to keep pyST out of the import of
+    pyNSATlib.
+    '''
+    if 'multicoreEvents' in globals():
+        return globals()['multicoreEvents']
+    from pyNCSre import pyST
+
+    class multicoreEvents(pyST.channelEvents):
+
+        def flatten(self):
+            ev = pyST.events(atype=self.atype)
+            for ch in self:
+                ads = self[ch].get_ad() + (ch << CHANNEL_OFFSET)
+                tms = self[ch].get_tm()
+                ev.add_adtm(ads, tms)
+            ev.sort_tm()
+            return ev
+
+    multicoreEvents.__qualname__ = 'multicoreEvents'
+    multicoreEvents.__module__ = __name__
+    globals()['multicoreEvents'] = multicoreEvents
+    return multicoreEvents
 
-    def flatten(self):
-        ev = pyST.events(atype=self.atype)
-        for ch in self:
-            ads = self[ch].get_ad() + (ch << CHANNEL_OFFSET)
-            tms = self[ch].get_tm()
-            ev.add_adtm(ads, tms)
-        ev.sort_tm()
-        return ev
+
+def __getattr__(name):
+    if name == 'multicoreEvents':
+        return _multicore_events()
+    raise AttributeError('module {} has no attribute {}'.format(__name__,
+                                                                name))
 
 
 def exportAER(spikeLists,
@@ -111,9 +203,10 @@ def exportAER(spikeLists,
     Modified from pyNCS.pyST.exportAER
     '''
 
+    from pyNCSre import pyST
     assert format in ['t', 'a'], 'Format must be "a" or "t"'
 
-    ev = multicoreEvents(atype='Physical')
+    ev = _multicore_events()(atype='Physical')
 
     # Translate logical addresses to physical using a mapping
 
@@ -151,7 +244,7 @@ def exportAER(spikeLists,
     return ev
 
 
-def importAER(nsat_events, id_list=None, sim_ticks=None):
+def importAER(nsat_events, id_list=None, sim_ticks=None, spike_array=False):
     '''
     Read NSAT events output.
     *nsat_events*: events output of NSAT. expects a single dimensional
@@ -160,12 +253,16 @@ def importAER(nsat_events, id_list=None, sim_ticks=None):
     the nsat_events will be used
     *sim_ticks*: duration of nsat_events. If none is provided, the largest
     timestamp will be used
+    *spike_array*: return a numpy backed SpikeArray instead of a SpikeList
     '''
-    from pyNCSre.pyST import events
-    tm, ad = events(nsat_events.reshape(-1, 2)).get_tmad()
+    if spike_array:
+        ad, tm = np.asarray(nsat_events).reshape(-1, 2).T
+    else:
+        from pyNCSre.pyST import events
+        tm, ad = events(nsat_events.reshape(-1, 2)).get_tmad()
     if sim_ticks is None:
         sim_ticks = tm[-1]
-    SL = build_SpikeList(tm, ad, sim_ticks=sim_ticks)
+    SL = build_SpikeList(tm, ad, sim_ticks=sim_ticks, spike_array=spike_array)
     if id_list is not None:
         SL.complete(id_list)
     return SL
@@ -362,9 +459,9 @@ def check_weight_matrix(wgt_table, ptr_table, n_states, n_units):
 
     if ptr_table is None:
         from scipy.sparse import csr_matrix
-        ptr_table = csr_matrix([n_units,
+        ptr_table = csr_matrix((n_units,
                                 n_units *
-                                n_states],
+                                n_states),
                                dtype='uint64')
     return wgt_table, ptr_table
 
@@ -413,6 +510,10 @@ def process_Xresets(core_cfg):
 
 
 class ConfigurationNSAT(object):
+    # Parameters that replicas share with their core (see add_replicas)
+    REPLICA_SHARED_PARAMETERS = ['ptr_table', 'wgt_table', 'n_states',
+                                 'n_neurons', 'n_inputs', 'n_groups',
+                                 'n_lrngroups']
     PKL_MEMBERS = ['monitor_weights_final',
                    'seed',
                    'core_cfgs',
@@ -437,11 +538,39 @@ class ConfigurationNSAT(object):
                    'check_flag',
                    'is_bm_rng_on',
                    'monitor_weights',
-                   'plasticity_en']
+                   'plasticity_en',
+                   'states_rec_mon',
+                   'states_rec_stride',
+                   'spk_chunk_size',
+                   'spk_format',
+                   'spk_count_window',
+                   'spk_count_mon',
+                   'inference_workers',
+                   'decision_core',
+                   'decision_lead',
+                   'decision_count',
+                   'replicas',
+                   'is_profile_on',
+                   'trace_stride',
+                   'trace_size']
 
     def __getstate__(self):
         return {s: self.__dict__[s] for s in self.PKL_MEMBERS}
 
+    def __setstate__(self, state):
+        # Members that are not pickled, or missing from older pickles
+        self.ext_rates = {}
+        self.ext_dataset = {}
+        self.inference_workers = 0
+        self.decision_core = 0
+        self.decision_lead = 0
+        self.decision_count = 0
+        self.replicas = {}
+        self.is_profile_on = False
+        self.trace_stride = 0
+        self.trace_size = TRACE_SIZE
+        self.__dict__.update(state)
+
     def __init__(self,
                  sim_ticks=1000,
                  rec_deltat=1,
@@ -464,7 +593,14 @@ class ConfigurationNSAT(object):
                  w_check=True,
                  ben_clock=False,
                  plasticity_en=np.array([False], 'bool'),
-                 gated_learning=np.array([False], 'bool')):
+                 gated_learning=np.array([False], 'bool'),
+                 states_rec_mon=None,
+                 states_rec_stride=None,
+                 spk_chunk_size=SPK_CHUNK_SIZE,
+                 spk_format='legacy',
+                 spk_count_window=0,
+                 spk_count_mon=None,
+                 profile=False):
         self.groups_set = False
         self.sim_ticks = sim_ticks
         self.rec_deltat = rec_deltat  # timestep for the monitors (deltat)
@@ -514,6 +650,19 @@ class ConfigurationNSAT(object):
         self.s_seq = s_seq
         self.w_boundary = w_boundary
         self.w_check = w_check
+        # Number of recorded spikes buffered before they are written out
+        self.spk_chunk_size = spk_chunk_size
+        # Spike events file format, one of SPK_FORMATS
+        assert spk_format in SPK_FORMATS, "Unknown spike events format"
+        self.spk_format = spk_format
+        # Sample-parallel inference workers (0 runs a single simulation)
+        self.inference_workers = 0
+        # Stopping rule of the inference samples (see set_stopping_rule)
+        self.decision_core = 0
+        self.decision_lead = 0
+        self.decision_count = 0
+        # Replicas of cores, replica id: (core id, own weights)
+        self.replicas = {}
 
         self.check_flag = False
 
@@ -525,10 +674,21 @@ class ConfigurationNSAT(object):
 
         self.is_clock_on = ben_clock
         self.is_bm_rng_on = bm_rng
+        # Per-phase wall-clock counters (see C_NSATReader.read_profile)
+        self.is_profile_on = profile
+        # Timeline of the ticks phases (see set_trace)
+        self.trace_stride = 0
+        self.trace_size = TRACE_SIZE
 
         self.init_default_corecfgs(N_STATES, N_NEURONS, N_INPUTS)
+        # Rate coded input sources, one entry per core (see set_ext_rates)
+        self.ext_rates = {}
+        # Dataset input sources, one entry per core (see set_ext_dataset)
+        self.ext_dataset = {}
         self.set_ext_events()
         self.set_default_monitors(spk_rec_mon, syn_ids_rec)
+        self.set_state_monitors(states_rec_mon, states_rec_stride)
+        self.set_spike_count_monitors(spk_count_window, spk_count_mon)
 
     def __getitem__(self, k):
         return self.core_cfgs[k]
@@ -556,6 +716,59 @@ class ConfigurationNSAT(object):
 
         self.num_syn_ids_rec = [np.shape(s)[0] for s in self.syn_ids_rec]
 
+    def set_state_monitors(self, states_rec_mon=None, states_rec_stride=None):
+        '''
+        Per core selection of the state monitor contents.
+        *states_rec_mon*: list of state components recorded per core (None
+        records all of them), e.g. [[0]] records only the first state.
+        *states_rec_stride*: per core number of rec_deltat periods between
+        two state records.
+        '''
+        if states_rec_mon is None:
+            states_rec_mon = [None for _ in range(self.N_CORES)]
+        self.states_rec_mon = [None if s is None else np.array(s, 'int')
+                               for s in states_rec_mon]
+        if states_rec_stride is None:
+            states_rec_stride = [1 for _ in range(self.N_CORES)]
+        self.states_rec_stride = np.array(states_rec_stride, 'int')
+
+    def get_states_rec_mon(self, p):
+        '''
+        Returns the state components recorded by the state monitor of core *p*.
+        '''
+        if self.states_rec_mon[p] is None:
+            return np.arange(self.core_cfgs[p].n_states, dtype='int')
+        return self.states_rec_mon[p]
+
+    def set_spike_count_monitors(self, spk_count_window=0, spk_count_mon=None):
+        '''
+        Spike counts accumulated by the simulator over consecutive time
+        windows (see C_NSATReader.read_spike_counts).
+        *spk_count_window*: window length in ticks, e.g. t_sample. 0 disables
+        the spike counts.
+        *spk_count_mon*: list of counted neuron ids per core (None counts all
+        the neurons of the core). A neuron is counted once.
+        '''
+        self.spk_count_window = int(spk_count_window)
+        if spk_count_mon is None:
+            spk_count_mon = [None for _ in range(self.N_CORES)]
+        self.spk_count_mon = [None if s is None else np.array(s, 'int')
+                              for s in spk_count_mon]
+        for p, s in enumerate(self.spk_count_mon):
+            if s is not None and len(np.unique(s)) != len(s):
+                raise ValueError(
+                    'Duplicate neuron ids in spk_count_mon of core {0}'.format(p))
+
+    def get_spk_count_mon(self, p):
+        '''
+        Returns the neurons ids counted by the spike counts monitor of core *p*.
+        '''
+        if self.spk_count_window == 0 and self.inference_workers == 0:
+            return np.zeros([0], dtype='int')
+        if self.spk_count_mon[p] is None:
+            return np.arange(self.core_cfgs[p].n_neurons, dtype='int')
+        return self.spk_count_mon[p]
+
     def init_default_corecfgs(self, n_states_list, n_neurons_list, n_inputs_list):
         '''
         Initializes all the parameters for NSAT to default values (see
@@ -572,17 +785,234 @@ class ConfigurationNSAT(object):
         Inputs:
         *ext_evts_data*: multicoreEvents or a dictionary of time-address
         events, one entry per core. If "True", then existing file will be used.
+        Numpy events (a structured array with fields time, core and addr, or
+        an array of shape (n, 3) with columns (time, core, addr)) are written
+        directly, without pyST. External events are not supported in
+        inference mode (see set_inference).
         '''
+        if self.inference_workers > 0 and ext_evts_data is not None:
+            raise _inference_inputs_error('External events')
         # if type(ext_evts_data) != type(pyST.events()):
         self.ext_evts_data = ext_evts_data
         if ext_evts_data is True:
             self.ext_evts = True
             return None
+        if isinstance(ext_evts_data, np.ndarray):
+            self.ext_evts_data = ext_events_array(ext_evts_data)
+            if np.any(self.ext_evts_data['core'] >= self.N_CORES):
+                raise ValueError('External events for a non-existing core')
+            self.ext_evts = True
+            return None
         if ext_evts_data is not None:
             self.ext_evts = True
+        multicoreEvents = _multicore_events()
         if isinstance(self.ext_evts_data, multicoreEvents) is False:
             self.ext_evts_data = multicoreEvents(self.ext_evts_data)
 
+    def set_ext_rates(self, rates, t_sample, core=0, t_start=0):
+        '''
+        Declares the inputs of a core as Poisson sources evaluated by the
+        engine at every tick, instead of writing their events to a file.
+        Inputs:
+        *rates*: firing rates (Hz) of shape (n_windows, n_inputs), one row per
+        sample window
+        *t_sample*: duration (ticks) of a sample window
+        *core*: core id
+        *t_start*: tick of the first sample window. The inputs are silent
+        before *t_start* and after the last window.
+        '''
+        rates = np.atleast_2d(np.asarray(rates, dtype='float'))
+        if core >= self.N_CORES:
+            raise ValueError('External rates for a non-existing core')
+        if core in self.replicas:
+            raise ValueError('Replicas share the inputs of their core')
+        if rates.shape[1] != self.core_cfgs[core].n_inputs:
+            raise ValueError('External rates must have one column per input')
+        if t_sample <= 0:
+            raise ValueError('t_sample must be positive')
+        if self.inference_workers > 0:
+            raise _inference_inputs_error('Rate coded inputs')
+        self.ext_rates[core] = (rates, int(t_sample), int(t_start))
+        self.ext_evts = True
+
+    def set_ext_dataset(self, data, schedule, core=0, max_rate=1000.,
+                        regular=False):
+        '''
+        Drives the inputs of a core with the rows of a dataset, read by the
+        engine from a memory mapped file, instead of writing their events
+        to a file.
+        Inputs:
+        *data*: dataset of shape (n_samples, n_inputs). uint8 intensities
+        (a uint8 np.memmap of a whole file is used in place) or intensities
+        in [0, 1] (e.g. from load_mnist), scaled to 255.
+        *schedule*: array of shape (n, 3) with columns (sample index, start
+        tick, duration), see stimuli.sample_schedule
+        *core*: core id
+        *max_rate*: firing rate (Hz) of the intensity 255, the rates are
+        proportional to the intensities
+        *regular*: if True the inputs spike at regular intervals, otherwise
+        they are Poisson sources
+        '''
+        if core >= self.N_CORES:
+            raise ValueError('External dataset for a non-existing core')
+        if core in self.replicas:
+            raise ValueError('Replicas share the inputs of their core')
+        if np.ndim(data) != 2 or np.shape(data)[1] != self.core_cfgs[core].n_inputs:
+            raise ValueError('External dataset must have one column per input')
+        if getattr(data, 'dtype', None) != np.uint8:
+            data = np.round(np.clip(data, 0, 1) * 255).astype('uint8')
+        schedule = np.asarray(schedule, dtype='int64').reshape(-1, 3)
+        if np.any(schedule < 0) or np.any(schedule[:, 0] >= len(data)):
+            raise ValueError('Invalid samples schedule')
+        schedule = schedule[np.argsort(schedule[:, 1], kind='stable')]
+        self.ext_dataset[core] = (data, schedule, float(max_rate),
+                                  bool(regular))
+        self.ext_evts = True
+
+    def set_inference(self, n_workers=None):
+        '''
+        Runs the entries of the dataset schedules (see set_ext_dataset) as
+        independent samples instead of a single simulation. Every sample
+        starts from Xinit with frozen weights, and the samples are shared
+        among *n_workers* threads (the number of CPUs by default). The
+        spike counts of every sample (of the neurons of spk_count_mon) are
+        returned by C_NSATReader.read_spike_counts, one row per sample.
+        The cores with a dataset must have the same number of samples, and
+        the rate coded inputs (set_ext_rates) and external events
+        (set_ext_events) are not supported.
+        Spike counts windows are disabled, and neither external events nor
+        spikes are recorded in this mode.
+        '''
+        if not self.ext_dataset:
+            raise ValueError('Inference needs the samples of a dataset, '
+                             'see set_ext_dataset')
+        if len(set(len(d[1]) for d in self.ext_dataset.values())) != 1:
+            raise ValueError('The datasets have different numbers of samples')
+        if self.ext_rates:
+            raise _inference_inputs_error('Rate coded inputs')
+        if self.ext_evts_data is True or len(self.ext_evts_data) > 0:
+            raise _inference_inputs_error('External events')
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        if n_workers < 1:
+            raise ValueError('n_workers must be positive')
+        self.inference_workers = int(n_workers)
+        self.spk_count_window = 0
+
+    def set_stopping_rule(self, lead=0, first_to=0, core=0):
+        '''
+        Ends every inference sample (see set_inference) as soon as it is
+        decided by the spike counts of the counted neurons (spk_count_mon)
+        of *core*, e.g. the output population:
+        *lead*: the first neuron leads the second one by *lead* spikes
+        *first_to*: the first neuron has fired *first_to* spikes
+        0 disables a criterion. The sample counts are the counts at the
+        decision, and C_NSATReader.read_decision_ticks returns the ticks of
+        the decisions.
+        '''
+        if self.inference_workers == 0:
+            raise ValueError('Stopping rules apply to inference samples, '
+                             'see set_inference')
+        if core >= self.N_CORES:
+            raise ValueError('Stopping rule on a non-existing core')
+        if lead < 0 or first_to < 0:
+            raise ValueError('lead and first_to must be positive or 0')
+        self.decision_core = int(core)
+        self.decision_lead = int(lead)
+        self.decision_count = int(first_to)
+
+    def set_trace(self, stride=1, size=TRACE_SIZE):
+        '''
+        Traces the phases of the ticks of every core (see PROFILE_PHASES)
+        to a Chrome trace file, which opens in Perfetto
+        (https://ui.perfetto.dev) or chrome://tracing.
+        *stride*: one tick out of *stride* is traced. 0 disables the tracing
+        *size*: number of phases kept per core, the last ones are kept when
+        the trace is longer. At most TRACE_SIZE_MAX, the trace takes 32
+        bytes per phase and core
+        C_NSATReader.read_trace returns the trace. The samples of an
+        inference run (see set_inference) are not traced.
+        '''
+        if stride < 0:
+            raise ValueError('stride must be positive or 0')
+        if size < 1 or size > TRACE_SIZE_MAX:
+            raise ValueError('size must be between 1 and {0}'.format(
+                TRACE_SIZE_MAX))
+        self.trace_stride = int(stride)
+        self.trace_size = int(size)
+
+    def add_replicas(self, core, params, own_weights=False):
+        '''
+        Adds one replica of *core* per entry of *params*, e.g. to sweep
+        neuron parameters over the same connectivity in a single run. The
+        replicas are appended to the cores and run in their own threads.
+        They share the synapses and the inputs (external events, rates,
+        dataset, L1 connections) of *core*, and have their own parameters
+        groups, states and RNG. Their spikes are not routed to other cores.
+        Inputs:
+        *params*: list of dictionaries of parameters (as set_groups_core)
+        that differ from those of *core*, one per replica
+        *own_weights*: if True, every replica starts from a copy of the
+        weights of *core*. Required if *core* is plastic.
+        The monitors and learning flags of *core* are copied, set them
+        before adding replicas.
+        Returns the replicas core ids (see get_replicas).
+        '''
+        if core >= self.N_CORES or core in self.replicas:
+            raise ValueError('Replicas of a non-existing or replica core')
+        if self.plasticity_en[core] and not own_weights:
+            raise ValueError('Replicas of a plastic core need own_weights')
+        base = self.core_cfgs[core]
+        ids = []
+        for pms in params:
+            for k in pms:
+                if (not base.is_parameter_valid(k) or
+                        k in self.REPLICA_SHARED_PARAMETERS):
+                    raise ValueError(
+                        'Parameter {0} cannot be set on a replica'.format(k))
+            # The synapses tables are shared, the other parameters copied
+            rep = copy.copy(base)
+            for k in base.NSAT_parameters:
+                if k not in ('ptr_table', 'wgt_table'):
+                    setattr(rep, k, copy.deepcopy(getattr(base, k)))
+            for k, v in pms.items():
+                setattr(rep, k, v)
+            self.core_cfgs.append(rep)
+            self.replicas[self.N_CORES] = (core, bool(own_weights))
+            ids.append(self.N_CORES)
+            self.N_CORES += 1
+
+            self.plasticity_en = np.append(self.plasticity_en,
+                                           self.plasticity_en[core])
+            self.gated_learning = np.append(self.gated_learning,
+                                            self.gated_learning[core])
+            self.tstdpmax = np.append(self.tstdpmax, self.tstdpmax[core])
+            self.spk_rec_mon = list(self.spk_rec_mon) + \
+                [self.spk_rec_mon[core]]
+            self.syn_ids_rec = list(self.syn_ids_rec) + \
+                [self.syn_ids_rec[core]]
+            self.num_syn_ids_rec = list(self.num_syn_ids_rec) + \
+                [self.num_syn_ids_rec[core]]
+            self.states_rec_mon.append(self.states_rec_mon[core])
+            self.states_rec_stride = np.append(self.states_rec_stride,
+                                               self.states_rec_stride[core])
+            self.spk_count_mon.append(self.spk_count_mon[core])
+        self.single_core = False
+        return ids
+
+    def get_replicas(self, core):
+        '''
+        Returns the core ids of the replicas of *core*.
+        '''
+        return sorted(r for r, (p, _) in self.replicas.items() if p == core)
+
+    def base_core(self, p):
+        '''
+        Returns the core replicated by core *p*, or *p* if it is not a
+        replica.
+        '''
+        return self.replicas.get(p, (p, False))[0]
+
     def set_groups_core(self, core_cfg, **nsat_parameters):
         '''
         Set parameter group for core
@@ -1,8 +1,10 @@
 from . import utils
+from . import stimuli
 from . import NSATlib
 from .global_vars import *
 
 from .NSATlib import run_c_nsat,\
+                    run_c_nsat_async,\
                     build_SpikeList,\
                     exportAER,\
                     importAER,\
@@ -10,3 +12,5 @@ from .NSATlib import run_c_nsat,\
 #                   Events
 from .nsat_writer import C_NSATWriter, C_NSATWriterSingleThread
 from .nsat_reader import C_NSATReader, read_from_file
+from .spikes import SpikeArray
+from .runner import run_experiments
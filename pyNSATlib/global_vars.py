@@ -11,3 +11,27 @@ OFF = -16
 TSTDPMAX = 1023
 ISIMAX = 255
 N_GROUPS = 8
+
+# Compact synaptic pointer table format
+PTR_TABLE_MAGIC = b'NSPT'
+PTR_TABLE_VERSION = 1
+
+# Recorded spikes are streamed to disk in chunks of this many events
+SPK_CHUNK_SIZE = 2**16
+
+# Spike events file formats (see C_NSATReader.read_events)
+SPK_FORMATS = {'legacy': 0, 'compact': 1, 'bitmap': 2}
+SPK_EVENTS_MAGIC = b'NSEV'
+SPK_EVENTS_VERSION = 2
+SPK_BITMAP_FLAG = 2**31
+
+# Profiled phases of a tick, in the order of the profile file records (see
+# C_NSATReader.read_profile)
+PROFILE_PHASES = ('ext_ingest', 'integrate', 'spike_detection',
+                  'barrier_wait', 'routing', 'accumulation', 'stdp', 'reset',
+                  'monitor_io')
+
+# Default and maximum numbers of traced phases kept per core (see set_trace),
+# the ring buffer of a core takes 32 bytes per phase
+TRACE_SIZE = 2**16
+TRACE_SIZE_MAX = 2**22
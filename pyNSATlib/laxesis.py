@@ -18,11 +18,13 @@
 # TODO: external inputs as a core
 
 import numpy as np
+from functools import lru_cache
 from pyNCSre import pyST
 from .laxesis_neurontypes import *
 import pyNSATlib as nsat
 from pyNSATlib.NSATlib import check_weight_matrix, coreConfig
-from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW, sample_distinct, \
+    seeded_rng
 
 
 def connections_dense_to_sparse_nonshared(W, CW):
@@ -38,6 +40,76 @@ def connections_dense_to_sparse_nonshared(W, CW):
     return ptr_table, wgt_table
 
 
+def connections_coo_to_sparse_nonshared(rows, cols, data, shape):
+    '''
+    Same as connections_dense_to_sparse_nonshared for connections given as
+    (rows, cols, weights) arrays sorted by (row, col).
+    '''
+    from scipy.sparse import csr_matrix
+    ptr_table = csr_matrix(
+        (np.arange(len(data)), (rows, cols)), shape=shape, dtype='uint64')
+    return ptr_table, np.asarray(data)
+
+
+def sample_random_connections(nsrc, ndst, p, seed=None, chunk_size=4096):
+    '''
+    Samples each of the nsrc x ndst connections independently with
+    probability p without materializing dense matrices.
+    A binomial number of targets is drawn per source row, then the targets
+    are sampled without replacement for all the rows at once. Rows are
+    processed in chunks of *chunk_size* so memory is O(nnz).
+    Outputs:
+    rows, cols arrays sorted by (row, col)
+    '''
+    rng = seeded_rng(seed)
+    keys = []
+    for start in range(0, nsrc, chunk_size):
+        end = min(start + chunk_size, nsrc)
+        counts = rng.binomial(ndst, p, size=end - start)
+        keys.append(sample_distinct(counts, ndst,
+                                    np.arange(start, end) * ndst, 1, rng))
+    if len(keys) == 0:
+        return np.zeros(0, 'int64'), np.zeros(0, 'int64')
+    keys = np.concatenate(keys)
+    return keys // ndst, keys % ndst
+
+
+def sample_shuffle_connections(nsrc, ndst, iterations=2000, seed=None,
+                               chunk_size=256):
+    '''
+    Sparse equivalent of the connect_shuffle construction: for every target,
+    2*iterations -1 and 2*iterations +1 are scattered among nsrc*iterations
+    slots, and the slots of each source are summed. Only the 4*iterations
+    occupied slots are sampled, *chunk_size* targets at a time.
+    Outputs:
+    rows, cols, weights arrays sorted by (row, col), zero sums dropped
+    '''
+    rng = seeded_rng(seed)
+    nslots = 4 * iterations
+    signs = np.repeat(np.array([-1, 1]), 2 * iterations)
+    keys, weights = [], []
+    for start in range(0, ndst, chunk_size):
+        end = min(start + chunk_size, ndst)
+        m = end - start
+        # Occupied slots, sorted per target, and their signs in random order
+        slots = sample_distinct(np.full(m, nslots), nsrc * iterations,
+                                np.arange(m) * nsrc * iterations, 1, rng)
+        src = slots % (nsrc * iterations) // iterations
+        dst = np.repeat(np.arange(start, end), nslots)
+        sgn = rng.permuted(np.tile(signs, (m, 1)), axis=1).ravel()
+        k, inv = np.unique(src * ndst + dst, return_inverse=True)
+        w = np.bincount(inv, weights=sgn).astype('int')
+        keys.append(k[w != 0])
+        weights.append(w[w != 0])
+    if len(keys) == 0:
+        return np.zeros(0, 'int64'), np.zeros(0, 'int64'), np.zeros(0, 'int')
+    keys = np.concatenate(keys)
+    weights = np.concatenate(weights)
+    order = np.argsort(keys, kind='stable')
+    keys, weights = keys[order], weights[order]
+    return keys // ndst, keys % ndst, weights
+
+
 def connections_dense_to_sparse_shared(ptr_table, wgt_table):
     from scipy.sparse import csr_matrix
     # non-shared
@@ -175,54 +247,65 @@ class NSATSetup(object):
         return L1Connections
 
     def do_connections(self, core):
+        '''
+        Merges the ptr and wgt tables of all connections targeting *core*.
+        The (row, col, ptr) triplets and weights of every connection are
+        accumulated in preallocated arrays and converted to CSR once. If
+        connections overlap, the one declared last replaces the whole
+        (src, dst) block of the earlier ones, as the block assignments did.
+        '''
         n_neurons = self.nneurons[core]
         n_states = self.normalize_n_states(core)
         n_inputs = self.ninputs[core]
+        n_units = n_neurons + n_inputs
 
-        wgt_table = []
-
-        offset = len(wgt_table)
-
-        from scipy.sparse import csr_matrix, isspmatrix
-#        ext_ptr_table = csr_matrix((n_inputs , n_neurons* n_states), dtype='uint64')
-#        rec_ptr_table = csr_matrix((n_neurons, n_neurons* n_states), dtype='uint64')
+        from scipy.sparse import coo_matrix, isspmatrix
 
-        ptr_table = csr_matrix(
-            (n_neurons + n_inputs, (n_neurons + n_inputs) * n_states), dtype='uint64')
-        #print (n_inputs)
-        #print (n_neurons)
+        # external connections first, their sources start at 0
+        connections = [(cs, 0) for cs in self.connections_external[core]]
         for cs in self.connections_external[core]:
-            if cs.src_pop.is_contiguous and cs.dst_pop.is_contiguous:
-                pt = cs.ptr_table.copy()
-                assert isspmatrix(
-                    cs.ptr_table), "Connection ptr_table is not sparse"
-                pt.data = pt.data + offset
-                src_offset = 0  # state offset
-                dst_offset = n_inputs + \
-                    (n_inputs + n_neurons) * cs.dst_state  # state offset
-                ptr_table[(src_offset + cs.src_bgn): (src_offset + cs.src_end),
-                          (dst_offset + cs.dst_bgn): (dst_offset + cs.dst_end)] = pt
-                #print(dst_offset,cs.dst_bgn, dst_offset , cs.dst_end)
-                wgt_table += list(cs.wgt_table)
-                offset += len(cs.wgt_table)
-            else:
+            assert isspmatrix(
+                cs.ptr_table), "Connection ptr_table is not sparse"
+        connections += [(cs, n_inputs) for cs in self.connections[core]]
+        for cs, _ in connections:
+            if not (cs.src_pop.is_contiguous and cs.dst_pop.is_contiguous):
                 raise NotImplementedError()
 
-        for cs in self.connections[core]:
-            if cs.src_pop.is_contiguous and cs.dst_pop.is_contiguous:
-                pt = cs.ptr_table.copy()
-                pt.data = pt.data + offset
-                src_offset = n_inputs  # state offset
-                dst_offset = n_inputs + \
-                    (n_inputs + n_neurons) * cs.dst_state  # state offset
-                ptr_table[(src_offset + cs.src_bgn): (src_offset + cs.src_end),
-                          (dst_offset + cs.dst_bgn): (dst_offset + cs.dst_end)] = pt
-                #print(dst_offset,cs.dst_bgn, dst_offset , cs.dst_end)
-                wgt_table += list(cs.wgt_table)
-                offset += len(cs.wgt_table)
-
-            else:
-                raise NotImplementedError()
+        nnz = sum(cs.ptr_table.nnz for cs, _ in connections)
+        nwgt = sum(len(cs.wgt_table) for cs, _ in connections)
+        rows = np.empty(nnz, 'int64')
+        cols = np.empty(nnz, 'int64')
+        ptrs = np.empty(nnz, 'uint64')
+        wgt_table = np.empty(nwgt, 'int')
+        keep = np.ones(nnz, 'bool')
+
+        pos = 0
+        offset = 0
+        blocks = []
+        for cs, src_offset in connections:
+            pt = cs.ptr_table.tocoo()
+            end = pos + pt.nnz
+            dst_offset = n_inputs + n_units * cs.dst_state  # state offset
+            block = (src_offset + cs.src_bgn, src_offset + cs.src_end,
+                     dst_offset + cs.dst_bgn, dst_offset + cs.dst_end)
+            # drop the entries of earlier connections in this block
+            for bgn, bend, other in blocks:
+                if (other[0] < block[1] and block[0] < other[1] and
+                        other[2] < block[3] and block[2] < other[3]):
+                    r, c = rows[bgn:bend], cols[bgn:bend]
+                    keep[bgn:bend] &= ~((r >= block[0]) & (r < block[1]) &
+                                        (c >= block[2]) & (c < block[3]))
+            rows[pos:end] = pt.row + block[0]
+            cols[pos:end] = pt.col + block[2]
+            ptrs[pos:end] = pt.data.astype('uint64') + offset
+            wgt_table[offset:offset + len(cs.wgt_table)] = cs.wgt_table
+            blocks.append((pos, end, block))
+            pos = end
+            offset += len(cs.wgt_table)
+
+        ptr_table = coo_matrix((ptrs[keep], (rows[keep], cols[keep])),
+                               shape=(n_units, n_units * n_states),
+                               dtype='uint64').tocsr()
 
         return ptr_table, wgt_table
 
@@ -273,45 +356,126 @@ class Population(object):
         return self.name
 
 
+@lru_cache(maxsize=None)
+def conv2d_indices(imsize=28, ksize=5, stride=2):
+    '''
+    Connectivity pattern of a ksize x ksize convolution with zero padding
+    and stride over an imsize x imsize image.
+    Outputs:
+    *src*: source pixel ids
+    *dst*: destination unit ids (imsize // stride squared units)
+    *kidx*: index of the kernel element connecting src to dst
+    The arrays are sorted by (src, dst), cached per geometry and read-only.
+    '''
+    imsize, ksize, stride = int(imsize), int(ksize), int(stride)
+    k2 = ksize // 2
+    nout = imsize // stride
+    io, jo, a, b = np.meshgrid(np.arange(nout), np.arange(nout),
+                               np.arange(ksize), np.arange(ksize),
+                               indexing='ij')
+    r = io * stride + a - k2
+    c = jo * stride + b - k2
+    valid = (r >= 0) & (r < imsize) & (c >= 0) & (c < imsize)
+    src = (r * imsize + c)[valid]
+    dst = (io * nout + jo)[valid]
+    kidx = (a * ksize + b)[valid]
+    order = np.lexsort((dst, src))
+    src, dst, kidx = src[order], dst[order], kidx[order]
+    for v in (src, dst, kidx):
+        v.setflags(write=False)
+    return src, dst, kidx
+
+
+def _indices_to_dense(rows, cols, data, shape, fill=-1):
+    W = np.full(shape, fill, dtype='int')
+    W[rows, cols] = data
+    return W
+
+
 def loccon2d(imsize=28, ksize=5, stride=2, init=5):
     '''
     Locally connected layer (like conv2d but without sharing)
     '''
-    paddedW = np.zeros([imsize + ksize, imsize + ksize,
-                        imsize, imsize], dtype='int') - 1
-    paddedCW = np.zeros([imsize + ksize, imsize + ksize,
-                         imsize, imsize], dtype='int') - 1
-    for i in range(imsize):
-        for j in range(imsize):
-            paddedW[i:i + ksize, j:j + ksize, i, j] = np.random.uniform(
-                low=-init, high=init, size=[ksize, ksize]).astype('int')
-            paddedCW[i:i + ksize, j:j + ksize, i, j] = 1
-    k2 = ksize // 2
-    k2o = ksize - ksize // 2
-    padded_stridedW = paddedW[k2:-k2o, k2:-k2o, ::stride, ::stride]
-    padded_stridedCW = paddedCW[k2:-k2o, k2:-k2o, ::stride, ::stride]
-    W = padded_stridedW.reshape(imsize * imsize, imsize * imsize // stride**2)
-    CW = padded_stridedCW.reshape(
-        imsize * imsize, imsize * imsize // stride**2)
+    src, dst, kidx = conv2d_indices(imsize, ksize, stride)
+    shape = (imsize * imsize, imsize * imsize // stride**2)
+    # one draw per existing connection
+    w = np.random.uniform(low=-init, high=init, size=len(src)).astype('int')
+    W = _indices_to_dense(src, dst, w, shape)
+    CW = _indices_to_dense(src, dst, 1, shape)
     return W, CW, []
 
 
 def conv2d(imsize=28, ksize=5, stride=2):
-    Y = np.arange(ksize**2).reshape(ksize, ksize)
-    K = np.zeros_like(Y)
-    padded = np.zeros([imsize + ksize, imsize + ksize,
-                       imsize, imsize], dtype='int') - 1
-    for i in range(imsize):
-        for j in range(imsize):
-            padded[i:i + ksize, j:j + ksize, i, j] = Y
-    k2 = ksize // 2
-    k2o = ksize - ksize // 2
-    padded_strided = padded[k2:-k2o, k2:-k2o, ::stride, ::stride]
-    Wd = padded_strided.reshape(imsize * imsize, imsize * imsize // stride**2)
-    return Wd, 2 * (Wd != -1), K.flatten()
+    src, dst, kidx = conv2d_indices(imsize, ksize, stride)
+    shape = (imsize * imsize, imsize * imsize // stride**2)
+    Wd = _indices_to_dense(src, dst, kidx, shape)
+    return Wd, 2 * (Wd != -1), np.zeros(ksize**2, 'int')
+
+
+def _filterbank_indices(nfilterin, nfilterout, imsize, ksize, stride):
+    '''
+    Offsets the cached conv2d pattern for every (input, output) filter pair.
+    Returns rows, cols, kernel indices and the pair number (j * nfilterout + i).
+    '''
+    src, dst, kidx = conv2d_indices(imsize, ksize, stride)
+    n_src = imsize * imsize
+    n_dst = imsize * imsize // stride**2
+    j, i = np.meshgrid(np.arange(nfilterin), np.arange(nfilterout),
+                       indexing='ij')
+    j, i = j.reshape(-1, 1), i.reshape(-1, 1)
+    rows = (j * n_src + src).ravel()
+    cols = (i * n_dst + dst).ravel()
+    pair = np.broadcast_to(j * nfilterout + i, (len(j), len(src))).ravel()
+    kidx = np.broadcast_to(kidx, (len(j), len(src))).ravel()
+    shape = (nfilterin * n_src, nfilterout * n_dst)
+    return rows, cols, kidx, pair, shape
+
+
+def conv2d_filterbank(nfilterin, nfilterout, imsize=28, ksize=5, stride=2,
+                      low=0, high=0):
+    '''
+    Sparse bank of shared-weight conv2d filters, one per (input, output)
+    filter pair. Equivalent to gen_filterbank(conv2d, ...) followed by
+    connections_dense_to_sparse_shared.
+    '''
+    from scipy.sparse import csr_matrix
+    imsize = int(imsize)
+    rows, cols, kidx, pair, shape = _filterbank_indices(
+        nfilterin, nfilterout, imsize, ksize, stride)
+    ptr = pair * ksize**2 + kidx
+    ptr_table = csr_matrix((ptr, (rows, cols)), shape=shape)
+    wgt_table = np.random.uniform(low=low, high=high, size=[
+        nfilterin * nfilterout, ksize**2]).astype('int').ravel()
+    return ptr_table, wgt_table
+
+
+def loccon2d_filterbank(nfilterin, nfilterout, imsize=28, ksize=5, stride=2,
+                        init=5):
+    '''
+    Sparse bank of locally connected (non-shared) filters, one per
+    (input, output) filter pair. Weights are drawn as in loccon2d.
+    '''
+    from scipy.sparse import csr_matrix
+    imsize = int(imsize)
+    rows, cols, kidx, pair, shape = _filterbank_indices(
+        nfilterin, nfilterout, imsize, ksize, stride)
+    # one draw per existing connection
+    data = np.random.uniform(low=-init, high=init,
+                             size=len(rows)).astype('int')
+    order = np.lexsort((cols, rows))
+    ptr_table = csr_matrix((np.arange(len(rows)), (rows[order], cols[order])),
+                           shape=shape, dtype='uint64')
+    return ptr_table, data
 
 
 def gen_filterbank(func, nfilterin, nfilterout, low=0, high=0, **kwargs):
+    if func is conv2d:
+        # Same tables without regenerating the pattern for every pair
+        ptr_table, wgt_table = conv2d_filterbank(
+            nfilterin, nfilterout, low=low, high=high, **kwargs)
+        ptr = ptr_table.tocoo()
+        return _indices_to_dense(ptr.row, ptr.col, ptr.data,
+                                 ptr_table.shape), wgt_table
     W = []
     CW = []
     shared = []
@@ -418,53 +582,86 @@ class Connection(object):
         p, w = connections_dense_to_sparse_nonshared(W, CW)
         return self.connect(p, w)
 
-    def connect_random_uniform(self, low, high, p=1.):
+    def connect_random_uniform(self, low, high, p=1., seed=None):
+        '''
+        Connects with probability p and integer weights uniform in [low, high).
+        Below p=1 the connections are sampled in sparse form (see
+        connect_random_sparse).
+        '''
+        if p < 1:
+            return self.connect_random_sparse(low, high, p, seed=seed)
         nsrc = len(self.src_pop)
         ndst = len(self.dst_pop)
-        if p < 1:
-            CW = np.random.randn(nsrc, ndst) < p
-        else:
-            CW = np.ones([nsrc, ndst], 'bool')
+        CW = np.ones([nsrc, ndst], 'bool')
         W = np.zeros([nsrc, ndst], 'int')
         W[CW] = np.random.uniform(low=low, high=high, size=[
                                   CW.sum()]).astype('int')
         p, w = connections_dense_to_sparse_nonshared(W, CW)
         return self.connect(p, w)
 
+    def connect_random_sparse(self, low, high, p, seed=None, chunk_size=4096):
+        '''
+        Random connectivity with connection probability p and integer weights
+        uniform in [low, high), built in O(nnz) memory.
+        Inputs:
+        *seed*: seed of the generator. Drawn from numpy's global state if None.
+        *chunk_size*: number of source neurons sampled at once
+        '''
+        nsrc = len(self.src_pop)
+        ndst = len(self.dst_pop)
+        rng = seeded_rng(seed)
+        rows, cols = sample_random_connections(
+            nsrc, ndst, p, seed=rng, chunk_size=chunk_size)
+        w = rng.uniform(low=low, high=high, size=len(rows)).astype('int')
+        p, w = connections_coo_to_sparse_nonshared(rows, cols, w,
+                                                   (nsrc, ndst))
+        return self.connect(p, w)
+
+    def connect_shuffle_sparse(self, iterations=2000, seed=None,
+                               chunk_size=256):
+        '''
+        Same distribution as connect_shuffle, without the
+        nsrc*iterations x ndst intermediate.
+        '''
+        nsrc = len(self.src_pop)
+        ndst = len(self.dst_pop)
+        rows, cols, w = sample_shuffle_connections(
+            nsrc, ndst, iterations, seed=seed, chunk_size=chunk_size)
+        p, w = connections_coo_to_sparse_nonshared(rows, cols, w,
+                                                   (nsrc, ndst))
+        return self.connect(p, w)
+
     def connect_conv2dbank(self, imsize, nchannels, nfeatures, stride, ksize, **kwargs):
         '''
         Consider separating
         '''
         nsrc = len(self.src_pop)
         ndst = len(self.dst_pop)
-        ptr_table_dense, wgt_table_dense = gen_filterbank(
-            conv2d,
+        ptr_table, wgt_table = conv2d_filterbank(
             nchannels,
             nfeatures,
             imsize=imsize,
             ksize=ksize,
             stride=stride,
             **kwargs)
-        assert nsrc == ptr_table_dense.shape[
+        assert nsrc == ptr_table.shape[
             0], "number of neurons at source must be {0}, is {1}".format(ptr_table.shape[0], nsrc)
-        assert ndst == ptr_table_dense.shape[
+        assert ndst == ptr_table.shape[
             1], "number of neurons at target must be {0}, is {1}".format(ptr_table.shape[1], ndst)
-        ptr_table, wgt_table = connections_dense_to_sparse_shared(
-            ptr_table_dense, wgt_table_dense)
         return self.connect(ptr_table, wgt_table)
 
-    def connect_loccon2dbank(self, imsize, nchannels, nfeatures, stride, ksize):
+    def connect_loccon2dbank(self, imsize, nchannels, nfeatures, stride, ksize, init=5):
         '''
         Consider separating
         '''
 
         nsrc = len(self.src_pop)
         ndst = len(self.dst_pop)
-        W, CW = gen_filterbank(loccon2d, nchannels,
-                               nfeatures, imsize=imsize, ksize=ksize)
+        ptr_table, wgt_table = loccon2d_filterbank(
+            nchannels, nfeatures, imsize=imsize, ksize=ksize, stride=stride,
+            init=init)
         assert nsrc == ptr_table.shape[0]
         assert ndst == ptr_table.shape[1]
-        ptr_table, wgt_table = connections_dense_to_sparse_nonshared(W, CW)
         return self.connect(ptr_table, wgt_table)
 
 
@@ -1,5 +1,12 @@
 import numpy as np
 
+# Layout of the records written by the synaptic weights monitor ('QQQIi')
+WEIGHT_RECORD_DTYPE = np.dtype([('time', '<u8'),
+                                ('pre', '<u8'),
+                                ('post', '<u8'),
+                                ('state', '<u4'),
+                                ('value', '<i4')])
+
 
 def read_from_file(fname):
     import struct as st
@@ -17,10 +24,145 @@ def read_from_file_weights(fname):
     return np.array(st.unpack('QQQIi' * size, cont))
 
 
-def read_synaptic_weights(core_cfg, wgt_file, ptr_file, return_cw=False):
-    from .utils import ptr_wgt_table_to_dense
-    ptr = read_from_file(ptr_file)
-    wgt = read_from_file(wgt_file)
+def read_weight_records(fname):
+    '''
+    Reads the synaptic weights monitor file in one pass.
+    Returns a structured array with fields time, pre, post, state and value
+    (see WEIGHT_RECORD_DTYPE), one entry per monitored synapse and snapshot.
+    '''
+    return np.fromfile(fname, dtype=WEIGHT_RECORD_DTYPE)
+
+
+def read_spike_counts(fname):
+    '''
+    Reads a spike counts file of the C simulator: uint64 window and number
+    of neurons, the uint64 neuron ids, then one row of uint32 counts per window.
+    Returns the counts array (windows, neurons), the neuron ids and the window.
+    '''
+    with open(fname, 'rb') as f:
+        window, n = np.fromfile(f, dtype='<u8', count=2)
+        ids = np.fromfile(f, dtype='<u8', count=n)
+        counts = np.fromfile(f, dtype='<u4')
+    return counts.reshape(-1, int(n)) if n > 0 else counts.reshape(0, 0), \
+        ids, int(window)
+
+
+def read_events(fname):
+    '''
+    Reads a spike events file of the C simulator, in the legacy (all the
+    neuron ids followed by all the spike times, uint64) or in a compact format.
+    Returns the arrays (ids, times) sorted by time.
+    '''
+    from .global_vars import SPK_EVENTS_MAGIC
+    with open(fname, 'rb') as f:
+        magic = f.read(len(SPK_EVENTS_MAGIC))
+    if magic == SPK_EVENTS_MAGIC:
+        return read_events_compact(fname)
+    data = np.fromfile(fname, dtype='uint64')
+    n = len(data) // 2
+    return data[:n], data[n:2 * n]
+
+
+def read_events_compact(fname):
+    '''
+    Decodes a compact spike events file through a memory map.
+    The file holds a header (magic, uint32 version, format, number of neurons,
+    uint64 number of spikes and of records), one record per tick with
+    spikes: uint32 time delta, uint32 count (SPK_BITMAP_FLAG set for bitmap
+    records) and the uint32 neuron ids or bitmap words, and the index of the
+    records (uint64 offsets in uint32 words).
+    Returns the arrays (ids, times) sorted by time.
+    '''
+    from .global_vars import SPK_EVENTS_VERSION, SPK_BITMAP_FLAG
+    data = np.memmap(fname, dtype='<u4', mode='r')
+    version, n_neurons = int(data[1]), int(data[3])
+    if version != SPK_EVENTS_VERSION:
+        raise ValueError('Unsupported spike events file version {0}'.format(version))
+    n_spikes, n_records = (int(v) for v in data[4:8].view('<u8'))
+    n_words = (n_neurons + 31) // 32
+
+    # Locate the records and decode their headers
+    if n_records == 0:
+        records = np.zeros(0, 'int64')
+    else:
+        records = np.asarray(data[len(data) - 2 * n_records:]) \
+            .view('<u8').astype('int64')
+    dts = np.asarray(data[records], 'uint64')
+    counts = np.asarray(data[records + 1], 'int64')
+    starts = records + 2
+    is_bitmap = (counts & SPK_BITMAP_FLAG) != 0
+    counts &= SPK_BITMAP_FLAG - 1
+
+    times = np.repeat(np.cumsum(dts), counts)
+    ids = np.empty(n_spikes, 'uint64')
+    offsets = np.cumsum(counts) - counts
+
+    c = counts[~is_bitmap]
+    within = np.arange(c.sum()) - np.repeat(np.cumsum(c) - c, c)
+    ids[np.repeat(offsets[~is_bitmap], c) + within] = \
+        data[np.repeat(starts[~is_bitmap], c) + within]
+
+    if is_bitmap.any():
+        words = np.asarray(data[starts[is_bitmap][:, None] + np.arange(n_words)],
+                           '<u4')
+        bits = np.unpackbits(words.view('u1'), axis=1,
+                             bitorder='little')[:, :n_neurons]
+        row, nid = np.nonzero(bits)
+        c = counts[is_bitmap]
+        within = np.arange(len(row)) - np.repeat(np.cumsum(c) - c, c)
+        ids[offsets[is_bitmap][row] + within] = nid
+    return ids, times
+
+
+def events_to_aer(ids, times):
+    '''
+    Interleaves spike ids and times into the [addr0, time0, addr1, time1, ...]
+    array expected by importAER.
+    '''
+    data = np.empty(2 * len(ids), dtype='uint64')
+    data[::2] = ids
+    data[1::2] = times
+    return data
+
+
+def read_ptr_table(fname):
+    '''
+    Reads a ptr table file as written by C_NSATWriter.write_L0_ptr_table,
+    in the compact or in the legacy (uint64 records) format.
+    Returns an array of shape (nnz, 4) with columns (pre, post, state, pointer).
+    '''
+    from .global_vars import PTR_TABLE_MAGIC
+    with open(fname, 'rb') as f:
+        magic = f.read(len(PTR_TABLE_MAGIC))
+    if magic == PTR_TABLE_MAGIC:
+        data = np.fromfile(fname, dtype='uint8')
+        version, n_rows, n_states = data[4:16].view('<u4')
+        nnz = int(data[16:24].view('<u8')[0])
+        pos = 24
+        offsets = data[pos:pos + 8 * (n_rows + 1)].view('<u8')
+        pos += 8 * (int(n_rows) + 1)
+        dst = data[pos:pos + 4 * nnz].view('<u4')
+        pos += 4 * nnz
+        ptr = data[pos:pos + 4 * nnz].view('<u4')
+        pos += 4 * nnz
+        state = data[pos:pos + nnz]
+        src = np.repeat(np.arange(n_rows), np.diff(offsets).astype('int64'))
+        return np.column_stack([src, dst, state, ptr]).astype('int64')
+    data = np.fromfile(fname, dtype='uint64')
+    if len(data) == 0:
+        return np.zeros((0, 4), 'int64')
+    nentries = int(data[0]) * 4
+    return data[1:nentries + 1].reshape(-1, 4).astype('int64')
+
+
+def read_synaptic_weights(core_cfg, wgt_file, ptr_file, return_cw=False,
+                          sparse=False):
+    from .utils import ptr_wgt_table_to_dense, ptr_wgt_table_to_sparse
+    ptr = read_ptr_table(ptr_file)
+    wgt = np.fromfile(wgt_file, dtype='int32')
+    if sparse:
+        return ptr_wgt_table_to_sparse(
+            ptr, wgt, core_cfg.n_inputs, core_cfg.n_neurons, core_cfg.n_states)
     W, CW = ptr_wgt_table_to_dense(
         ptr, wgt, core_cfg.n_inputs, core_cfg.n_neurons, core_cfg.n_states)
     if return_cw:
@@ -31,32 +173,48 @@ def read_synaptic_weights(core_cfg, wgt_file, ptr_file, return_cw=False):
 
 class NSATReader(object):
 
-    def __init__(self, config_nsat, fname):
+    def __init__(self, config_nsat, fname, spike_array=False):
         self.cfg = config_nsat
         self.fname = fname
+        # Readers return SpikeArray objects instead of pyST SpikeLists
+        self.spike_array = spike_array
 
 
 class C_NSATReader(NSATReader):
 
-    def read_synaptic_weights(self, return_cw=False):
+    def read_synaptic_weights(self, return_cw=False, sparse=False):
         '''
-        Reads final weights into a dense W.
+        Reads final weights into a dense W. The final weights are dumped by
+        the simulator with monitor_weights_final=True, otherwise the initial
+        weights (syn_wgt_table) are returned.
         Inputs:
         *return_cw*: If enabled, the CW matrix is also returned. 
+        *sparse*: If enabled, W is returned as a list of scipy.sparse CSR
+        matrices (one per state) per core, and return_cw is ignored.
         WARNING: Weight sharing information is lost and reuse of C and CW should be used only if parameters are not shared.
         '''
         Wcores = []
         CWcores = []
         for p, core_cfg in self.cfg:
             ptr_file = self.fname.syn_ptr_table + \
-                ('_core_' + str(p) + '.dat').encode('utf-8')
-            wgt_file = self.fname.syn_wgt_table + \
-                ('_core_' + str(p) + '.dat').encode('utf-8')
+                ('_core_' + str(self.cfg.base_core(p)) + '.dat').encode('utf-8')
+            if self.cfg.monitor_weights_final:
+                wgt_file = self.fname.shared_mem + \
+                    ('_core_' + str(p) + '.dat').encode('utf-8')
+            else:
+                # Final weights are only dumped with monitor_weights_final,
+                # a shared_mem file would be left by a previous run
+                wgt_file = self.fname.syn_wgt_table + \
+                    ('_core_' + str(self.cfg.base_core(p)) + '.dat').encode('utf-8')
+            if sparse:
+                Wcores.append(read_synaptic_weights(
+                    core_cfg, wgt_file, ptr_file, sparse=True))
+                continue
             W, CW = read_synaptic_weights(
                 core_cfg, wgt_file, ptr_file, return_cw=True)
             Wcores.append(W)
             CWcores.append(CW)
-        if return_cw:
+        if return_cw and not sparse:
             return Wcores, CWcores
         else:
             return Wcores
@@ -73,27 +231,76 @@ class C_NSATReader(NSATReader):
         '''
         return self.read_synaptic_weights_history(*args, **kwargs)
 
+    def read_synaptic_weights_records(self, post=None):
+        '''
+        Read weights monitored using monitor_weights=True as sparse tables.
+        Inputs:
+        *post*: post-synaptic neuron id(s) to keep. All records are returned if None.
+        Outputs:
+        A list of structured arrays (one per core) with fields time, pre, post,
+        state and value. Each entry maps (time, pre, post, state) to a weight.
+        '''
+        R_all = []
+        for p, core_cfg in self.cfg:
+            rec = read_weight_records(
+                self.fname.synw + ('_core_' + str(p) + '.dat').encode('utf-8'))
+            if post is not None:
+                rec = rec[np.isin(rec['post'], post)]
+            R_all.append(rec)
+        return R_all
+
+    def read_synaptic_weights_history_all(self, post=None, sparse=False):
+        '''
+        Read weights monitored using monitor_weights=True for all post-synaptic
+        neurons at once.
+        Inputs:
+        *post*: post-synaptic neuron id(s) to read. Defaults to all monitored ids.
+        *sparse*: If enabled, return the record tables of read_synaptic_weights_records.
+        Outputs:
+        A list of numpy arrays of shape (timesteps, pre-neuron id, post, state)
+        and a list with the post-synaptic ids along the third axis, one item per core.
+        '''
+        R_all = self.read_synaptic_weights_records(post)
+        if sparse:
+            return R_all
+        W_all, P_all = [], []
+        for (p, core_cfg), rec in zip(self.cfg, R_all):
+            n_units = core_cfg.n_inputs + core_cfg.n_neurons
+            if post is None:
+                posts = np.unique(rec['post'])
+            else:
+                posts = np.unique(np.asarray(post, 'uint64'))
+            W = np.zeros((self.cfg.sim_ticks, n_units, len(posts),
+                          core_cfg.n_states), 'int')
+            W[rec['time'].astype('intp'),
+              rec['pre'].astype('intp'),
+              np.searchsorted(posts, rec['post']),
+              rec['state'].astype('intp')] = rec['value']
+            W_all.append(W[1:, ...])
+            P_all.append(posts.astype('int'))
+        return W_all, P_all
+
     def read_synaptic_weights_history(self, post=None):
         '''
         Read weights monitored using monitor_weights=True.
         Inputs:
-        *post*: post-synaptic neuron id whose weights are read.
+        *post*: post-synaptic neuron id whose weights are read. Use
+        read_synaptic_weights_history_all to read several posts.
         Outputs:
         A list of numpy arrays of shape (timesteps, pre-neuron id (including input neurons), state). Each item in the list corresponds to a core
         '''
+        if post is None:
+            raise ValueError('A post-synaptic neuron id is required, use '
+                             'read_synaptic_weights_history_all for all posts')
         W_all = []
-        for p, core_cfg in self.cfg:
+        for (p, core_cfg), rec in zip(self.cfg,
+                                      self.read_synaptic_weights_records(post)):
             n_units = core_cfg.n_inputs + core_cfg.n_neurons
-            ww = read_from_file_weights(
-                self.fname.synw + ('_core_' + str(p) + '.dat').encode('utf-8')).astype('i')
-            # len_ww = ww.shape[0]
             W = np.zeros((self.cfg.sim_ticks, n_units,
                           core_cfg.n_states), 'int')
-            for i in range(len(ww)):
-                if len(ww[i * 5:i * 5 + 5]) != 0:
-                    time, pre, post_, state, val = ww[i * 5:i * 5 + 5]
-                    if post_ == post:
-                        W[time, pre, state] = val
+            W[rec['time'].astype('intp'),
+              rec['pre'].astype('intp'),
+              rec['state'].astype('intp')] = rec['value']
             W_all.append(W[1:, ...])
         return W_all
 
@@ -101,18 +308,32 @@ class C_NSATReader(NSATReader):
         return self.read_states(*args, **kwargs)
 
     def read_states(self, time_explicit=True):
+        '''
+        Reads the states recorded with monitor_states=True.
+        The last axis holds the recorded state components
+        (cfg.get_states_rec_mon, all states by default). With rec_deltat and
+        states_rec_stride equal to 1 the first axis has sim_ticks entries,
+        otherwise one entry per record.
+        '''
         S = []
         for p, core_cfg in self.cfg:
-            size = len(self.cfg.spk_rec_mon[p]) * core_cfg.n_states + 1
-            tmp = read_from_file(self.fname.states +
-                                 ('_core_' + str(p) + '.dat').encode('utf-8'))
-            res = np.zeros((self.cfg.sim_ticks, len(self.cfg.spk_rec_mon[p]),
-                            core_cfg.n_states + 1), 'int')
-            for i in range(self.cfg.sim_ticks - 1):
-                tmp_ = tmp[i * size: (i + 1) * size]
-                res[i, :, 0] = tmp_[0]
-                res[i, :, 1:] = tmp_[1:].reshape(
-                    len(self.cfg.spk_rec_mon[p]), core_cfg.n_states)
+            n_rec = len(self.cfg.spk_rec_mon[p])
+            n_states = len(self.cfg.get_states_rec_mon(p))
+            size = n_rec * n_states + 1
+            tmp = np.fromfile(self.fname.states +
+                              ('_core_' + str(p) + '.dat').encode('utf-8'),
+                              dtype='int32')
+            n_records = len(tmp) // size
+            if self.cfg.rec_deltat == 1 and self.cfg.states_rec_stride[p] == 1:
+                n_rows = self.cfg.sim_ticks
+                n_records = min(n_records, self.cfg.sim_ticks - 1)
+            else:
+                n_rows = n_records
+            tmp = tmp[:n_records * size].reshape(n_records, size)
+            res = np.zeros((n_rows, n_rec, n_states + 1), 'int')
+            res[:n_records, :, 0] = tmp[:, :1]
+            res[:n_records, :, 1:] = tmp[:, 1:].reshape(
+                n_records, n_rec, n_states)
             if not time_explicit:
                 S.append(res)
             else:
@@ -130,67 +351,191 @@ class C_NSATReader(NSATReader):
     def read_c_nsat_states_list(self):
         T, S = [], []
         for p, core_cfg in self.cfg:
-            tmp = read_from_file(self.fname.states +
-                                 ('_core_' + str(p) + '.dat').encode('utf-8'))
-            stride = len(self.cfg.spk_rec_mon[p]) * 4 + 1
-            size = self.cfg.sim_ticks // self.cfg.rec_deltat
-            tmp = tmp.reshape(size, stride)
+            tmp = np.fromfile(self.fname.states +
+                              ('_core_' + str(p) + '.dat').encode('utf-8'),
+                              dtype='int32')
+            n_states = len(self.cfg.get_states_rec_mon(p))
+            stride = len(self.cfg.spk_rec_mon[p]) * n_states + 1
+            size = len(tmp) // stride
+            tmp = tmp[:size * stride].reshape(size, stride)
             T.append(tmp[:, 0])
             S.append(np.split(tmp[:, 1:],
                               len(self.cfg.spk_rec_mon[p]),
                               axis=1))
         return T, S
 
-    def read_spikelist(self, sim_ticks=None, id_list=None, core=0):
+    def read_spike_counts(self, core=0, id_list=None):
+        '''
+        Reads the spike counts accumulated by the simulator over windows of
+        cfg.spk_count_window ticks, or per sample in inference mode (see
+        ConfigurationNSAT.set_inference).
+        Inputs:
+        *core*: core id
+        *id_list*: neuron ids (columns) to return, in this order. All the
+        counted neurons if None.
+        Returns an array of shape (windows or samples, neurons).
+        '''
+        counts, ids, _ = read_spike_counts(
+            self.fname.spk_counts + '_core_{0}.dat'.format(core).encode('utf-8'))
+        if id_list is None:
+            return counts
+        id_list = np.asarray(id_list, dtype='uint64')
+        order = np.argsort(ids)
+        pos = np.searchsorted(ids, id_list, sorter=order)
+        if np.any(pos >= len(ids)) or np.any(ids[order[pos]] != id_list):
+            raise ValueError('Some neurons of id_list are not counted')
+        return counts[:, order[pos]]
+
+    def read_replica_spike_counts(self, core=0, id_list=None):
+        '''
+        Reads the spike counts of *core* and of its replicas (see
+        ConfigurationNSAT.add_replicas).
+        Returns an array of shape (replicas + 1, windows or samples,
+        neurons), *core* first.
+        '''
+        return np.array([self.read_spike_counts(p, id_list)
+                         for p in [core] + self.cfg.get_replicas(core)])
+
+    def read_replica_spikelists(self, core=0, **kwargs):
+        '''
+        Reads the spikes recorded on *core* and on its replicas (see
+        ConfigurationNSAT.add_replicas). The keyword arguments are those of
+        read_spikelist.
+        Returns a list of spike lists, *core* first.
+        '''
+        return [self.read_spikelist(core=p, **kwargs)
+                for p in [core] + self.cfg.get_replicas(core)]
+
+    def read_decision_ticks(self):
+        '''
+        Reads the ticks at which the inference samples were decided by the
+        stopping rule (see ConfigurationNSAT.set_stopping_rule), in the time
+        frame of the samples schedule. -1 for the samples that were not
+        decided.
+        '''
+        if self.cfg.decision_lead == 0 and self.cfg.decision_count == 0:
+            raise ValueError('No stopping rule, see set_stopping_rule')
+        return np.fromfile(self.fname.decisions, dtype='<u8').astype('int64')
+
+    def _check_not_inference(self, output):
+        '''
+        Raises a ValueError for the outputs (e.g. 'profiled') that the samples
+        of an inference run (see set_inference) do not produce.
+        '''
+        if self.cfg.inference_workers > 0:
+            raise ValueError('The samples of an inference run are not '
+                             '{0}'.format(output))
+
+    def read_profile(self):
+        '''
+        Reads the profile of the simulation (see the profile argument of
+        ConfigurationNSAT). Returns a structured array with one record per
+        core: the wall-clock time in seconds spent in each phase of the ticks
+        (fields PROFILE_PHASES), the number of accumulated synaptic events
+        (syn_events) and the number of STDP weight updates (wgt_updates).
+        The samples of an inference run (see set_inference) are not
+        profiled.
+        '''
+        from .global_vars import PROFILE_PHASES
+        if not self.cfg.is_profile_on:
+            raise ValueError('The simulation is not profiled, see the '
+                             'profile argument of ConfigurationNSAT')
+        self._check_not_inference('profiled')
+        n_phases = len(PROFILE_PHASES)
+        data = np.fromfile(self.fname.profile, dtype='<u8')
+        data = data.reshape(-1, n_phases + 2)
+        dtype = [(ph, 'f8') for ph in PROFILE_PHASES]
+        dtype += [('syn_events', 'i8'), ('wgt_updates', 'i8')]
+        profile = np.zeros(len(data), dtype=dtype)
+        for i, ph in enumerate(PROFILE_PHASES):
+            profile[ph] = data[:, i] * 1e-9
+        profile['syn_events'] = data[:, n_phases]
+        profile['wgt_updates'] = data[:, n_phases + 1]
+        return profile
+
+    def read_trace(self):
+        '''
+        Reads the trace of the simulation (see ConfigurationNSAT.set_trace),
+        a Chrome trace file that opens in Perfetto. Returns the list of its
+        phases events: name (phase), tid (core), ts and dur (microseconds)
+        and args['tick'].
+        '''
+        import json
+        if self.cfg.trace_stride == 0:
+            raise ValueError('The simulation is not traced, see set_trace')
+        self._check_not_inference('traced')
+        with open(self.fname.trace) as f:
+            trace = json.load(f)
+        return [e for e in trace['traceEvents'] if e['ph'] == 'X']
+
+    def read_spikelist(self, sim_ticks=None, id_list=None, core=0,
+                       spike_array=None):
+        '''
+        Reads the spikes recorded on *core*.
+        Inputs:
+        *sim_ticks*: duration of the spike trains (cfg.sim_ticks by default)
+        *id_list*: neuron ids (cfg.spk_rec_mon by default)
+        *spike_array*: If enabled, return a SpikeArray instead of a pyST
+        SpikeList. Defaults to the spike_array flag of the reader.
+        '''
         from .NSATlib import importAER
         if sim_ticks is None:
             sim_ticks = self.cfg.sim_ticks
         if id_list is None:
             id_list = self.cfg.spk_rec_mon[core]
+        if spike_array is None:
+            spike_array = self.spike_array
         filename = self.fname.events + \
             '_core_{0}.dat'.format(core).encode('utf-8')
+        ids, times = read_events(filename)
+        if spike_array:
+            from .spikes import SpikeArray
+            spikes = SpikeArray(times, ids, t_stop=sim_ticks, presorted=True)
+            spikes.complete(id_list)
+            return spikes
         spikelist = importAER(
-            read_from_file(filename),
+            events_to_aer(ids, times),
             sim_ticks=sim_ticks,
             id_list=id_list)
         return spikelist
 
-    def read_c_nsat_synaptic_weights(self):
+    def read_c_nsat_synaptic_weights(self, sparse=False):
         '''
-        Describe what this function does here.
+        Reads the final synaptic weights of every core from the final pointer
+        records and shared memory dumped by the C simulator.
+        Inputs:
+        *sparse*: If enabled, return a list of scipy.sparse CSR matrices
+        (one per state) per core instead of a dense [n_units, n_units, n_states] array.
         '''
+        from .utils import ptr_wgt_table_to_sparse
         ptr_tables = []
-        pos = 0
         for p, core_cfg in self.cfg:
-            ptrs = read_from_file(self.fname.synw_final +
-                                  ('_core_' + str(p) + '.dat').encode('utf-8'))
-            shared_mem = read_from_file(
-                self.fname.shared_mem + ('_core_' + str(p) + '.dat').encode('utf-8'))
+            ptrs = np.fromfile(self.fname.synw_final +
+                               ('_core_' + str(p) + '.dat').encode('utf-8'),
+                               dtype='int32')
+            shared_mem = np.fromfile(
+                self.fname.shared_mem + ('_core_' + str(p) + '.dat').encode('utf-8'),
+                dtype='int32')
             n_units = core_cfg.n_inputs + core_cfg.n_neurons
             n_states = core_cfg.n_states
-            nentries = (ptrs[pos]) * 4
-            pos += 1
-            pR = ptrs[pos:nentries + pos].reshape(-1, 4)
+            if sparse:
+                ptr_tables.append(ptr_wgt_table_to_sparse(
+                    ptrs, shared_mem, core_cfg.n_inputs, core_cfg.n_neurons,
+                    n_states))
+                continue
+            nentries = ptrs[0] * 4
+            pR = ptrs[1:nentries + 1].reshape(-1, 4)
             ptr = np.zeros([n_units, n_units, n_states], 'int')
-            for p in pR:
-                ptr[p[0], p[1], p[2]] = shared_mem[p[3]]
-            pos += nentries
+            ptr[pR[:, 0], pR[:, 1], pR[:, 2]] = shared_mem[pR[:, 3]]
             ptr_tables.append(ptr)
         return ptr_tables
 
     def read_c_nsat_raw_events(self):
-        from struct import unpack
         raw_data = []
         for p, core_cfg in self.cfg:
-            with open(self.fname.events + '_core_' + str(p) + '.dat', 'rb') as f:
-                c = f.read()
-            size = int(len(c) // 8)
-            tmp = np.array(unpack('Q' * size, c), 'Q')
-            data = np.zeros((tmp.shape[0], ))
-            size = tmp.shape[0] // 2
-            data[::2] = tmp[:size]
-            data[1::2] = tmp[size:]
-            raw_data.append(data)
+            ids, times = read_events(
+                self.fname.events + ('_core_' + str(p) + '.dat').encode('utf-8'))
+            raw_data.append(events_to_aer(ids, times).astype('float'))
         return raw_data
 
     def read_c_nsat_syn_evo(self, pair=None):
@@ -202,9 +547,9 @@ class C_NSATReader(NSATReader):
             if self.cfg.syn_ids_rec[p] is not None:
                 fname = self.fname.synw + \
                     ('_core_' + str(p) + '.dat').encode('utf-8')
-                data = read_from_file(fname)
-                size = data.shape[0] // 5
-                data = data.reshape(size, 5)
+                rec = read_weight_records(fname)
+                data = np.column_stack([rec[f].astype('int')
+                                        for f in WEIGHT_RECORD_DTYPE.names])
 
                 w = []
                 for i in self.cfg.syn_ids_rec[p]:
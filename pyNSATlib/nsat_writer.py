@@ -11,11 +11,13 @@
 # -----------------------------------------------------------------------------
 import numpy as np
 import warnings
+import mmap
 import os
+import json
+import hashlib
 from .utils import *
 from .global_vars import *
 from ctypes import Structure, c_char_p
-from pyNCSre import pyST
 
 
 def pack(data, typ='i'):
@@ -25,6 +27,199 @@ def pack(data, typ='i'):
     return s
 
 
+def pack_ptr_table(ptr_table, n_units, n_states):
+    '''
+    Packs a ptr table in the compact format read by the C simulator:
+    magic, uint32 version, num_rows and num_states, uint64 nnz,
+    uint64 row offsets (num_rows + 1), then the uint32 dst, uint32 ptr and
+    uint8 state arrays sorted by (src, state).
+    '''
+    src, dst, state, ptr = ptr_table_to_records(ptr_table, n_units, n_states)
+    if len(ptr) > 0 and (max(dst.max(), ptr.max()) >= 2**32 or
+                         state.max() >= 2**8):
+        raise ValueError('ptr table does not fit the compact format')
+    offsets = np.zeros(n_units + 1, 'uint64')
+    offsets[1:] = np.cumsum(np.bincount(src, minlength=n_units))
+    header = np.array([PTR_TABLE_VERSION, n_units, n_states], '<u4')
+    return b''.join([PTR_TABLE_MAGIC,
+                     header.tobytes(),
+                     np.array([len(ptr)], '<u8').tobytes(),
+                     offsets.astype('<u8').tobytes(),
+                     dst.astype('<u4').tobytes(),
+                     ptr.astype('<u4').tobytes(),
+                     state.astype('u1').tobytes()])
+
+
+def pack_ext_events(tm, data, sim_ticks):
+    '''
+    Packs external events in the format read by the C simulator: for every
+    tick t in [1, sim_ticks) the uint64 pair (t, count) followed by the
+    records of the count events of that tick.
+    *tm*: sorted event times
+    *data*: uint64 record(s) of every event, shape (n,) or (n, k)
+    '''
+    tm = np.asarray(tm, dtype='int64')
+    data = np.asarray(data, dtype='uint64')
+    data = data.reshape(len(tm), -1) if len(tm) > 0 else data.reshape(0, 1)
+    keep = (tm >= 1) & (tm < sim_ticks)
+    tm, data = tm[keep], data[keep]
+    n_ticks, k = max(sim_ticks - 1, 0), data.shape[1]
+    counts = np.bincount(tm - 1, minlength=n_ticks)
+    before = np.cumsum(counts) - counts
+    header = 2 * np.arange(n_ticks) + k * before
+    out = np.empty(2 * n_ticks + k * len(tm), dtype='<u8')
+    out[header] = np.arange(1, n_ticks + 1)
+    out[header + 1] = counts
+    pos = header[tm - 1] + 2 + k * (np.arange(len(tm)) - before[tm - 1])
+    for j in range(k):
+        out[pos + j] = data[:, j]
+    return out.tobytes()
+
+
+def pack_ext_rates(rates, t_sample, t_start=0):
+    '''
+    Packs the rates of the Poisson sources of a core in the format read by
+    the C simulator: the uint64 header (t_start, t_sample, n_windows,
+    n_inputs) followed, for every window, by the uint32 thresholds that the
+    32 bits random numbers are compared with at every tick (1 tick = 1 ms).
+    *rates*: firing rates (Hz) of shape (n_windows, n_inputs)
+    '''
+    rates = np.atleast_2d(np.asarray(rates, dtype='float'))
+    header = np.array([t_start, t_sample] + list(rates.shape), dtype='<u8')
+    return header.tobytes() + rate_thresholds(rates).tobytes()
+
+
+def rate_thresholds(rates):
+    '''
+    Returns the uint32 thresholds (spike probability per tick * 2^32) of
+    the firing rates *rates* (Hz).
+    '''
+    prob = np.clip(np.asarray(rates, dtype='float') * 1e-3, 0, 1)
+    return np.minimum(np.round(prob * 2**32), 2**32 - 1).astype('<u4')
+
+
+def pack_ext_dataset(path, offset, shape, schedule, max_rate, regular):
+    '''
+    Packs the descriptor of a dataset source in the format read by the C
+    simulator: the uint64 header (mode, n_samples, n_inputs, offset of the
+    dataset in *path*, length of *path*), *path*, the uint32 thresholds of
+    the 256 intensities, the uint64 number of schedule entries and the
+    (index, start, duration) entries.
+    '''
+    path = os.path.abspath(path).encode('utf-8')
+    header = np.array([regular, shape[0], shape[1], offset, len(path)],
+                      dtype='<u8')
+    lut = rate_thresholds(max_rate * np.arange(256) / 255.)
+    return b''.join([header.tobytes(), path, lut.tobytes(),
+                     pack(len(schedule), 'Q'),
+                     np.asarray(schedule, dtype='<u8').tobytes()])
+
+
+def split_ext_events(events, n_cores):
+    '''
+    Sorts numpy external events (see ext_events_array) by time and address
+    and yields the (time, addr) arrays of every core.
+    '''
+    events = events[np.lexsort((events['addr'], events['time'],
+                                events['core']))]
+    bounds = np.searchsorted(events['core'], np.arange(n_cores + 1))
+    for p in range(n_cores):
+        ev = events[bounds[p]:bounds[p + 1]]
+        yield p, ev['time'], ev['addr']
+
+
+def update_digest(h, obj):
+    '''
+    Feeds a canonical description of *obj* (numbers, strings, arrays,
+    sparse matrices, containers and plain objects) to the hash *h*.
+    '''
+    if obj is None or isinstance(obj, (bool, int, float, complex, str)):
+        h.update(repr((type(obj).__name__, obj)).encode('utf-8'))
+    elif isinstance(obj, bytes):
+        h.update(b'bytes%d:' % len(obj) + obj)
+    elif isinstance(obj, np.dtype):
+        h.update(repr(('dtype', obj.descr)).encode('utf-8'))
+    elif isinstance(obj, (np.ndarray, np.generic)):
+        obj = np.asarray(obj)
+        h.update(repr(('ndarray', obj.dtype.str, obj.shape)).encode('utf-8'))
+        if obj.dtype.hasobject:
+            for v in obj.flat:
+                update_digest(h, v)
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif type(obj).__module__.startswith('scipy.sparse'):
+        obj = obj.tocsr()
+        h.update(repr(('sparse', obj.shape)).encode('utf-8'))
+        for a in (obj.data, obj.indices, obj.indptr):
+            update_digest(h, a)
+    elif isinstance(obj, dict):
+        h.update(b'dict%d:' % len(obj))
+        for k in sorted(obj, key=repr):
+            update_digest(h, k)
+            update_digest(h, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        h.update(repr((type(obj).__name__, len(obj))).encode('utf-8'))
+        for v in obj:
+            update_digest(h, v)
+    elif hasattr(obj, '__dict__'):
+        h.update(repr(('object', type(obj).__name__)).encode('utf-8'))
+        update_digest(h, vars(obj))
+    else:
+        raise TypeError('Cannot hash objects of type {0}'.format(type(obj)))
+
+
+def update_events_digest(h, events):
+    '''
+    Feeds the external events of a configuration (see
+    ConfigurationNSAT.set_ext_events) to the hash *h*.
+    '''
+    if isinstance(events, dict):
+        # pyST events are sorted in place when written, hash them sorted
+        for core in sorted(events):
+            events[core].sort_tm()
+            update_digest(h, core)
+            update_digest(h, events[core].get_adtm())
+    else:
+        update_digest(h, events)
+
+
+# Version of the files layout, bump it when the files change format. The
+# fingerprints of another version (or of another writer source) are ignored.
+WRITER_VERSION = 1
+
+
+def writer_version():
+    '''
+    Returns the version of the writer stored in the fingerprints (see
+    NSATWriter.write): WRITER_VERSION and the digest of this module.
+    '''
+    with open(__file__, 'rb') as f:
+        return '{0}:{1}'.format(WRITER_VERSION,
+                                hashlib.sha1(f.read()).hexdigest())
+
+
+def file_stats(fname):
+    '''
+    Returns the size and modification time (ns) of a file, None if it does
+    not exist.
+    '''
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def digest(*objs):
+    '''
+    Returns the sha1 digest (hex) of *objs* (see update_digest).
+    '''
+    h = hashlib.sha1()
+    for obj in objs:
+        update_digest(h, obj)
+    return h.hexdigest()
+
+
 class DataStruct(object):
     pass
 
@@ -37,10 +232,13 @@ class NSATWriter(object):
             warnings.warn('Path {0} does not exist, creating'.format(path))
             os.makedirs(path)
         self.fname = self.generate_c_fnames(path + '/' + prefix)
+        # Fingerprints of the written sections (see write)
+        self.fingerprints_fname = path + '/' + prefix + '_fingerprints.json'
 
     def write(self, write_events=True,
               write_weights=True,
-              write_corecfgs=True):
+              write_corecfgs=True,
+              force=False):
         '''
         Writes all parameter files for running c_nsat software simulation.
         inputs:
@@ -53,19 +251,114 @@ class NSATWriter(object):
                         generated or not.
                         Useful when external events generation is long or
                         imported from another experiment
+        *force*: Boolean defining whether all the files are written. By
+                 default the sections (parameters, maps, ptr and weight
+                 tables per core, L1 connectivity, inputs) whose
+                 fingerprint did not change since the last write are
+                 skipped. The fingerprints are stored in
+                 <prefix>_fingerprints.json: the digest of the contents of
+                 every section and the size and modification time of its
+                 files, for a version of the writer (see writer_version).
+                 A section is written again if one of its files is missing
+                 or was modified since.
         '''
-        if not self.cfg.groups_set:
-            self.cfg.set_groups()
+        cfg = self.cfg
+        if not cfg.groups_set:
+            cfg.set_groups()
+
+        version = writer_version()
+        old = {}
+        if not force and os.path.exists(self.fingerprints_fname):
+            try:
+                with open(self.fingerprints_fname) as f:
+                    old = json.load(f)
+            except ValueError:
+                old = {}
+            if old.get('version') != version:
+                old = {}
+        old = old.get('sections', {})
+        new = dict(old)
+
+        def changed(section, files, *objs):
+            files = [f.decode('utf-8') for f in files]
+            entry = old.get(section, {})
+            new[section] = {'digest': digest(*objs), 'files': files}
+            if (new[section]['digest'] != entry.get('digest') or
+                    set(files) != set(entry.get('stats', {}))):
+                return True
+            stats = [file_stats(f) for f in files]
+            return any(st is None or st != entry['stats'][f]
+                       for f, st in zip(files, stats))
+
+        def core_files(fname, cores):
+            return [fname + ('_core_' + str(p) + '.dat').encode('utf-8')
+                    for p in cores if p not in cfg.replicas]
 
         if write_corecfgs:
-            self.write_corecfgs()
+            tables = ('ptr_table', 'wgt_table', 'nmap', 'lrnmap',
+                      'default_core_cfg')
+            state = cfg.__getstate__()
+            state['core_cfgs'] = [{k: v for k, v in vars(c).items()
+                                   if k not in tables}
+                                  for p, c in cfg]
+            if changed('params', [self.fname.params], state,
+                       cfg.single_core, sorted(cfg.ext_rates),
+                       sorted(cfg.ext_dataset)):
+                self.write_params()
+            if changed('maps', [self.fname.nsat_params_map,
+                                self.fname.lrn_params_map],
+                       [(c.nmap, c.lrnmap) for p, c in cfg]):
+                self.write_maps()
 
-        if self.cfg.ext_evts:
-            self.write_ext_events()
+        events = cfg.ext_evts_data
+        if cfg.ext_evts and events is not True:
+            if isinstance(events, np.ndarray):
+                files = core_files(self.fname.ext_events,
+                                   np.unique(events['core']))
+            else:
+                files = core_files(self.fname.ext_events, events.keys())
+            h = hashlib.sha1()
+            update_events_digest(h, events)
+            if changed('ext_events', files, h.hexdigest(), cfg.sim_ticks,
+                       cfg.N_CORES, cfg.replicas):
+                self.write_ext_events()
+
+        if cfg.ext_rates and changed(
+                'ext_rates', core_files(self.fname.ext_rates, cfg.ext_rates),
+                cfg.ext_rates):
+            self.write_ext_rates()
+
+        if cfg.ext_dataset and changed(
+                'ext_dataset',
+                core_files(self.fname.ext_dataset, cfg.ext_dataset),
+                cfg.ext_dataset):
+            self.write_ext_dataset()
 
         if write_weights:
-            self.write_L0connectivity()
-            self.write_L1connectivity()
+            ptr_cores = [p for p, c in cfg if p not in cfg.replicas and
+                         changed('ptr_table_core_{0}'.format(p),
+                                 core_files(self.fname.syn_ptr_table, [p]),
+                                 c.ptr_table, c.n_units, c.n_states)]
+            wgt_cores = [p for p, c in cfg if p not in cfg.replicas and
+                         changed('wgt_table_core_{0}'.format(p),
+                                 core_files(self.fname.syn_wgt_table, [p]),
+                                 c.wgt_table)]
+            if ptr_cores:
+                self.write_L0_ptr_table(ptr_cores)
+            if wgt_cores:
+                self.write_L0_wgt_table(wgt_cores)
+            if changed('L1', [self.fname.l1_conn], cfg.L1_connectivity,
+                       cfg.replicas):
+                self.write_L1connectivity()
+
+        # The files stats are taken once the sections are written
+        for entry in new.values():
+            if 'files' in entry:
+                entry['stats'] = {f: file_stats(f)
+                                  for f in entry.pop('files')}
+        with open(self.fingerprints_fname, 'w') as f:
+            json.dump({'version': version, 'sections': new}, f, indent=1,
+                      sort_keys=True)
 
 
 class c_nsat_fnames(Structure):
@@ -87,7 +380,13 @@ class c_nsat_fnames(Structure):
                 ('stats_nsat', c_char_p),
                 ('stats_ext', c_char_p),
                 ('l1_conn', c_char_p),
-                ('shared_mem', c_char_p)]
+                ('shared_mem', c_char_p),
+                ('spk_counts', c_char_p),
+                ('ext_rates', c_char_p),
+                ('ext_dataset', c_char_p),
+                ('decisions', c_char_p),
+                ('profile', c_char_p),
+                ('trace', c_char_p)]
 
 
 class C_NSATWriter(NSATWriter):
@@ -111,6 +410,12 @@ class C_NSATWriter(NSATWriter):
         fname.stats_ext = (path + "_stats_ext").encode('utf-8')
         fname.l1_conn = (path + "_l1_conn.dat").encode('utf-8')
         fname.shared_mem = (path + "_shared_mem").encode('utf-8')
+        fname.spk_counts = (path + "_spk_counts").encode('utf-8')
+        fname.ext_rates = (path + "_ext_rates").encode('utf-8')
+        fname.ext_dataset = (path + "_ext_dataset").encode('utf-8')
+        fname.decisions = (path + "_decisions.dat").encode('utf-8')
+        fname.profile = (path + "_profile.dat").encode('utf-8')
+        fname.trace = (path + "_trace.json").encode('utf-8')
         return fname
 
     def write_globals(self):
@@ -123,6 +428,13 @@ class C_NSATWriter(NSATWriter):
         *inputs*: fnames
         *outputs*: None
         '''
+        self.write_params()
+        self.write_maps()
+
+    def write_params(self):
+        '''
+        Writes the global, cores, NSAT, learning and monitors parameters.
+        '''
         cfg = self.cfg
         with open(self.fname.params, 'wb') as fh:
             # Global parameters
@@ -138,12 +450,26 @@ class C_NSATWriter(NSATWriter):
             fh.write(pack(cfg.is_clock_on, '?'))
             fh.write(pack(cfg.w_check, '?'))
             fh.write(pack(cfg.w_boundary, 'i'))
+            fh.write(pack(cfg.spk_chunk_size, 'Q'))
+            fh.write(pack(SPK_FORMATS[cfg.spk_format], 'I'))
+            fh.write(pack(cfg.inference_workers, 'I'))
+            fh.write(pack(cfg.decision_core, 'I'))
+            fh.write(pack(cfg.decision_lead, 'Q'))
+            fh.write(pack(cfg.decision_count, 'Q'))
+            fh.write(pack(cfg.is_profile_on, '?'))
+            fh.write(pack(cfg.trace_stride, 'Q'))
+            fh.write(pack(cfg.trace_size, 'Q'))
 
             # Core parameters
             for p, core_cfg in cfg:
                 fh.write(pack(cfg.ext_evts, '?'))
                 fh.write(pack(cfg.plasticity_en[p], '?'))
                 fh.write(pack(cfg.gated_learning[p], '?'))
+                fh.write(pack(cfg.base_core(p) in cfg.ext_rates, '?'))
+                fh.write(pack(cfg.base_core(p) in cfg.ext_dataset, '?'))
+                replica_of, own_weights = cfg.replicas.get(p, (-1, False))
+                fh.write(pack(replica_of, 'i'))
+                fh.write(pack(own_weights, '?'))
                 fh.write(pack(core_cfg.n_inputs, 'Q'))
                 fh.write(pack(core_cfg.n_neurons, 'Q'))
                 fh.write(pack(core_cfg.n_states, 'I'))
@@ -209,6 +535,12 @@ class C_NSATWriter(NSATWriter):
                 fh.write(pack(cfg.monitor_weights_final, '?'))
                 fh.write(pack(cfg.monitor_spikes, '?'))
                 fh.write(pack(cfg.monitor_stats, '?'))
+                fh.write(pack(len(cfg.get_states_rec_mon(p)), 'I'))
+                fh.write(pack(cfg.get_states_rec_mon(p), 'I'))
+                fh.write(pack(cfg.states_rec_stride[p], 'Q'))
+                fh.write(pack(cfg.spk_count_window, 'Q'))
+                fh.write(pack(len(cfg.get_spk_count_mon(p)), 'Q'))
+                fh.write(pack(cfg.get_spk_count_mon(p), 'Q'))
 
             """ Thee following generates the mapping function.
                 Fow now this is a vector with numbers in [0, 8),
@@ -225,7 +557,12 @@ class C_NSATWriter(NSATWriter):
                     neurons but it's not recommended.
             """
 
-            # nmap = np.zeros((num_neurons, ), dtype='i')
+    def write_maps(self):
+        '''
+        Writes the NSAT and learning parameters groups maps.
+        '''
+        cfg = self.cfg
+        # nmap = np.zeros((num_neurons, ), dtype='i')
         with open(self.fname.nsat_params_map, 'wb') as f:
             for p, core_cfg in cfg:
                 f.write(pack(core_cfg.nmap, 'i'))
@@ -241,65 +578,75 @@ class C_NSATWriter(NSATWriter):
                 lrnmap_unrolled = lrnmap_unrolled.flatten()
                 f.write(pack(lrnmap_unrolled, 'i'))
 
-    def _find_first(self, a, i):
-        for j, v in enumerate(a):
-            if v == i:
-                return j
-
     def write_ext_events(self):
-        if self.cfg.ext_evts_data == True:
+        if self.cfg.ext_evts_data is True:
             return
-        from collections import Counter
         cfg = self.cfg
         events = cfg.ext_evts_data
-        for core in list(events.keys()):
-            events[core].sort_tm()
-            ad, tm = events[core].get_adtm()
-            tm_count = Counter(tm)
-            tms = list(range(1, cfg.sim_ticks))
-            pos_t = 0
+        if isinstance(events, np.ndarray):
+            per_core = split_ext_events(events, cfg.N_CORES)
+        else:
+            per_core = []
+            for core in list(events.keys()):
+                events[core].sort_tm()
+                ad, tm = events[core].get_adtm()
+                per_core.append((core, tm, ad))
+        for core, tm, ad in per_core:
+            if core in cfg.replicas:
+                # Replicas read the events of their core
+                continue
             filename = self.fname.ext_events + \
                 ('_core_' + str(core) + '.dat').encode('utf-8')
             with open(filename, 'wb') as fe:
-                for t in tms:
-                    tc = tm_count[t]
-                    fe.write(pack([t, tc], 'Q'))
-                    if tc > 0:
-                        delta_pos = self._find_first(tm[pos_t:], t)
-                        data = ad[(pos_t + delta_pos):(pos_t + delta_pos + tc)]
-                        pos_t = pos_t + delta_pos + tc
-                        fe.write(pack(data, 'Q'))
+                fe.write(pack_ext_events(tm, ad, cfg.sim_ticks))
+
+    def write_ext_rates(self):
+        for core, (rates, t_sample, t_start) in self.cfg.ext_rates.items():
+            filename = self.fname.ext_rates + \
+                ('_core_' + str(core) + '.dat').encode('utf-8')
+            with open(filename, 'wb') as fr:
+                fr.write(pack_ext_rates(rates, t_sample, t_start))
+
+    def write_ext_dataset(self):
+        for core, (data, schedule, max_rate, regular) in \
+                self.cfg.ext_dataset.items():
+            if (isinstance(data, np.memmap) and
+                    isinstance(data.base, mmap.mmap) and
+                    data.flags.c_contiguous):
+                # The whole file is mapped by the engine, no copy
+                path, offset = data.filename, data.offset
+            else:
+                path = self.fname.ext_dataset + \
+                    ('_data_core_' + str(core) + '.dat').encode('utf-8')
+                path, offset = path.decode('utf-8'), 0
+                np.ascontiguousarray(data, dtype='uint8').tofile(path)
+            filename = self.fname.ext_dataset + \
+                ('_core_' + str(core) + '.dat').encode('utf-8')
+            with open(filename, 'wb') as fd:
+                fd.write(pack_ext_dataset(path, offset, data.shape, schedule,
+                                          max_rate, regular))
 
     def write_L0connectivity(self):
         self.write_L0_ptr_table()
         self.write_L0_wgt_table()
 
-    def write_L0_ptr_table(self):
+    def write_L0_ptr_table(self, cores=None):
         for p, core_cfg in self.cfg:
-            from scipy.sparse import issparse
+            if p in self.cfg.replicas or (cores is not None and
+                                          p not in cores):
+                continue
             filename = self.fname.syn_ptr_table + \
                 ('_core_' + str(p) + '.dat').encode('utf-8')
             with open(filename, 'wb') as fw:
-                if issparse(core_cfg.ptr_table):
-                    cw = core_cfg.ptr_table.tocoo()
-                    nonzero_elems = cw.nnz
-                    src_nrn = cw.row.astype('uint64').astype('uint64')
-                    dst_nrn = (cw.col % core_cfg.n_units).astype('uint64')
-                    dst_state = (cw.col // core_cfg.n_units).astype('uint64')
-                    ptr_data = np.column_stack(
-                        [src_nrn, dst_nrn, dst_state, cw.data])
-                    fw.write(pack(nonzero_elems, 'Q'))
-                    fw.write(pack(ptr_data, 'Q'))
-                else:  # Non sparse compatibility
-                    cw = core_cfg.ptr_table
-                    nonzero_elems = np.count_nonzero(cw)
-                    c0 = np.argwhere(np.array(cw) != 0)
-                    c1 = cw[np.array(cw) != 0]
-                    c = np.column_stack([c0, c1])
-                    fw.write(pack(c, 'Q'))
-
-    def write_L0_wgt_table(self):
+                fw.write(pack_ptr_table(core_cfg.ptr_table,
+                                        core_cfg.n_units,
+                                        core_cfg.n_states))
+
+    def write_L0_wgt_table(self, cores=None):
         for p, core_cfg in self.cfg:
+            if p in self.cfg.replicas or (cores is not None and
+                                          p not in cores):
+                continue
             filename = self.fname.syn_wgt_table + \
                 ('_core_' + str(p) + '.dat').encode('utf-8')
             with open(filename, 'wb') as fw:
@@ -307,6 +654,11 @@ class C_NSATWriter(NSATWriter):
 
     def write_L1connectivity(self):
         L1 = self.cfg.L1_connectivity
+        if self.cfg.replicas:
+            # The replicas receive the spikes sent to their core
+            L1 = {src: list(dsts) + [(r, dst[1]) for dst in dsts
+                                     for r in self.cfg.get_replicas(dst[0])]
+                  for src, dsts in L1.items()}
         with open(self.fname.l1_conn, 'wb') as fw:
             fw.write(pack(len(L1), 'i'))
             for src, dsts in L1.items():
@@ -349,25 +701,18 @@ class C_NSATWriterSingleThread(C_NSATWriter):
     def write_ext_events(self):
         if self.cfg.ext_evts_data is True:
             return
-        from collections import Counter
         cfg = self.cfg
         events = cfg.ext_evts_data
-        ad, tm = events.flatten().get_adtm()
-        tm_count = Counter(tm)
-        tms = list(range(1, cfg.sim_ticks))
-        pos_t = 0
-        filename = self.fname.ext_events
-        with open(filename, 'wb') as fe:
-            for t in tms:
-                tc = tm_count[t]
-                fe.write(pack([t, tc], 'Q'))
-                if tc > 0:
-                    delta_pos = self._find_first(tm[pos_t:], t)
-                    data = ad[(pos_t + delta_pos):(pos_t + delta_pos + tc)]
-                    pos_t = pos_t + delta_pos + tc
-                    data = list(
-                        zip(data >> CHANNEL_OFFSET, data & (ADDR_MASK)))
-                    fe.write(pack(data, 'Q'))
+        if isinstance(events, np.ndarray):
+            events = events[np.lexsort((events['addr'], events['core'],
+                                        events['time']))]
+            tm = events['time']
+            data = np.column_stack([events['core'], events['addr']])
+        else:
+            ad, tm = events.flatten().get_adtm()
+            data = np.column_stack([ad >> CHANNEL_OFFSET, ad & ADDR_MASK])
+        with open(self.fname.ext_events, 'wb') as fe:
+            fe.write(pack_ext_events(tm, data, cfg.sim_ticks))
 
 
 def read_from_file(fname):
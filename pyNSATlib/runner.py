@@ -0,0 +1,194 @@
+#!/bin/python
+# ---------------------------------------------------------------------------
+# File Name : runner.py
+# Purpose: Runs batches of NSAT simulations in worker processes, with cached
+# results
+#
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import os
+import sys
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from .NSATlib import run_c_nsat, find_nsat_library
+from .nsat_writer import C_NSATWriter, update_digest, update_events_digest
+from .nsat_reader import C_NSATReader
+
+# Written in the directory of an experiment once it ran successfully
+DONE_FNAME = 'done'
+
+# Directory of the pyNSATlib package, added to the path of the workers
+_PKG_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Body of the worker processes
+_WORKER_CODE = ('import sys; from pyNSATlib.runner import _run_job; '
+                '_run_job(sys.argv[1], sys.argv[2])')
+
+# Digests of the NSAT libraries, by path, size and modification time
+_lib_digests = {}
+
+
+def library_digest():
+    '''
+    Returns the sha1 digest of the NSAT library (see find_nsat_library), so
+    that rebuilding the simulator invalidates the cached results.
+    '''
+    path = find_nsat_library()
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime)
+    if key not in _lib_digests:
+        with open(path, 'rb') as f:
+            _lib_digests[key] = hashlib.sha1(f.read()).hexdigest()
+    return _lib_digests[key]
+
+
+def config_digest(cfg):
+    '''
+    Returns the sha1 digest of the contents of a configuration: its
+    pickled members (see ConfigurationNSAT.PKL_MEMBERS), its inputs
+    (external events, rates and datasets) and the NSAT library.
+    '''
+    if not cfg.groups_set:
+        cfg.set_groups()
+    h = hashlib.sha1()
+    update_digest(h, cfg.__getstate__())
+    update_events_digest(h, cfg.ext_evts_data)
+    update_digest(h, cfg.ext_rates)
+    update_digest(h, cfg.ext_dataset)
+    h.update(library_digest().encode('utf-8'))
+    return h.hexdigest()
+
+
+def _run_job(path, prefix):
+    '''
+    Runs the simulation written in *path* and marks it as done. This is the
+    body of the worker processes (see _run_worker).
+    '''
+    fname = C_NSATWriter(None, path, prefix).fname
+    flag = run_c_nsat(fname)
+    with open(os.path.join(path, DONE_FNAME), 'w') as f:
+        f.write(str(flag))
+    return flag
+
+
+def _run_worker(path, prefix):
+    '''
+    Runs the simulation written in *path* in its own process, so that a
+    simulation that exits or crashes (e.g. an invalid configuration) only
+    fails its own job. Raises RuntimeError if the process fails.
+    '''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [_PKG_ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+    proc = subprocess.run([sys.executable, '-c', _WORKER_CODE, path, prefix],
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          env=env)
+    if proc.returncode != 0 or \
+            not os.path.exists(os.path.join(path, DONE_FNAME)):
+        output = proc.stdout.decode('utf-8', 'replace').strip()
+        raise RuntimeError('Simulation {0} failed (exit status {1}):\n{2}'
+                           .format(path, proc.returncode,
+                                   '\n'.join(output.split('\n')[-20:])))
+    return proc.returncode
+
+
+class LazyReader(object):
+    '''
+    Reader of the results of an experiment (see run_experiments). The
+    C_NSATReader is created on first use, once the simulation is done, and
+    its methods are available on the LazyReader.
+    '''
+
+    def __init__(self, cfg, path, prefix='sim', future=None):
+        self.cfg = cfg
+        self.path = path
+        self.prefix = prefix
+        self.cached = future is None
+        self._future = future
+        self._reader = None
+
+    def done(self):
+        '''
+        Returns True if the simulation is done.
+        '''
+        return self._future is None or self._future.done()
+
+    def wait(self):
+        '''
+        Waits for the simulation. Its errors are raised here.
+        '''
+        if self._future is not None:
+            self._future.result()
+            self._future = None
+
+    def error(self):
+        '''
+        Waits for the simulation and returns its error (RuntimeError if the
+        simulation failed), or None if it succeeded.
+        '''
+        if self._future is None:
+            return None
+        return self._future.exception()
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self.wait()
+            fname = C_NSATWriter(self.cfg, self.path, self.prefix).fname
+            self._reader = C_NSATReader(self.cfg, fname)
+        return self._reader
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.reader, name)
+
+
+def run_experiments(cfgs, path, inputs=None, n_workers=None, prefix='sim',
+                    cache=True):
+    '''
+    Runs a batch of configurations in *n_workers* worker processes at a time
+    (the number of CPUs by default), one process per configuration, so that
+    a failed simulation does not affect the others. Every configuration runs in the directory
+    path/<digest>, where <digest> is the digest of the configuration and
+    its inputs (see config_digest). The results of a directory that holds a
+    finished run are reused instead of running the configuration again.
+    Inputs:
+    *cfgs*: list of ConfigurationNSAT
+    *path*: root directory of the experiments
+    *inputs*: list of external events (see ConfigurationNSAT.set_ext_events),
+    one per configuration. None keeps the events of the configurations.
+    *cache*: if False, the configurations run even if their results exist
+    Returns a list of LazyReader, one per configuration. The function
+    returns once the simulations are submitted, the readers wait for them
+    and raise the errors of the failed simulations (see LazyReader.error).
+    '''
+    if inputs is not None:
+        if len(inputs) != len(cfgs):
+            raise ValueError('inputs must have one entry per configuration')
+        for cfg, evts in zip(cfgs, inputs):
+            if evts is not None:
+                cfg.set_ext_events(evts)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    readers, jobs = [], {}
+    executor = None
+    for cfg in cfgs:
+        digest = config_digest(cfg)
+        job_path = os.path.join(path, digest)
+        if digest not in jobs:
+            if cache and os.path.exists(os.path.join(job_path, DONE_FNAME)):
+                jobs[digest] = None
+            else:
+                if os.path.exists(os.path.join(job_path, DONE_FNAME)):
+                    os.remove(os.path.join(job_path, DONE_FNAME))
+                os.makedirs(job_path, exist_ok=True)
+                C_NSATWriter(cfg, job_path, prefix).write()
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=n_workers)
+                jobs[digest] = executor.submit(_run_worker, job_path, prefix)
+        readers.append(LazyReader(cfg, job_path, prefix, jobs[digest]))
+    if executor is not None:
+        executor.shutdown(wait=False)
+    return readers
@@ -0,0 +1,212 @@
+#!/bin/python
+# ---------------------------------------------------------------------------
+# File Name : spikes.py
+# Purpose: Lightweight spike trains container backed by numpy arrays
+#
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+
+
+class SpikeArray(object):
+    '''
+    Spike trains of a population stored as two numpy arrays (times, ids)
+    sorted by time and id. It provides the SpikeList operations used on the
+    hot paths (rates, binning, slicing, per neuron split) without building
+    one SpikeTrain object per neuron. Use to_spikelist() to get a pyST
+    SpikeList.
+    inputs:
+    *times*: spike times (ticks)
+    *ids*: neuron ids of the spikes
+    *id_list*: neuron ids of the population (optional). Spikes of other ids
+    are dropped. If None, the ids found in *ids* are used.
+    *t_start*, *t_stop*: time interval of the spike trains. If *t_stop* is
+    None, the last spike time is used.
+    *presorted*: set True if the spikes are already sorted by (time, id)
+    '''
+
+    def __init__(self, times, ids, id_list=None, t_start=0, t_stop=None,
+                 presorted=False):
+        times = np.asarray(times)
+        ids = np.asarray(ids, dtype='int64')
+        if id_list is None:
+            id_list = np.unique(ids)
+        else:
+            id_list = np.unique(np.asarray(id_list, dtype='int64'))
+            keep = np.isin(ids, id_list)
+            if not keep.all():
+                times, ids = times[keep], ids[keep]
+        if not presorted:
+            order = np.lexsort((ids, times))
+            times, ids = times[order], ids[order]
+        self.times = times
+        self.ids = ids
+        self._id_list = id_list
+        self.t_start = t_start
+        if t_stop is None:
+            t_stop = times[-1] if len(times) > 0 else t_start
+        self.t_stop = t_stop
+
+    @classmethod
+    def from_spikelist(cls, spikelist):
+        '''
+        Builds a SpikeArray from a pyST SpikeList.
+        '''
+        times, ids = spikelist.convert('[times, ids]')
+        return cls(times, ids, id_list=spikelist.id_list(),
+                   t_start=spikelist.t_start, t_stop=spikelist.t_stop)
+
+    def to_spikelist(self):
+        '''
+        Returns the spike trains as a pyST SpikeList.
+        '''
+        from pyNCSre.pyST.spikes import SpikeList
+        SL = SpikeList(np.column_stack([self.ids, self.times]).astype('float'),
+                       self._id_list)
+        SL.t_start = self.t_start
+        SL.t_stop = self.t_stop
+        return SL
+
+    def __len__(self):
+        return len(self._id_list)
+
+    def __getitem__(self, id):
+        return self.times[self.ids == id]
+
+    @property
+    def n_spikes(self):
+        return len(self.times)
+
+    def id_list(self):
+        '''
+        Returns the sorted neuron ids of the population.
+        '''
+        return self._id_list
+
+    def _rows(self, ids):
+        return np.searchsorted(self._id_list, ids)
+
+    def raw_data(self):
+        '''
+        Returns an array of shape (n_spikes, 2) with columns (time, id).
+        '''
+        return np.column_stack([self.times, self.ids]).astype('float')
+
+    def convert(self, format='[times, ids]'):
+        '''
+        Returns [times, ids] or [ids, times] depending on *format*.
+        '''
+        if format == '[times, ids]':
+            return [self.times, self.ids]
+        if format == '[ids, times]':
+            return [self.ids, self.times]
+        raise ValueError('Format must be "[times, ids]" or "[ids, times]"')
+
+    def complete(self, id_list):
+        '''
+        Adds the neurons of *id_list* to the population (in place).
+        '''
+        self._id_list = np.union1d(self._id_list,
+                                   np.asarray(id_list, dtype='int64'))
+
+    def split(self):
+        '''
+        Returns a dictionary with the spike times of every neuron.
+        '''
+        order = np.argsort(self.ids, kind='stable')
+        ids = self.ids[order]
+        lo = np.searchsorted(ids, self._id_list, side='left')
+        hi = np.searchsorted(ids, self._id_list, side='right')
+        return {id: self.times[order[l:h]]
+                for id, l, h in zip(self._id_list, lo, hi)}
+
+    def time_slice(self, t_start, t_stop):
+        '''
+        Returns the spikes in [t_start, t_stop] as a new SpikeArray.
+        '''
+        lo = np.searchsorted(self.times, t_start, side='left')
+        hi = np.searchsorted(self.times, t_stop, side='right')
+        return SpikeArray(self.times[lo:hi], self.ids[lo:hi],
+                          id_list=self._id_list, t_start=t_start,
+                          t_stop=t_stop, presorted=True)
+
+    def id_slice(self, id_list):
+        '''
+        Returns the spikes of the neurons in *id_list* as a new SpikeArray.
+        '''
+        return SpikeArray(self.times, self.ids, id_list=id_list,
+                          t_start=self.t_start, t_stop=self.t_stop,
+                          presorted=True)
+
+    def time_axis(self, time_bin):
+        '''
+        Returns the bins edges between t_start and t_stop (as pyST).
+        '''
+        return np.arange(self.t_start, self.t_stop + time_bin, time_bin)
+
+    def spike_histogram(self, time_bin, normalized=False):
+        '''
+        Returns the spike counts of every neuron per time bin, an array of
+        shape (neurons, bins). If *normalized* the counts are in Hz.
+        '''
+        edges = self.time_axis(time_bin)
+        n_bins = len(edges) - 1
+        hist = np.zeros((len(self), max(n_bins, 0)), dtype='float')
+        if n_bins <= 0 or len(self.times) == 0:
+            return hist
+        # Same binning as numpy.histogram, last bin includes its right edge
+        bins = np.searchsorted(edges, self.times, side='right') - 1
+        bins[self.times == edges[-1]] = n_bins - 1
+        valid = (bins >= 0) & (bins < n_bins)
+        flat = self._rows(self.ids[valid]) * n_bins + bins[valid]
+        hist += np.bincount(flat, minlength=hist.size).reshape(hist.shape)
+        if normalized and isinstance(time_bin, int):
+            hist *= 1000.0 / time_bin
+        return hist
+
+    def firing_rate(self, time_bin, average=False):
+        '''
+        Returns the firing rates (Hz) of every neuron per time bin, or the
+        population average if *average*.
+        '''
+        rates = self.spike_histogram(time_bin, normalized=True)
+        if average:
+            return np.mean(rates, axis=0)
+        return rates
+
+    def mean_rates(self, t_start=None, t_stop=None):
+        '''
+        Returns the mean firing rate (Hz) of every neuron between t_start and
+        t_stop (the whole spike trains by default).
+        '''
+        if t_start is None and t_stop is None:
+            ids = self.ids
+            t_start, t_stop = self.t_start, self.t_stop
+        else:
+            t_start = self.t_start if t_start is None else max(self.t_start,
+                                                               t_start)
+            t_stop = self.t_stop if t_stop is None else min(self.t_stop,
+                                                            t_stop)
+            ids = self.time_slice(t_start, t_stop).ids
+        counts = np.bincount(self._rows(ids), minlength=len(self))
+        return 1000. * counts / (t_stop - t_start)
+
+    def raster_plot(self, id_list=None, t_start=None, t_stop=None,
+                    display=True, kwargs={}):
+        '''
+        Plots the spikes (time, id) with matplotlib.
+        '''
+        import matplotlib.pyplot as plt
+        sa = self
+        if id_list is not None:
+            sa = sa.id_slice(id_list)
+        if t_start is not None or t_stop is not None:
+            sa = sa.time_slice(self.t_start if t_start is None else t_start,
+                               self.t_stop if t_stop is None else t_stop)
+        ax = plt.gca() if display is True else display
+        kwargs = dict({'marker': '|', 'linestyle': 'None', 'color': 'k'},
+                      **kwargs)
+        ax.plot(sa.times, sa.ids, **kwargs)
+        ax.set_xlabel('Time (ms)')
+        ax.set_ylabel('Neuron #')
+        return ax
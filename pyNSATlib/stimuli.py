@@ -0,0 +1,309 @@
+#!/bin/python
+# ---------------------------------------------------------------------------
+# File Name : stimuli.py
+# Purpose: Vectorized, seedable generation of input spike trains
+#
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+from .utils import sample_distinct, seeded_rng
+
+# Number of (tick, train) cells drawn at once by the generators
+STIM_CHUNK_SIZE = 2**22
+
+
+def _events(times, addrs, t_offset=0):
+    '''
+    Returns the events as an array of shape (n, 2) with columns (time, addr)
+    sorted by time and address. Events before 0 are dropped.
+    '''
+    if len(times) == 0:
+        return np.zeros([0, 2], dtype='int64')
+    times = np.concatenate(times).astype('int64') + t_offset
+    addrs = np.concatenate(addrs).astype('int64')
+    keep = times >= 0
+    times, addrs = times[keep], addrs[keep]
+    order = np.lexsort((addrs, times))
+    return np.column_stack([times[order], addrs[order]])
+
+
+def _bernoulli_keys(p, n_ticks, base, stride, rng):
+    # Spikes of Bernoulli trains in O(spikes): the number of spikes of every
+    # train is binomial and the spikes fall on distinct ticks drawn
+    # uniformly. Returns the sorted keys base[train] + stride*tick.
+    return sample_distinct(rng.binomial(n_ticks, p), n_ticks, base, stride,
+                           rng)
+
+
+def _renewal_ticks(p, n_ticks, refractory, rng):
+    # Spikes of Bernoulli trains with a dead time, the inter-spike intervals
+    # are refractory + geometric(p). Returns unsorted (ticks, trains).
+    active = np.nonzero(p > 0)[0]
+    n_max = n_ticks // (refractory + 1) + 1
+    gaps = rng.geometric(p[active], size=(n_max, len(active)))
+    # Gaps beyond the end are equivalent, avoids overflows for tiny p
+    np.minimum(gaps, n_ticks + 1, out=gaps)
+    gaps[1:] += refractory
+    t = np.cumsum(gaps, axis=0) - 1
+    keep = t < n_ticks
+    return t[keep], active[np.nonzero(keep)[1]]
+
+
+def bernoulli_trains(p, n_ticks, refractory=0, seed=None):
+    '''
+    Discrete time Poisson (Bernoulli) spike trains with an optional dead time.
+    inputs:
+    *p*: spike probability per tick of every train, array of shape (m,)
+    *n_ticks*: duration of the trains
+    *refractory*: number of silent ticks after every spike. The inter-spike
+    intervals are then refractory + geometric(p).
+    outputs:
+    ticks, trains arrays of the spikes sorted by (tick, train)
+    '''
+    rng = seeded_rng(seed)
+    p = np.clip(np.asarray(p, dtype='float').ravel(), 0, 1)
+    n_ticks, refractory = int(n_ticks), int(refractory)
+    m = len(p)
+    if m == 0 or n_ticks <= 0:
+        return np.zeros(0, 'int64'), np.zeros(0, 'int64')
+    if refractory > 0:
+        ticks, trains = _renewal_ticks(p, n_ticks, refractory, rng)
+        keys = np.sort(ticks * m + trains)
+    else:
+        keys = _bernoulli_keys(p, n_ticks, np.arange(m), m, rng)
+    return np.divmod(keys, m)
+
+
+def regular_trains(rates, n_ticks, seed=None):
+    '''
+    Regular spike trains with a random phase, as pyST regular_generator with
+    jitter=True.
+    inputs:
+    *rates*: firing rate (Hz) of every train, array of shape (m,)
+    *n_ticks*: duration of the trains (ms)
+    outputs:
+    ticks, trains arrays of the spikes sorted by (tick, train)
+    '''
+    rng = seeded_rng(seed)
+    rates = np.asarray(rates, dtype='float').ravel()
+    active = np.nonzero(rates > 0)[0]
+    period = 1000. / rates[active]
+    phase = rng.random(len(active)) * period
+    counts = np.maximum(np.ceil((n_ticks - phase) / period), 0).astype('int64')
+    train = np.repeat(np.arange(len(active)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    ticks = np.floor(k * period[train] + phase[train]).astype('int64')
+    # Rates above 1 kHz give several spikes per tick, keep one
+    keep = np.ones(len(ticks), dtype='bool')
+    keep[1:] = (ticks[1:] != ticks[:-1]) | (train[1:] != train[:-1])
+    ticks, trains = ticks[keep], active[train[keep]]
+    order = np.lexsort((trains, ticks))
+    return ticks[order], trains[order]
+
+
+def poisson_trains(rates, t_sample, refractory=0, regular=None, t_start=0,
+                   seed=None, chunk_size=STIM_CHUNK_SIZE):
+    '''
+    Rate coded Poisson spike trains, one sample of rates every *t_sample*
+    ticks. Generator of time sorted chunks of events, each an array of shape
+    (n, 2) with columns (time, addr). Chunks cover consecutive samples.
+    inputs:
+    *rates*: firing rates (Hz) of shape (n_samples, n_inputs) or (n_inputs,)
+    *t_sample*: duration of a sample (ticks)
+    *refractory*: dead time of the Poisson trains (ticks)
+    *regular*: indices of the inputs encoded with regular trains with a
+    random phase instead of Poisson trains (e.g. labels)
+    *t_start*: time of the first sample
+    *chunk_size*: approximate number of (tick, input) cells per chunk
+    '''
+    rng = seeded_rng(seed)
+    rates = np.atleast_2d(np.asarray(rates, dtype='float'))
+    n_samples, n_inputs = rates.shape
+    t_sample, refractory = int(t_sample), int(refractory)
+    is_regular = np.zeros(n_inputs, dtype='bool')
+    if regular is not None:
+        is_regular[regular] = True
+    poisson_ids = np.nonzero(~is_regular)[0]
+    regular_ids = np.nonzero(is_regular)[0]
+    per_chunk = max(1, chunk_size // max(t_sample * n_inputs, 1))
+    for s0 in range(0, n_samples, per_chunk):
+        r = rates[s0:s0 + per_chunk]
+        # Spikes of all the (sample, input) trains of the chunk as sorted
+        # keys (sample*t_sample + tick)*n_inputs + addr
+        s, a = np.divmod(np.arange(len(r) * len(poisson_ids)),
+                         len(poisson_ids) or 1)
+        base = s * t_sample * n_inputs + poisson_ids[a]
+        p = np.clip(r[:, poisson_ids].ravel() * 1e-3, 0, 1)
+        if refractory > 0:
+            t, c = _renewal_ticks(p, t_sample, refractory, rng)
+            keys = np.sort(base[c] + t * n_inputs)
+        else:
+            keys = _bernoulli_keys(p, t_sample, base, n_inputs, rng)
+        if len(regular_ids) > 0:
+            t, c = regular_trains(r[:, regular_ids], t_sample, rng)
+            s, a = np.divmod(c, len(regular_ids))
+            reg = np.sort((s * t_sample + t) * n_inputs + regular_ids[a])
+            keys = np.insert(keys, np.searchsorted(keys, reg), reg)
+        yield np.column_stack([t_start + s0 * t_sample + keys // n_inputs,
+                               keys % n_inputs])
+
+
+def embedded_pattern(n_inputs, rate, t_stop, patterns, pf=5.0, pd=None,
+                     jitter=0, seed=None):
+    '''
+    Poisson noise of *rate* Hz on *n_inputs* inputs, interrupted by
+    presentations of spike patterns. Noise windows last an exponential
+    duration of mean 1000/pf - pd (at least max(250/pf, pd)) ticks, patterns
+    are presented in a random order, all once before any repeats.
+    inputs:
+    *patterns*: list of patterns, each an array of shape (m, 2) with columns
+    (time, addr) relative to the pattern onset, or a list of such arrays
+    among which one is picked at random at every presentation
+    *pd*: nominal pattern duration (the longest pattern by default)
+    *jitter*: spike times of the patterns are shifted by integers in
+    [-jitter, jitter]
+    outputs:
+    events array of shape (n, 2) with columns (time, addr),
+    onsets, pattern indices and durations of the presentations.
+    Presentations start before t_stop, the last one can end after it.
+    '''
+    rng = seeded_rng(seed)
+    variants = [[np.asarray(v, dtype='int64').reshape(-1, 2) for v in p]
+                if isinstance(p, (list, tuple)) else
+                [np.asarray(p, dtype='int64').reshape(-1, 2)]
+                for p in patterns]
+    flat = [v for p in variants for v in p]
+    first = np.cumsum([0] + [len(p) for p in variants])
+    durations = np.array([v[:, 0].max() + 1 if len(v) else 0 for v in flat])
+    lengths = np.array([len(v) for v in flat])
+    if pd is None:
+        pd = durations.max()
+    mint = max(1, int(max(1000.0 / pf * 0.25, pd)))
+
+    # Every presentation lasts at least mint ticks
+    n_max = int(t_stop) // mint + 1
+    nd = np.maximum(rng.exponential(max(1000.0 / pf - pd, 0), n_max)
+                    .astype('int64'), mint)
+    n_pat = len(variants)
+    labels = np.argsort(rng.random((n_max // n_pat + 1, n_pat)),
+                        axis=1).ravel()[:n_max]
+    n_var = first[labels + 1] - first[labels]
+    which = first[labels] + (rng.random(n_max) * n_var).astype('int64')
+    ends = np.cumsum(nd + durations[which])
+    starts = ends - nd - durations[which]
+    n = np.searchsorted(starts, t_stop, side='left')
+    nd, labels, which, starts = nd[:n], labels[:n], which[:n], starts[:n]
+    onsets = starts + nd
+
+    # Noise during the noise windows only
+    noise_end = np.cumsum(nd)
+    t, noise_addrs = bernoulli_trains(np.full(n_inputs, rate * 0.001),
+                                      noise_end[-1] if n else 0, 0, rng)
+    seg = np.searchsorted(noise_end, t, side='right')
+    noise_times = t - (noise_end - nd)[seg] + starts[seg]
+
+    counts = lengths[which]
+    pat = np.concatenate([flat[k] for k in which]) if n else \
+        np.zeros([0, 2], dtype='int64')
+    pat_times = pat[:, 0] + np.repeat(onsets, counts) + \
+        rng.integers(-jitter, jitter + 1, len(pat))
+    events = _events([noise_times, pat_times], [noise_addrs, pat[:, 1]])
+    return events, onsets, labels, durations[which]
+
+
+def coincidence_pattern(n_inputs, rate, t_stop, pf=50, frac=0.2, jitter=1,
+                        seed=None):
+    '''
+    The first int(frac*n_inputs) inputs spike together (each jittered by
+    integers in [-jitter, jitter]) at Poisson times of rate *pf* Hz at least
+    500/pf ticks apart. The other inputs are Poisson trains of *rate* Hz.
+    outputs:
+    events array of shape (n, 2) with columns (time, addr),
+    onsets of the coincident spikes
+    '''
+    rng = seeded_rng(seed)
+    n_co = int(n_inputs * frac)
+    onsets, _ = bernoulli_trains([pf * 0.001], t_stop, int(500. / pf), rng)
+    co_times = np.repeat(onsets, n_co) + \
+        rng.integers(-jitter, jitter + 1, len(onsets) * n_co)
+    co_addrs = np.tile(np.arange(n_co), len(onsets))
+    t, a = bernoulli_trains(np.full(n_inputs - n_co, rate * 0.001), t_stop,
+                            0, rng)
+    events = _events([co_times, t], [co_addrs, a + n_co])
+    return events, onsets
+
+
+def correlated_trains(C, t_stop, tau_c=10, dt=1, seed=None,
+                      chunk_size=STIM_CHUNK_SIZE):
+    '''
+    Correlated spike trains generated by a Cox process (R. Brette, Neural
+    Computation 21, 2009) as tests/python/corr_spike_trains.py. The rates
+    are diag(C)**2 + L.Y, where Y are independent Ornstein-Uhlenbeck
+    processes of time constant *tau_c* and L is derived from the Cholesky
+    factor of *C*. Generator of time sorted chunks of events, each an array
+    of shape (n, 2) with columns (tick, addr).
+    '''
+    from scipy.signal import lfilter
+    rng = seeded_rng(seed)
+    C = np.array(C, dtype='float')
+    n = len(C)
+    ticks = int(t_stop / dt)
+    lam = np.exp(-dt / tau_c)
+    sigma = np.sqrt(1 - np.exp(-2 * dt / tau_c))
+    # The diagonal of C is replaced by its square, which is also the mean
+    # rate of the trains (as in corr_spike_trains)
+    R = np.diag(C)**2
+    np.fill_diagonal(C, R)
+    L = np.linalg.cholesky(C)
+    alpha = -np.linalg.eigvals(L).real.min()
+    np.fill_diagonal(L, R * alpha)
+
+    Y = rng.normal(0, 1, n)
+    block = max(1, chunk_size // max(n, 1))
+    for t0 in range(0, ticks, block):
+        nt = min(block, ticks - t0)
+        # Y[t] = lam*Y[t-1] + N(0, sigma), carried over between chunks
+        Ys = lfilter([1.], [1., -lam], rng.normal(0, sigma, (nt, n)), axis=0,
+                     zi=lam * Y[None, :])[0]
+        Y = Ys[-1]
+        X = R + Ys.dot(L.T)
+        t, a = np.nonzero(X * 0.001 * dt > rng.random((nt, n)))
+        yield np.column_stack([t + t0, a]).astype('int64')
+
+
+def sample_schedule(indices, t_sample, t_start=0):
+    '''
+    Returns the schedule presenting the dataset rows *indices* one after the
+    other for *t_sample* ticks each, starting at *t_start*, for
+    ConfigurationNSAT.set_ext_dataset. An array of shape (n, 3) with
+    columns (index, start, duration).
+    '''
+    indices = np.asarray(indices, dtype='int64').ravel()
+    starts = t_start + t_sample * np.arange(len(indices), dtype='int64')
+    return np.column_stack([indices, starts,
+                            np.full(len(indices), t_sample, dtype='int64')])
+
+
+def collect_events(chunks):
+    '''
+    Concatenates chunks of (time, addr) events into one array of shape (n, 2).
+    '''
+    chunks = [np.asarray(c, dtype='int64').reshape(-1, 2) for c in chunks]
+    if len(chunks) == 0:
+        return np.zeros([0, 2], dtype='int64')
+    return np.concatenate(chunks)
+
+
+def to_ext_events(events, core=0):
+    '''
+    Returns the external events of *core* for
+    ConfigurationNSAT.set_ext_events.
+    *events*: array of shape (n, 2) with columns (time, addr), or an iterable
+    of such chunks (e.g. from poisson_trains)
+    '''
+    from .NSATlib import ext_events_array
+    if not isinstance(events, np.ndarray):
+        events = collect_events(events)
+    events = np.asarray(events).reshape(-1, 2)
+    return ext_events_array(np.column_stack(
+        [events[:, 0], np.full(len(events), core), events[:, 1]]))
@@ -11,7 +11,6 @@
 # Copyright : (c) UC Regents, Emre Neftci, Sadique Sheik, Georgios Detorakis
 # Licence : GPLv2
 # ---------------------------------------------------------------------------
-import pylab
 import numpy as np
 from . import NSATlib
 from .global_vars import *
@@ -59,26 +58,123 @@ def latex_print_group(var_group, prefix, group_names, n_states):
     return s
 
 
+def seeded_rng(seed=None):
+    '''
+    Returns a numpy Generator seeded with *seed*. Without a seed, the seed
+    is drawn from numpy's global state so that np.random.seed keeps
+    controlling the generators (connections, stimuli).
+    '''
+    if seed is None:
+        seed = np.random.randint(2**31)
+    return np.random.default_rng(seed)
+
+
+def sample_distinct(counts, n, base, stride, rng):
+    '''
+    Draws counts[i] distinct values v among range(n) for every i, in
+    O(sum(counts)) instead of one rng.choice per i. Draws already taken are
+    redrawn until every i has its count.
+    Returns the sorted keys base[i] + stride * v.
+    '''
+    counts = np.asarray(counts)
+    if np.any(counts > n):
+        raise ValueError('Cannot draw more than {0} distinct values'.format(n))
+    missing = np.repeat(np.arange(len(counts)), counts)
+    keys = np.zeros(0, dtype='int64')
+    while len(missing) > 0:
+        cand, first = np.unique(
+            base[missing] + stride * rng.integers(0, n, len(missing)),
+            return_index=True)
+        pos = np.searchsorted(keys, cand)
+        new = keys[np.minimum(pos, len(keys) - 1)] != cand if len(keys) \
+            else np.ones(len(cand), dtype='bool')
+        keys = np.insert(keys, pos[new], cand[new])
+        taken = np.ones(len(missing), dtype='bool')
+        taken[first[new]] = False
+        missing = missing[taken]
+    return keys
+
+
+def ptr_records(ptr):
+    '''
+    Returns the pointer records of a ptr table as an array of shape
+    (nnz, 4) with columns (pre, post, state, pointer in the weight table).
+    *ptr* is either a flat table whose first entry is the number of records
+    or an already reshaped (nnz, 4) array.
+    '''
+    ptr = np.asarray(ptr)
+    if ptr.ndim == 2:
+        return ptr.astype('int64')
+    if len(ptr) == 0:
+        return np.zeros((0, 4), 'int64')
+    nentries = int(ptr[0]) * 4
+    return ptr[1:nentries + 1].reshape(-1, 4).astype('int64')
+
+
+def ptr_table_to_records(ptr_table, n_units, n_states):
+    '''
+    Converts a ptr table, either sparse of shape (n_units, n_units * n_states)
+    or dense of shape (n_units, n_units, n_states) with 0 for no synapse, to
+    (src, dst, state, ptr) arrays sorted by (src, state, dst).
+    Explicit zeros of sparse tables are valid pointers and are kept.
+    '''
+    from scipy.sparse import issparse
+    if issparse(ptr_table):
+        cw = ptr_table.tocoo()
+        src = cw.row.astype('int64')
+        dst = (cw.col % n_units).astype('int64')
+        state = (cw.col // n_units).astype('int64')
+        ptr = cw.data.astype('int64')
+    else:
+        cw = np.asarray(ptr_table)
+        src, dst, state = np.nonzero(cw)
+        ptr = cw[src, dst, state].astype('int64')
+    order = np.lexsort((dst, state, src))
+    return src[order], dst[order], state[order], ptr[order]
+
+
 def ptr_wgt_table_to_dense(ptr, wgt, n_inputs, n_neurons, n_states):
-    ptr = np.array(ptr)
     wgt = np.array(wgt)
-    pos = 0
     n_units = n_inputs + n_neurons
-    nentries = (ptr[pos]) * 4
-    pos += 1
-    ptrR = ptr[pos:nentries + pos].reshape(-1, 4)
+    ptrR = ptr_records(ptr)
     W = np.zeros([n_units, n_units, n_states], 'int')
     CW = np.zeros([n_units, n_units, n_states], 'bool')
-    for w in ptrR:
-        W[w[0], w[1], w[2]] = w[3]
-        CW[w[0], w[1], w[2]] = True
-    pos += nentries
+    W[ptrR[:, 0], ptrR[:, 1], ptrR[:, 2]] = ptrR[:, 3]
+    CW[ptrR[:, 0], ptrR[:, 1], ptrR[:, 2]] = True
     W = wgt[W]
 
     # TODO
     return W, CW
 
 
+def ptr_wgt_table_to_sparse(ptr, wgt, n_inputs, n_neurons, n_states,
+                            coo=False):
+    '''
+    Sparse counterpart of ptr_wgt_table_to_dense.
+    Inputs:
+    *ptr*: ptr table (see ptr_records)
+    *wgt*: weight table the pointers index into
+    *coo*: If enabled, return the (pre, post, state, weight) arrays instead
+    Outputs:
+    A list of n_states scipy.sparse CSR matrices of shape (n_units, n_units).
+    Connected synapses with zero weight are kept as explicit entries.
+    '''
+    from scipy.sparse import csr_matrix
+    wgt = np.asarray(wgt)
+    n_units = n_inputs + n_neurons
+    ptrR = ptr_records(ptr)
+    pre, post, state = ptrR[:, 0], ptrR[:, 1], ptrR[:, 2]
+    w = wgt[ptrR[:, 3]].astype('int')
+    if coo:
+        return pre, post, state, w
+    W = []
+    for k in range(n_states):
+        idx = state == k
+        W.append(csr_matrix((w[idx], (pre[idx], post[idx])),
+                            shape=(n_units, n_units)))
+    return W
+
+
 def gen_ptr_wgt_table_from_W_CW(W, CW, sharedW):
     from scipy.sparse import csr_matrix
     wgt_table = np.concatenate([[0], sharedW]).astype('int')
@@ -149,6 +245,7 @@ def read_states_hex(fname):
 
 
 def plot_stdp_kernel(fname, tca=[16, 36], tac=[16, 36]):
+    import pylab
     data = np.genfromtxt(fname)
 
     fig = pylab.figure()
@@ -269,6 +366,7 @@ def generate_wgt_stats(cfg, fname, W, CW):
 
 
 def write_spike_lists_hex(data, fname):
+    from pyNCSre import pyST
     if type(data) != pyST.spikes.SpikeList:
         raise TypeError("Data not a pyNCS object!")
     tmp = data.convert("[times,ids]")
@@ -27,15 +27,21 @@ void array_list_push(array_list **vector, unsigned long long value,
         exit(-1);
     } 
 
+    /* Grow geometrically once the list is full */
+    if ((*vector)->length == (*vector)->capacity) {
+        (*vector)->capacity *= 2;
+        (*vector)->array = realloc((*vector)->array,
+                                   (*vector)->capacity*sizeof(unsigned long long));
+        if (flag == 1) {
+            (*vector)->times = realloc((*vector)->times,
+                                       (*vector)->capacity*sizeof(unsigned long long));
+        }
+    }
+
     (*vector)->array[(*vector)->length] = value;
-    (*vector)->array = realloc((*vector)->array,
-                               ((*vector)->capacity+1)*sizeof(unsigned long long));
     if (flag == 1) {
         (*vector)->times[(*vector)->length] = time;
-        (*vector)->times = realloc((*vector)->times,
-                                   ((*vector)->capacity+1)*sizeof(unsigned long long));
     }
-    (*vector)->capacity++;
     (*vector)->length++;
 }
 
@@ -121,6 +121,29 @@ void push_syn(list_syn **List, unsigned long long id, WTYPE *W) {
 }
 
 
+/* ************************************************************************
+ * PUSH_SYN_NODE: This function pushes a preallocated node into a list
+ * (synaptic strengths). The node memory is owned by the caller.
+ *
+ * Args : 
+ *  List (node **)          : Double pointer to synapses list
+ *  node (syn_list_node *)  : The node to insert
+ *  id (int)                : The id value for the node (i.e. neuron ID)
+ *  W (int)                 : The value for the current synapse
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void push_syn_node(list_syn **List, syn_list_node *node,
+                   unsigned long long id, WTYPE *W) {
+    node->id = id;
+    node->w_ptr = W;
+    node->next = (*List)->head;
+    (*List)->head = node;
+    (*List)->len++;
+}
+
+
 /* ************************************************************************
  * PUSH_BACK_SPK: This function pushes (append) a node into a list at the 
  * tail (similar behavior with Python's lists).
@@ -249,3 +272,19 @@ void destroy_list_syn(list_syn **List) {
     (*List)->head = NULL;
     (*List)->len = 0;
 }
+
+
+/* ************************************************************************
+ * DETACH_LIST_SYN: This function empties a list whose nodes are owned by
+ * a pool (see push_syn_node) without freeing them.
+ *
+ * Args : 
+ *  head (node **)   : Double pointer to the head of the list
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void detach_list_syn(list_syn **List) {
+    (*List)->head = NULL;
+    (*List)->len = 0;
+}
@@ -410,17 +410,17 @@ void integrate_nsat(STATETYPE **x,
  *  num_states (int)            : Number of state's components
  *
  * Returns :
- *  void
+ *  The number of accumulated synaptic events
  **************************************************************************/
-void accumulate_synaptic_events(STATETYPE **acm,
-                                unit *pre_unit,
-                                unit *post_unit,
-                                array_list *spikes_list,
-                                unsigned int num_states,
-                                unsigned int core_id,
-                                unsigned long long time)
+unsigned long long accumulate_synaptic_events(STATETYPE **acm,
+                                              unit *pre_unit,
+                                              unit *post_unit,
+                                              array_list *spikes_list,
+                                              unsigned int num_states,
+                                              unsigned int core_id,
+                                              unsigned long long time)
 {
-    unsigned long long j, pre;
+    unsigned long long j, pre, num_events = 0;
     unsigned int k;
     int l, num_pre_spks;
     int *prb=NULL;
@@ -442,9 +442,11 @@ void accumulate_synaptic_events(STATETYPE **acm,
                 }
                 ptr_post = NULL;
                 dealloc(prb);
+                num_events += num_pre_spks;
             }
         }
     }
+    return num_events;
 } 
 
 
@@ -597,20 +599,20 @@ void state_reset(STATETYPE **x,
  *  flag (int)              : Indicates internal or external events (0 or 1)
  *
  * Returns :
- *  void
+ *  The number of weight updates
  **************************************************************************/
-void causal_stdp(unit *pre_unit,
-                 unit *post_unit,
-                 STATETYPE *x,
-                 STATETYPE *g,
-                 array_list *spikes,
-                 unsigned long long curr_time,
-                 unsigned int num_states,
-                 int syn_precision,
-                 bool is_learning_gated,
-                 bool is_check_wlim_on)
+unsigned long long causal_stdp(unit *pre_unit,
+                               unit *post_unit,
+                               STATETYPE *x,
+                               STATETYPE *g,
+                               array_list *spikes,
+                               unsigned long long curr_time,
+                               unsigned int num_states,
+                               int syn_precision,
+                               bool is_learning_gated,
+                               bool is_check_wlim_on)
 {
-    unsigned long long j, pre, ddt = 0;
+    unsigned long long j, pre, ddt = 0, num_updates = 0;
     unsigned int k;
     int tmp;
     int dw = 0, kdtca = 0, sca = 0, tau = 0;
@@ -649,6 +651,7 @@ void causal_stdp(unit *pre_unit,
                                     check_synaptic_strengths(ptr_post->w_ptr,
                                                              syn_precision);
                                 }
+                                num_updates++;
                             }
                         }
                     }
@@ -658,6 +661,7 @@ void causal_stdp(unit *pre_unit,
             ptr_post = NULL;
         }
     }
+    return num_updates;
 }
 
 
@@ -672,19 +676,19 @@ void causal_stdp(unit *pre_unit,
  *  flag (int)              : Indicates internal or external events (0 or 1)
  *
  * Returns :
- *  void
+ *  The number of weight updates
  **************************************************************************/
-void acausal_stdp(unit *pre_unit,
-                  unit *post_unit,
-                  STATETYPE *x,
-                  array_list *spikes,
-                  unsigned long long curr_time,
-                  unsigned int num_states,
-                  int syn_precision,
-                  bool is_learning_gated,
-                  bool is_check_wlim_on)
+unsigned long long acausal_stdp(unit *pre_unit,
+                                unit *post_unit,
+                                STATETYPE *x,
+                                array_list *spikes,
+                                unsigned long long curr_time,
+                                unsigned int num_states,
+                                int syn_precision,
+                                bool is_learning_gated,
+                                bool is_check_wlim_on)
 {
-    unsigned long long j, pre;
+    unsigned long long j, pre, num_updates = 0;
     unsigned int k;
     int tmp;
     int detac = 0, kdtac = 0, sac = 0, dw = 0, tau = 0;
@@ -731,6 +735,7 @@ void acausal_stdp(unit *pre_unit,
                             check_synaptic_strengths(ptr_post->w_ptr,
                                                      syn_precision);
                         }
+                        num_updates++;
                     }
                 }
                 ptr_post = ptr_post->next;
@@ -738,6 +743,7 @@ void acausal_stdp(unit *pre_unit,
             ptr_post = NULL;
         }
     }
+    return num_updates;
 }
 
 
@@ -785,10 +791,12 @@ void nsat_dynamics(nsat_core *core) {
     if ((core->mon_pms->mon_weights) && (stamps == 0)) {
         update_synaptic_strength_monitor_file(core);
     }
+    profile_phase(core, PROF_MONITOR_IO);
 
     /* Integrate NSAT equations */
     integrate_nsat(&core->vars->tX, core->vars->acm, core->nsat_neuron,
                    core->core_pms.num_neurons, core->core_pms.num_states);
+    profile_phase(core, PROF_INTEGRATE);
 
     /* Refractory period */
     refractory_period(&core->vars->tX, core->nsat_neuron,
@@ -806,9 +814,20 @@ void nsat_dynamics(nsat_core *core) {
                  core->curr_time, core->core_pms.num_neurons,
                  core->core_id,
                  core->core_pms.num_states);
+    profile_phase(core, PROF_SPIKE_DETECTION);
+
+    /* Pass a full chunk of recorded spikes to the writer */
+    stream_spikes_events(core);
+
+    /* Accumulate spike counts per window */
+    if (core->mon_pms->count_window > 0) {
+        update_spike_count_monitor(core);
+    }
+    profile_phase(core, PROF_MONITOR_IO);
 
     /* Check for underflows */
     over_under_flow(core);
+    profile_phase(core, PROF_INTEGRATE);
 
 #if OLD == 1
      return NULL;
@@ -833,6 +852,7 @@ void *nsat_events_and_learning(void *arg) {
 void nsat_events_and_learning(nsat_core *core) {
 #endif
     int stamps = 0;                          /* Time stamps for monitors */  
+    unsigned long long num_events = 0, num_updates = 0;
 
 #if OLD == 1
     nsat_core *core = (nsat_core *) arg;
@@ -846,23 +866,25 @@ void nsat_events_and_learning(nsat_core *core) {
 
     /* Add NSAT synaptic events if it's necessary */
     if (core->nsat_events->length > 0) {
-        accumulate_synaptic_events(&core->vars->acm, core->nsat_neuron,
-                                   core->nsat_neuron, core->nsat_events,
-                                   core->core_pms.num_states,
-                                   core->core_id, core->curr_time);
+        num_events += accumulate_synaptic_events(&core->vars->acm, core->nsat_neuron,
+                                                 core->nsat_neuron, core->nsat_events,
+                                                 core->core_pms.num_states,
+                                                 core->core_id, core->curr_time);
     }
 
     /* Add external synaptic events if it's necessary */
     if (core->ext_events->length > 0) {
-        accumulate_synaptic_events(&core->vars->acm, core->ext_neuron,
-                                   core->nsat_neuron, core->ext_events,
-                                   core->core_pms.num_states,
-                                   core->core_id, core->curr_time);
+        num_events += accumulate_synaptic_events(&core->vars->acm, core->ext_neuron,
+                                                 core->nsat_neuron, core->ext_events,
+                                                 core->core_pms.num_states,
+                                                 core->core_id, core->curr_time);
     }
     
     /* Shift the synaptic weights according to a constant gain */
     shift_synaptic_events(&core->vars->acm, core->nsat_neuron,
                           core->core_pms.num_neurons, core->core_pms.num_states);
+    profile_count(core, syn_events, num_events);
+    profile_phase(core, PROF_ACCUMULATION);
 
     /* Causal STDP update - IsLearning suppresses learning in validation */
     if (core->core_pms.is_learning_on) {
@@ -873,17 +895,17 @@ void nsat_events_and_learning(nsat_core *core) {
                           core->core_pms.tstdpmax);
 
         /* Compute causal STDP on external events */
-        if (core->ext_caspk->capacity > 1 && core->syn->tot_ext_syn_num != 0) {
-            causal_stdp(core->ext_neuron,
-                        core->nsat_neuron,
-                        core->vars->tX,
-                        core->vars->g,
-                        core->ext_caspk,
-                        core->curr_time,
-                        core->core_pms.num_states,
-                        core->g_pms->syn_precision,
-                        core->core_pms.is_learning_gated,
-                        core->g_pms->is_check_wlim_on);
+        if (core->ext_caspk->length > 0 && core->syn->tot_ext_syn_num != 0) {
+            num_updates += causal_stdp(core->ext_neuron,
+                                       core->nsat_neuron,
+                                       core->vars->tX,
+                                       core->vars->g,
+                                       core->ext_caspk,
+                                       core->curr_time,
+                                       core->core_pms.num_states,
+                                       core->g_pms->syn_precision,
+                                       core->core_pms.is_learning_gated,
+                                       core->g_pms->is_check_wlim_on);
         }
         array_list_clean(&core->ext_caspk, 1);
 
@@ -894,46 +916,48 @@ void nsat_events_and_learning(nsat_core *core) {
 
         /* Compute causal STDP on NSAT events */
         if (core->nsat_caspk->length > 0 && core->syn->tot_nsat_syn_num != 0) {
-            causal_stdp(core->nsat_neuron,
-                        core->nsat_neuron,
-                        core->vars->tX,
-                        core->vars->g,
-                        core->nsat_caspk,
-                        core->curr_time,
-                        core->core_pms.num_states,
-                        core->g_pms->syn_precision,
-                        core->core_pms.is_learning_gated,
-                        core->g_pms->is_check_wlim_on);
+            num_updates += causal_stdp(core->nsat_neuron,
+                                       core->nsat_neuron,
+                                       core->vars->tX,
+                                       core->vars->g,
+                                       core->nsat_caspk,
+                                       core->curr_time,
+                                       core->core_pms.num_states,
+                                       core->g_pms->syn_precision,
+                                       core->core_pms.is_learning_gated,
+                                       core->g_pms->is_check_wlim_on);
         }
         array_list_clean(&core->nsat_caspk, 1);
       
         /* Acausal STDP update */
         /* External events */
         if (core->ext_events->length > 0 && core->syn->tot_ext_syn_num != 0) {
-            acausal_stdp(core->ext_neuron,
-                         core->nsat_neuron,
-                         core->vars->tX,
-                         core->ext_events,
-                         core->curr_time,
-                         core->core_pms.num_states,
-                         core->g_pms->syn_precision,
-                         core->core_pms.is_learning_gated,
-                         core->g_pms->is_check_wlim_on);
+            num_updates += acausal_stdp(core->ext_neuron,
+                                        core->nsat_neuron,
+                                        core->vars->tX,
+                                        core->ext_events,
+                                        core->curr_time,
+                                        core->core_pms.num_states,
+                                        core->g_pms->syn_precision,
+                                        core->core_pms.is_learning_gated,
+                                        core->g_pms->is_check_wlim_on);
         }
 
         /* NSAT events */
         if (core->nsat_events->length > 0 && core->syn->tot_nsat_syn_num != 0) {
-            acausal_stdp(core->nsat_neuron,
-                         core->nsat_neuron,
-                         core->vars->tX,
-                         core->nsat_events,
-                         core->curr_time,
-                         core->core_pms.num_states,
-                         core->g_pms->syn_precision,
-                         core->core_pms.is_learning_gated,
-                         core->g_pms->is_check_wlim_on);
+            num_updates += acausal_stdp(core->nsat_neuron,
+                                        core->nsat_neuron,
+                                        core->vars->tX,
+                                        core->nsat_events,
+                                        core->curr_time,
+                                        core->core_pms.num_states,
+                                        core->g_pms->syn_precision,
+                                        core->core_pms.is_learning_gated,
+                                        core->g_pms->is_check_wlim_on);
         }
     }
+    profile_count(core, wgt_updates, num_updates);
+    profile_phase(core, PROF_STDP);
 
     /* Reset spiked neurons states */
     state_reset(&core->vars->tX, core->nsat_neuron, core->nsat_events,
@@ -956,9 +980,10 @@ void nsat_events_and_learning(nsat_core *core) {
                 core->vars->tX,
                 core->core_pms.num_neurons,
                 core->core_pms.num_states);
+    profile_phase(core, PROF_RESET);
 
     /* Update state monitors (binary file) */
-    if ((core->mon_pms->mon_states) && (stamps == 0)) {
+    if ((core->mon_pms->mon_states) && is_state_monitor_tick(core, stamps)) {
 #if DAVIS == 0
         /* update_state_monitor_file(core);  */
         update_state_monitor_online(core);
@@ -966,6 +991,7 @@ void nsat_events_and_learning(nsat_core *core) {
         update_state_monitor_online(core);
 #endif
     }
+    profile_phase(core, PROF_MONITOR_IO);
 
     /* Update state monitors (write hex format - ascii file) */
     /* if ((core->mon_pms->mon_states_fpga) && (stamps == 0)) { */
@@ -980,6 +1006,7 @@ void nsat_events_and_learning(nsat_core *core) {
     array_list_clean(&core->ext_events, 1);
     array_list_clean(&core->nsat_caspk, 1);
     array_list_clean(&core->ext_caspk, 1);
+    profile_phase(core, PROF_RESET);
     
 #if OLD == 1
     return NULL;
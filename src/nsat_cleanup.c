@@ -36,8 +36,16 @@ void dealloc_neurons(nsat_core **core, unsigned int num_cores) {
 
     for (p = 0; p < num_cores; ++p) {
         for (j = 0; j < (*core)[p].core_pms.num_inputs; ++j) {
+            if (is_sharing_synapses((*core)[p])) {
+                (*core)[p].ext_neuron[j].syn_ptr = NULL;
+                continue;
+            }
             for (k = 0; k < (*core)[p].core_pms.num_states; ++k) {
-                destroy_list_syn(&(*core)[p].ext_neuron[j].syn_ptr[k]);
+                if ((*core)[p].syn_pool != NULL) {
+                    detach_list_syn(&(*core)[p].ext_neuron[j].syn_ptr[k]);
+                } else {
+                    destroy_list_syn(&(*core)[p].ext_neuron[j].syn_ptr[k]);
+                }
                 free((*core)[p].ext_neuron[j].syn_ptr[k]);
             }
             free((*core)[p].ext_neuron[j].syn_ptr);
@@ -51,13 +59,22 @@ void dealloc_neurons(nsat_core **core, unsigned int num_cores) {
                 (*core)[p].nsat_neuron[j].s[k].lrn_ptr = NULL;
             }
             dealloc((*core)[p].nsat_neuron[j].s);
+            if (is_sharing_synapses((*core)[p])) {
+                (*core)[p].nsat_neuron[j].syn_ptr = NULL;
+                continue;
+            }
             for (k = 0; k < (*core)[p].core_pms.num_states; ++k) {
-                destroy_list_syn(&(*core)[p].nsat_neuron[j].syn_ptr[k]);
+                if ((*core)[p].syn_pool != NULL) {
+                    detach_list_syn(&(*core)[p].nsat_neuron[j].syn_ptr[k]);
+                } else {
+                    destroy_list_syn(&(*core)[p].nsat_neuron[j].syn_ptr[k]);
+                }
                 free((*core)[p].nsat_neuron[j].syn_ptr[k]);
             }
             free((*core)[p].nsat_neuron[j].syn_ptr);
             (*core)[p].nsat_neuron[j].syn_ptr = NULL;
         }
+        dealloc((*core)[p].syn_pool);
     }
 }
 
@@ -88,6 +105,8 @@ void dealloc_cores(nsat_core **cores, unsigned int num_cores) {
         dealloc((*cores)[p].core_pms.nsat_syn_rec_ids);
 
         /* Deallocate monitors structure */
+        dealloc((*cores)[p].mon_pms->rec_states);
+        dealloc((*cores)[p].mon_pms->count_ids);
         dealloc((*cores)[p].mon_pms);
 
         /* Deallocate synapses statistics structure */
@@ -149,9 +168,18 @@ void dealloc_cores(nsat_core **cores, unsigned int num_cores) {
         array_list_destroy(&(*cores)[p].nsat_caspk, 1);
         dealloc((*cores)[p].nsat_caspk);
         
-        /* Free global parameters pointer */
+        /* Free global parameters and context pointers */
         (*cores)[p].g_pms = NULL;
+        (*cores)[p].ctx = NULL;
+
+        if ((*cores)[p].prof != NULL) {
+            dealloc((*cores)[p].prof->trace);
+        }
+        dealloc((*cores)[p].prof);
         
+        if (is_sharing_synapses((*cores)[p])) {
+            (*cores)[p].shared_memory = NULL;
+        }
         dealloc((*cores)[p].shared_memory);
 
         /* Deallocate neurons array structures */
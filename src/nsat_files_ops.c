@@ -91,6 +91,311 @@ void get_external_events_per_core(FILE *fp, nsat_core **core,
 }
 
 
+/* ************************************************************************
+ * OPEN_RATE_SOURCES: This function opens the rates files of the cores
+ * whose inputs are rate coded Poisson sources and seeds their RNGs.
+ *
+ * Args : 
+ *  fname (fnames *)        : File names struct
+ *  core (nsat_core *)      : Cores structs array
+ *  num_cores (int)         : Cores numbers
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void open_rate_sources(fnames *fname, nsat_core *core, int num_cores) {
+    int p;
+    char *rates_fname = NULL;
+    unsigned long long header[4];
+    rate_src *src = NULL;
+
+    for(p = 0; p < num_cores; ++p) {
+        if (!core[p].core_pms.is_rate_src_on) {
+            continue;
+        }
+        rates_fname = gen_fname(fname->ext_rates, base_core_id(core[p]), 1);
+        src = alloc(rate_src, 1);
+        if(!(src->fp = fopen(rates_fname, "rb"))) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("File %s cannot be opened!\n", rates_fname);
+            exit(-1);
+        }
+        if (fread(header, sizeof(unsigned long long), 4, src->fp) != 4 ||
+            header[1] == 0 || header[3] != core[p].core_pms.num_inputs) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Invalid rates file %s for Core %d!\n", rates_fname, p);
+            exit(-1);
+        }
+        dealloc(rates_fname);
+        src->t_start = header[0];
+        src->t_sample = header[1];
+        src->num_windows = header[2];
+        src->num_inputs = header[3];
+        src->thr = alloc_zeros(uint32_t, src->num_inputs);
+        src->window = ULLONG_MAX;
+
+        /* A stream of its own, independent of the threads scheduling.
+         * Replicas draw the same inputs as their base core */
+        pcg32_srandom_r(&src->rng, core[p].g_pms->rng_init_state,
+                        core[p].g_pms->rng_init_seq + base_core_id(core[p]) + 1);
+        core[p].rate_src = src;
+    }
+}
+
+
+/* ************************************************************************
+ * GET_RATE_SOURCE_EVENTS: This function draws the spikes of the rate
+ * coded Poisson sources of a core at the current time step and adds them
+ * to the external events. The thresholds of a sample window are read when
+ * the window starts.
+ *
+ * Args : 
+ *  core (nsat_core *)      : NSAT core struct
+ *  curr_time (int)         : Current time step
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void get_rate_source_events(nsat_core *core, unsigned long long curr_time) {
+    unsigned long long i, w;
+    rate_src *src = core->rate_src;
+
+    if (curr_time < src->t_start) {
+        return;
+    }
+    w = (curr_time - src->t_start) / src->t_sample;
+    if (w >= src->num_windows) {
+        return;
+    }
+
+    if (w != src->window) {
+        fseek(src->fp, (long) (4 * sizeof(unsigned long long) +
+                               w * src->num_inputs * sizeof(uint32_t)),
+              SEEK_SET);
+        if (fread(src->thr, sizeof(uint32_t), src->num_inputs, src->fp) !=
+            src->num_inputs) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Rates file of Core %u is truncated!\n", core->core_id);
+            exit(-1);
+        }
+        src->window = w;
+    }
+
+    for (i = 0; i < src->num_inputs; ++i) {
+        if (src->thr[i] && pcg32_random_r(&src->rng) < src->thr[i]) {
+            array_list_push(&core->ext_events, i, curr_time, 1);
+        }
+    }
+}
+
+
+/* ************************************************************************
+ * CLOSE_RATE_SOURCES: This function closes the rates files and frees the
+ * rate coded sources.
+ *
+ * Args : 
+ *  core (nsat_core *)      : Cores structs array
+ *  num_cores (int)         : Cores numbers
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void close_rate_sources(nsat_core *core, int num_cores) {
+    int p;
+
+    for(p = 0; p < num_cores; ++p) {
+        if (core[p].rate_src != NULL) {
+            fclose(core[p].rate_src->fp);
+            dealloc(core[p].rate_src->thr);
+            dealloc(core[p].rate_src);
+        }
+    }
+}
+
+
+/* ************************************************************************
+ * OPEN_DATASET_SOURCES: This function maps the datasets and reads the
+ * samples schedules of the cores whose inputs are driven by a dataset and
+ * seeds their RNGs. The descriptor file holds the uint64 mode (0 Poisson,
+ * 1 regular), number of rows, number of inputs, offset of the first row
+ * and length of the dataset path, the path, the uint32 lookup table of the
+ * 256 intensities, the uint64 number of schedule entries and the entries
+ * (sample index, start tick, duration) sorted by start tick.
+ *
+ * Args : 
+ *  fname (fnames *)        : File names struct
+ *  core (nsat_core *)      : Cores structs array
+ *  num_cores (int)         : Cores numbers
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void open_dataset_sources(fnames *fname, nsat_core *core, int num_cores) {
+    int p, fd;
+    unsigned long long i, header[5];
+    char *desc_fname = NULL, *data_fname = NULL;
+    FILE *fp = NULL;
+    struct stat st;
+    data_src *src = NULL;
+
+    for(p = 0; p < num_cores; ++p) {
+        if (!core[p].core_pms.is_data_src_on) {
+            continue;
+        }
+        desc_fname = gen_fname(fname->ext_dataset, base_core_id(core[p]), 1);
+        fp = fopen(desc_fname, "rb");
+        file_test(fp, desc_fname);
+        if (fread(header, sizeof(unsigned long long), 5, fp) != 5 ||
+            header[2] != core[p].core_pms.num_inputs) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Invalid dataset file %s for Core %d!\n", desc_fname, p);
+            exit(-1);
+        }
+
+        src = alloc(data_src, 1);
+        src->is_regular = header[0];
+        src->num_rows = header[1];
+        src->num_inputs = header[2];
+        data_fname = alloc_zeros(char, header[4] + 1);
+        if (fread(data_fname, sizeof(char), header[4], fp) != header[4] ||
+            fread(src->lut, sizeof(uint32_t), 256, fp) != 256 ||
+            fread(&src->num_entries, sizeof(unsigned long long), 1, fp) != 1) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Invalid dataset file %s for Core %d!\n", desc_fname, p);
+            exit(-1);
+        }
+        src->schedule = alloc(unsigned long long, 3 * src->num_entries);
+        if (fread(src->schedule, sizeof(unsigned long long),
+                  3 * src->num_entries, fp) != 3 * src->num_entries) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Samples schedule of %s is truncated!\n", desc_fname);
+            exit(-1);
+        }
+        fclose(fp);
+        for (i = 0; i < src->num_entries; ++i) {
+            if (src->schedule[3*i] >= src->num_rows ||
+                (i > 0 && src->schedule[3*i+1] < src->schedule[3*(i-1)+1])) {
+                printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+                printf("Invalid samples schedule entry %llu in %s!\n",
+                       i, desc_fname);
+                exit(-1);
+            }
+        }
+
+        /* The dataset is paged in on demand, never read as a whole */
+        if ((fd = open(data_fname, O_RDONLY)) < 0 || fstat(fd, &st) < 0 ||
+            (unsigned long long) st.st_size <
+            header[3] + src->num_rows * src->num_inputs) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Dataset %s cannot be opened or is truncated!\n",
+                   data_fname);
+            exit(-1);
+        }
+        src->map_size = st.st_size;
+        src->map = mmap(NULL, src->map_size, PROT_READ, MAP_SHARED, fd, 0);
+        (void) close(fd);
+        if (src->map == MAP_FAILED) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Dataset %s cannot be mapped!\n", data_fname);
+            exit(-1);
+        }
+        src->data = src->map + header[3];
+        dealloc(data_fname);
+        dealloc(desc_fname);
+
+        src->entry = 0;
+        src->t_end = 0;
+        src->thr = alloc_zeros(uint32_t, src->num_inputs);
+        src->phase = alloc_zeros(uint32_t, src->num_inputs);
+
+        /* A stream of its own, distinct from the rate sources' ones.
+         * Replicas draw the same inputs as their base core */
+        pcg32_srandom_r(&src->rng, core[p].g_pms->rng_init_state,
+                        core[p].g_pms->rng_init_seq + num_cores +
+                        base_core_id(core[p]) + 1);
+        core[p].data_src = src;
+    }
+}
+
+
+/* ************************************************************************
+ * GET_DATASET_SOURCE_EVENTS: This function draws the spikes of the
+ * dataset inputs of a core at the current time step and adds them to the
+ * external events. The thresholds of a sample are computed from its row
+ * when its schedule entry starts.
+ *
+ * Args : 
+ *  core (nsat_core *)      : NSAT core struct
+ *  curr_time (int)         : Current time step
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void get_dataset_source_events(nsat_core *core,
+                               unsigned long long curr_time) {
+    unsigned long long i, *entry;
+    unsigned char *row = NULL;
+    data_src *src = core->data_src;
+
+    while (src->entry < src->num_entries &&
+           src->schedule[3*src->entry+1] <= curr_time) {
+        entry = &src->schedule[3*src->entry];
+        row = src->data + entry[0] * src->num_inputs;
+        for (i = 0; i < src->num_inputs; ++i) {
+            src->thr[i] = src->lut[row[i]];
+        }
+        memset(src->phase, 0, src->num_inputs * sizeof(uint32_t));
+        src->t_end = entry[1] + entry[2];
+        src->entry++;
+    }
+
+    if (curr_time >= src->t_end) {
+        return;
+    }
+
+    if (src->is_regular) {
+        for (i = 0; i < src->num_inputs; ++i) {
+            src->phase[i] += src->thr[i];
+            if (src->phase[i] < src->thr[i]) {
+                array_list_push(&core->ext_events, i, curr_time, 1);
+            }
+        }
+    } else {
+        for (i = 0; i < src->num_inputs; ++i) {
+            if (src->thr[i] && pcg32_random_r(&src->rng) < src->thr[i]) {
+                array_list_push(&core->ext_events, i, curr_time, 1);
+            }
+        }
+    }
+}
+
+
+/* ************************************************************************
+ * CLOSE_DATASET_SOURCES: This function unmaps the datasets and frees the
+ * dataset sources.
+ *
+ * Args : 
+ *  core (nsat_core *)      : Cores structs array
+ *  num_cores (int)         : Cores numbers
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void close_dataset_sources(nsat_core *core, int num_cores) {
+    int p;
+
+    for(p = 0; p < num_cores; ++p) {
+        if (core[p].data_src != NULL) {
+            munmap(core[p].data_src->map, core[p].data_src->map_size);
+            dealloc(core[p].data_src->schedule);
+            dealloc(core[p].data_src->thr);
+            dealloc(core[p].data_src->phase);
+            dealloc(core[p].data_src);
+        }
+    }
+}
+
+
 #if DAVIS == 1
 void get_davis_events(int fd, nsat_core **cores) {
     int i, time, num_events, n;
@@ -164,10 +469,9 @@ void get_davis_events(int fd, nsat_core **cores) {
  **************************************************************************/
 void write_final_weights(fnames *fname, nsat_core *core,
                          unsigned int num_cores) {
-    unsigned long long j;
-    unsigned int k, p;
+    int j, k;
+    unsigned int p;
     int tmp = 0, tot = 0;
-    size_t add;
     FILE *fp = NULL;
     char *filename = NULL;
     syn_list_node *ptr = NULL;
@@ -179,20 +483,22 @@ void write_final_weights(fnames *fname, nsat_core *core,
             exit(-1);
         }
         
-        tot = core->syn->tot_ext_syn_num + core->syn->tot_nsat_syn_num;
+        tot = core[p].syn->tot_ext_syn_num + core[p].syn->tot_nsat_syn_num;
 
-        /* Write external neurons synaptic weights */
+        /* Each record is (pre, post, state, index in the shared memory) */
         fwrite(&tot, sizeof(int), 1, fp);
-        for(j = 0; j < core->core_pms.num_inputs; ++j) {
-            for(k = 0; k < core->core_pms.num_states; ++k) {
-                ptr = core->ext_neuron[j].syn_ptr[k]->head;
+
+        /* Write external neurons synaptic weights */
+        for(j = 0; j < (int) core[p].core_pms.num_inputs; ++j) {
+            for(k = 0; k < (int) core[p].core_pms.num_states; ++k) {
+                ptr = core[p].ext_neuron[j].syn_ptr[k]->head;
                 while(ptr != NULL) {
                     fwrite(&j, sizeof(int), 1, fp);
-                    tmp = ptr->id + core->core_pms.num_inputs;
+                    tmp = ptr->id + core[p].core_pms.num_inputs;
                     fwrite(&tmp, sizeof(int), 1, fp);
                     fwrite(&k, sizeof(int), 1, fp);
-                    add = &core->shared_memory[0] - ptr->w_ptr;
-                    fwrite(&add, sizeof(int), 1, fp);
+                    tmp = (int) (ptr->w_ptr - core[p].shared_memory);
+                    fwrite(&tmp, sizeof(int), 1, fp);
                     ptr = ptr->next;
                 }
                 ptr = NULL;
@@ -200,17 +506,17 @@ void write_final_weights(fnames *fname, nsat_core *core,
         }
 
         /* Write NSAT neurons synaptic weights */
-        for(j = 0; j < core->core_pms.num_neurons; ++j) {
-            for(k = 0; k < core->core_pms.num_states; ++k) {
-                ptr = core->nsat_neuron[j].syn_ptr[k]->head;
+        for(j = 0; j < (int) core[p].core_pms.num_neurons; ++j) {
+            for(k = 0; k < (int) core[p].core_pms.num_states; ++k) {
+                ptr = core[p].nsat_neuron[j].syn_ptr[k]->head;
                 while(ptr != NULL) {
-                    tmp = j + core->core_pms.num_inputs;
+                    tmp = j + core[p].core_pms.num_inputs;
                     fwrite(&tmp, sizeof(int), 1, fp);
-                    tmp = ptr->id + core->core_pms.num_inputs;
+                    tmp = ptr->id + core[p].core_pms.num_inputs;
                     fwrite(&tmp, sizeof(int), 1, fp);
                     fwrite(&k, sizeof(int), 1, fp);
-                    add = &core->shared_memory[0] - ptr->w_ptr;
-                    fwrite(ptr->w_ptr, sizeof(int), 1, fp);
+                    tmp = (int) (ptr->w_ptr - core[p].shared_memory);
+                    fwrite(&tmp, sizeof(int), 1, fp);
                     ptr = ptr->next;
                 }
                 ptr = NULL;
@@ -222,8 +528,272 @@ void write_final_weights(fnames *fname, nsat_core *core,
 }
 
 
+/* ************************************************************************
+ * WRITE_SPIKES_HEADER: This function writes the header of a compact spike
+ * events file: magic, uint32 version, format and number of neurons, then
+ * uint64 number of spikes and number of tick records.
+ *
+ * Args : 
+ *  stream (spk_stream *)   : Spike events stream
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+static void write_spikes_header(spk_stream *stream) {
+    uint32_t header[3];
+    uint64_t counts[2];
+
+    header[0] = SPK_EVENTS_VERSION;
+    header[1] = stream->format;
+    header[2] = (uint32_t) stream->num_neurons;
+    counts[0] = stream->total;
+    counts[1] = stream->num_records;
+    fwrite(SPK_EVENTS_MAGIC, sizeof(char), 4, stream->fp);
+    fwrite(header, sizeof(uint32_t), 3, stream->fp);
+    fwrite(counts, sizeof(uint64_t), 2, stream->fp);
+}
+
+
+/* ************************************************************************
+ * WRITE_COMPACT_CHUNK: This function encodes a chunk of spike events as
+ * per-tick records. Each record holds the time difference from the
+ * previous record and either the neurons ids or, if it is smaller and the
+ * format allows it, a bitmap of the spiking neurons. The offsets of the
+ * records are kept for the index at the end of the file.
+ *
+ * Args : 
+ *  stream (spk_stream *)   : Spike events stream (chunk to write)
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+static void write_compact_chunk(spk_stream *stream) {
+    unsigned long long i, j, k, t;
+    uint32_t head[2];
+    size_t num_words = (stream->num_neurons + 31) / 32;
+
+    for (i = 0; i < stream->length; i = j) {
+        t = stream->times[i];
+        for (j = i; j < stream->length && stream->times[j] == t; ++j) { }
+
+        if (stream->num_records == stream->offsets_size) {
+            stream->offsets_size *= 2;
+            stream->offsets = realloc(stream->offsets,
+                                      stream->offsets_size * sizeof(uint64_t));
+            mem_test(stream->offsets);
+        }
+        stream->offsets[stream->num_records] = stream->num_words;
+
+        head[0] = (uint32_t) (t - stream->last_time);
+        head[1] = (uint32_t) (j - i);
+        if (stream->format == SPK_FORMAT_BITMAP && num_words < j - i) {
+            head[1] |= SPK_BITMAP_FLAG;
+            memset(stream->words, 0, num_words * sizeof(uint32_t));
+            for (k = i; k < j; ++k) {
+                stream->words[stream->ids[k] >> 5] |= 1u << (stream->ids[k] & 31);
+            }
+            fwrite(head, sizeof(uint32_t), 2, stream->fp);
+            fwrite(stream->words, sizeof(uint32_t), num_words, stream->fp);
+            stream->num_words += 2 + num_words;
+        } else {
+            for (k = i; k < j; ++k) {
+                stream->words[k-i] = (uint32_t) stream->ids[k];
+            }
+            fwrite(head, sizeof(uint32_t), 2, stream->fp);
+            fwrite(stream->words, sizeof(uint32_t), j - i, stream->fp);
+            stream->num_words += 2 + j - i;
+        }
+        stream->last_time = t;
+        stream->num_records++;
+    }
+}
+
+
+/* ************************************************************************
+ * SPIKES_WRITER: Writer thread of a spike events stream. It waits for
+ * chunks handed over by the core, writes them to the events (ids) and
+ * temporary (times) files and frees them.
+ *
+ * Args : 
+ *  args (void *)       : Void pointer (implicit spk_stream struct)
+ *
+ * Returns :
+ *  NULL *
+ **************************************************************************/
+static void *spikes_writer(void *args) {
+    spk_stream *stream = (spk_stream *)args;
+
+    pthread_mutex_lock(&stream->lock);
+    for (;;) {
+        while (!stream->is_pending && !stream->is_done) {
+            pthread_cond_wait(&stream->cond, &stream->lock);
+        }
+        if (!stream->is_pending) {
+            break;
+        }
+        pthread_mutex_unlock(&stream->lock);
+
+        if (stream->format == SPK_FORMAT_LEGACY) {
+            fwrite(stream->ids, sizeof(unsigned long long), stream->length,
+                   stream->fp);
+            fwrite(stream->times, sizeof(unsigned long long), stream->length,
+                   stream->ft);
+        } else {
+            write_compact_chunk(stream);
+        }
+        dealloc(stream->ids);
+        dealloc(stream->times);
+
+        pthread_mutex_lock(&stream->lock);
+        stream->total += stream->length;
+        stream->length = 0;
+        stream->is_pending = false;
+        pthread_cond_broadcast(&stream->cond);
+    }
+    pthread_mutex_unlock(&stream->lock);
+
+    return NULL;
+}
+
+
+/* ************************************************************************
+ * HAND_OVER_SPIKES: This function passes the recorded spike events of a
+ * core to its writer thread and resets the events list. It blocks while
+ * the writer is still busy with the previous chunk.
+ *
+ * Args : 
+ *  core (nsat_core *)      : NSAT core struct
+ *  size (unsigned long long) : Capacity of the new events list
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+static void hand_over_spikes(nsat_core *core, unsigned long long size) {
+    spk_stream *stream = core->spk_stream;
+
+    pthread_mutex_lock(&stream->lock);
+    while (stream->is_pending) {
+        pthread_cond_wait(&stream->cond, &stream->lock);
+    }
+    stream->ids = core->events->array;
+    stream->times = core->events->times;
+    stream->length = core->events->length;
+    stream->is_pending = true;
+    pthread_cond_broadcast(&stream->cond);
+    pthread_mutex_unlock(&stream->lock);
+
+    /* The chunk now belongs to the writer, start a new one */
+    core->events->array = alloc(unsigned long long, size);
+    mem_test(core->events->array);
+    core->events->times = alloc(unsigned long long, size);
+    mem_test(core->events->times);
+    core->events->capacity = size;
+    core->events->length = 0;
+}
+
+
+/* ************************************************************************
+ * OPEN_SPIKES_STREAMS: This function opens the spike events files and
+ * starts one writer thread per core. The events are written to a partial
+ * file (<events file>.part) which is renamed when it is complete, and the
+ * events file of a previous run is removed.
+ *
+ * Args : 
+ *  fname (fnames *)        : File names struct
+ *  core (nsat_core *)      : Cores structs array
+ *  num_cores (int)         : Cores numbers
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void open_spikes_streams(fnames *fname, nsat_core *core, int num_cores) {
+    int p, err;
+    spk_stream *stream = NULL;
+
+    for(p = 0; p < num_cores; ++p) {
+        stream = alloc(spk_stream, 1);
+        stream->fname = gen_fname(fname->events, p, 1);
+        stream->part_fname = alloc(char, strlen(stream->fname)+6);
+        strcpy(stream->part_fname, stream->fname);
+        strcat(stream->part_fname, ".part");
+        stream->tmp_fname = NULL;
+        stream->ft = NULL;
+        stream->words = NULL;
+        stream->offsets = NULL;
+        stream->format = core[p].g_pms->spk_format;
+        stream->num_neurons = core[p].core_pms.num_neurons;
+
+        remove_stale_output(stream->fname);
+        if(!(stream->fp = fopen(stream->part_fname, "wb"))) {
+            printf("File %s cannot be opened!\n", stream->part_fname);
+            exit(-1);
+        }
+        if (stream->format == SPK_FORMAT_LEGACY) {
+            stream->tmp_fname = alloc(char, strlen(stream->fname)+7);
+            strcpy(stream->tmp_fname, stream->fname);
+            strcat(stream->tmp_fname, ".times");
+            if(!(stream->ft = fopen(stream->tmp_fname, "w+b"))) {
+                printf("File %s cannot be opened!\n", stream->tmp_fname);
+                exit(-1);
+            }
+        } else {
+            /* Enough room for the ids or the bitmap of one tick */
+            stream->words = alloc(uint32_t, stream->num_neurons + 1);
+            stream->offsets_size = 1024;
+            stream->offsets = alloc(uint64_t, stream->offsets_size);
+            mem_test(stream->offsets);
+        }
+
+        stream->ids = NULL;
+        stream->times = NULL;
+        stream->length = 0;
+        stream->total = 0;
+        stream->num_records = 0;
+        /* The header takes 8 words (see write_spikes_header) */
+        stream->num_words = 8;
+        stream->last_time = 0;
+        if (stream->format != SPK_FORMAT_LEGACY) {
+            write_spikes_header(stream);
+        }
+        stream->is_pending = false;
+        stream->is_done = false;
+        pthread_mutex_init(&stream->lock, NULL);
+        pthread_cond_init(&stream->cond, NULL);
+        err = pthread_create(&stream->writer, NULL, spikes_writer,
+                             (void *)stream);
+        if (err != 0) {
+            handle_error_en(err, "pthread_create");
+        }
+        core[p].spk_stream = stream;
+    }
+}
+
+
+/* ************************************************************************
+ * STREAM_SPIKES_EVENTS: This function hands the recorded spike events over
+ * to the writer thread once they fill a chunk. It is called by every core
+ * after its spike events have been collected.
+ *
+ * Args : 
+ *  core (nsat_core *)      : NSAT core struct
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void stream_spikes_events(nsat_core *core) {
+    if (core->spk_stream != NULL &&
+        core->events->length >= core->g_pms->spk_chunk_size) {
+        hand_over_spikes(core, core->g_pms->spk_chunk_size);
+    }
+}
+
+
 /* ************************************************************************
  * WRITE_SPIKES_EVENTS: This function stores to a file the spike events. 
+ * If the events have been streamed, it flushes the last chunk, stops the
+ * writer threads, completes the events file and moves it in place. In the
+ * legacy format the file holds all the neurons ids followed by all the
+ * spike times (uint64).
  *
  * Args : 
  *  fname (char *)          : Output file name
@@ -235,29 +805,80 @@ void write_final_weights(fnames *fname, nsat_core *core,
  **************************************************************************/
 void write_spikes_events(fnames *fname, nsat_core *core, int num_cores) {
     unsigned int p;
+    size_t n;
     char *filename=NULL;                     /* Tmp filename */  
+    unsigned long long *buf = NULL;
+    spk_stream *stream = NULL;
     FILE *fp = NULL;
 
     for(p = 0; p < num_cores; ++p) {
-        filename = gen_fname(fname->events, p, 1);
+        stream = core[p].spk_stream;
+        if (stream == NULL) {
+            filename = gen_fname(fname->events, p, 1);
 
-        if(!(fp = fopen(filename, "wb"))) {
-            printf("File %s cannot be opened!\n", filename);
-            exit(-1);
+            if(!(fp = fopen(filename, "wb"))) {
+                printf("File %s cannot be opened!\n", filename);
+                exit(-1);
+            }
+        
+            fwrite(core[p].events->array,
+                   sizeof(unsigned long long),
+                   core[p].events->length,
+                   fp);
+
+            fwrite(core[p].events->times,
+                   sizeof(unsigned long long),
+                   core[p].events->length,
+                   fp);
+
+            fclose(fp);
+            dealloc(filename);
+            continue;
         }
-    
-        fwrite(core[p].events->array,
-               sizeof(unsigned long long),
-               core[p].events->length,
-               fp);
 
-        fwrite(core[p].events->times,
-               sizeof(unsigned long long),
-               core[p].events->length,
-               fp);
+        if (core[p].events->length > 0) {
+            hand_over_spikes(&core[p], 1);
+        }
 
-        fclose(fp);
-        dealloc(filename);
+        pthread_mutex_lock(&stream->lock);
+        stream->is_done = true;
+        pthread_cond_broadcast(&stream->cond);
+        pthread_mutex_unlock(&stream->lock);
+        pthread_join(stream->writer, NULL);
+
+        if (stream->format == SPK_FORMAT_LEGACY) {
+            /* Append the spike times after the neurons ids */
+            buf = alloc(unsigned long long, core[p].g_pms->spk_chunk_size);
+            rewind(stream->ft);
+            while ((n = fread(buf, sizeof(unsigned long long),
+                              core[p].g_pms->spk_chunk_size, stream->ft)) > 0) {
+                fwrite(buf, sizeof(unsigned long long), n, stream->fp);
+            }
+            dealloc(buf);
+            fclose(stream->ft);
+            remove(stream->tmp_fname);
+        } else {
+            /* Append the index of the records and fill in the counts */
+            fwrite(stream->offsets, sizeof(uint64_t), stream->num_records,
+                   stream->fp);
+            rewind(stream->fp);
+            write_spikes_header(stream);
+        }
+        fclose(stream->fp);
+        if (rename(stream->part_fname, stream->fname) != 0) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("File %s cannot be renamed!\n", stream->part_fname);
+            exit(-1);
+        }
+        dealloc(stream->words);
+        dealloc(stream->offsets);
+        pthread_mutex_destroy(&stream->lock);
+        pthread_cond_destroy(&stream->cond);
+        dealloc(stream->fname);
+        dealloc(stream->part_fname);
+        dealloc(stream->tmp_fname);
+        dealloc(stream);
+        core[p].spk_stream = NULL;
     }
 }
 
@@ -316,6 +937,22 @@ void write_shared_memories(fnames *fname, nsat_core *core, int num_cores) {
 }
 
 
+/* ************************************************************************
+ * REMOVE_STALE_OUTPUT: This function removes an output file left by a
+ * previous run, when the current run does not write it (or not yet), so
+ * that it is not read as an output of the current run.
+ *
+ * Args :
+ *  filename (char *)       : Output file name
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void remove_stale_output(char *filename) {
+    remove(filename);
+}
+
+
 void write_spike_statistics(fnames *fname, nsat_core *core, int num_cores) {
     uint64_t p, j;
     FILE *fp;
@@ -0,0 +1,503 @@
+/* ************************************************************************
+ * NSATlib_v2 This is a C implementation of the NSATlib_v2 python
+ * script. It simulates the NSAT.
+ * Copyright (C) <2016>  UCI, Georgios Detorakis (gdetor@protonmail.com)
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program.  If not, see <http://www.gnu.org/licenses/>.
+ **************************************************************************/
+#include "nsat.h"
+
+
+/* ************************************************************************
+ * NEW_ARRAY_LIST: This function allocates and initializes an array list.
+ *
+ * Args :
+ *  void
+ *
+ * Returns :
+ *  The array list (array_list *)
+ **************************************************************************/
+static array_list *new_array_list(void) {
+    array_list *list = alloc(array_list, 1);
+    array_list_init(&list, 1);
+    return list;
+}
+
+
+/* ************************************************************************
+ * REPLICATE_CORES: This function builds the replica of the cores used by a
+ * sample worker. The replica shares the read-only data of the cores
+ * (parameters groups, synapses lists, synaptic weights, routers and
+ * initial states) and owns the neurons states, the temporary variables,
+ * the events lists and the dataset sources state. Learning and monitors
+ * are disabled.
+ *
+ * Args :
+ *  cores (nsat_core *)     : Cores structs array
+ *  num_cores (int)         : Cores numbers
+ *
+ * Returns :
+ *  The replica (nsat_core *)
+ **************************************************************************/
+static nsat_core *replicate_cores(nsat_core *cores, unsigned int num_cores) {
+    unsigned int p;
+    unsigned long long j, size;
+    nsat_core *rep = alloc(nsat_core, num_cores);
+
+    memcpy(rep, cores, num_cores * sizeof(nsat_core));
+    for (p = 0; p < num_cores; ++p) {
+        rep[p].core_pms.is_learning_on = false;
+
+        rep[p].mon_pms = alloc_zeros(monitors_params, 1);
+        rep[p].files = NULL;
+        rep[p].spk_stream = NULL;
+        rep[p].rate_src = NULL;
+        rep[p].prof = NULL;
+
+        rep[p].nsat_neuron = alloc(unit, cores[p].core_pms.num_neurons);
+        memcpy(rep[p].nsat_neuron, cores[p].nsat_neuron,
+               cores[p].core_pms.num_neurons * sizeof(unit));
+        for (j = 0; j < cores[p].core_pms.num_neurons; ++j) {
+            rep[p].nsat_neuron[j].is_spk_rec_on = false;
+            rep[p].nsat_neuron[j].s = alloc(state,
+                                            cores[p].core_pms.num_states);
+            memcpy(rep[p].nsat_neuron[j].s, cores[p].nsat_neuron[j].s,
+                   cores[p].core_pms.num_states * sizeof(state));
+        }
+        rep[p].ext_neuron = alloc(unit, cores[p].core_pms.num_inputs);
+        memcpy(rep[p].ext_neuron, cores[p].ext_neuron,
+               cores[p].core_pms.num_inputs * sizeof(unit));
+
+        size = cores[p].core_pms.num_neurons * cores[p].core_pms.num_states;
+        rep[p].vars = alloc(core_vars, 1);
+        rep[p].vars->tX = alloc_zeros(STATETYPE, size);
+        rep[p].vars->acm = alloc_zeros(STATETYPE, size);
+        rep[p].vars->g = alloc_zeros(STATETYPE, size);
+        rep[p].vars->xinit = cores[p].vars->xinit;
+        rep[p].vars->rec_spk_on = cores[p].vars->rec_spk_on;
+
+        rep[p].events = new_array_list();
+        rep[p].ext_events = new_array_list();
+        rep[p].nsat_events = new_array_list();
+        rep[p].trans_events = new_array_list();
+        rep[p].mon_events = new_array_list();
+        rep[p].ext_caspk = new_array_list();
+        rep[p].nsat_caspk = new_array_list();
+
+        if (cores[p].data_src != NULL) {
+            rep[p].data_src = alloc(data_src, 1);
+            memcpy(rep[p].data_src, cores[p].data_src, sizeof(data_src));
+            rep[p].data_src->thr = alloc_zeros(uint32_t,
+                                               cores[p].core_pms.num_inputs);
+            rep[p].data_src->phase = alloc_zeros(uint32_t,
+                                                 cores[p].core_pms.num_inputs);
+        }
+    }
+    return rep;
+}
+
+
+/* ************************************************************************
+ * DEALLOC_REPLICA: This function frees the data owned by a replica.
+ *
+ * Args :
+ *  rep (nsat_core *)       : Replica of the cores
+ *  num_cores (int)         : Cores numbers
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+static void dealloc_replica(nsat_core *rep, unsigned int num_cores) {
+    unsigned int p;
+    unsigned long long j;
+    array_list **lists[7];
+    int i;
+
+    for (p = 0; p < num_cores; ++p) {
+        dealloc(rep[p].mon_pms);
+        for (j = 0; j < rep[p].core_pms.num_neurons; ++j) {
+            dealloc(rep[p].nsat_neuron[j].s);
+        }
+        dealloc(rep[p].nsat_neuron);
+        dealloc(rep[p].ext_neuron);
+        dealloc(rep[p].vars->tX);
+        dealloc(rep[p].vars->acm);
+        dealloc(rep[p].vars->g);
+        dealloc(rep[p].vars);
+
+        lists[0] = &rep[p].events;
+        lists[1] = &rep[p].ext_events;
+        lists[2] = &rep[p].nsat_events;
+        lists[3] = &rep[p].trans_events;
+        lists[4] = &rep[p].mon_events;
+        lists[5] = &rep[p].ext_caspk;
+        lists[6] = &rep[p].nsat_caspk;
+        for (i = 0; i < 7; ++i) {
+            array_list_destroy(lists[i], 1);
+            dealloc(*lists[i]);
+        }
+
+        if (rep[p].data_src != NULL) {
+            dealloc(rep[p].data_src->thr);
+            dealloc(rep[p].data_src->phase);
+            dealloc(rep[p].data_src);
+        }
+    }
+    dealloc(rep);
+}
+
+
+/* ************************************************************************
+ * RESET_REPLICA: This function sets a replica to the initial conditions
+ * of a sample: neurons states to their initial values (Xinit), counters,
+ * refractory periods and temporary variables to zero, and the dataset
+ * sources to the schedule entry of the sample. The RNGs of the sample draw
+ * from streams of their own, selected by the sample number, so that a
+ * sample does not depend on the worker that runs it. A simulation uses the
+ * 3 * num_cores + 1 streams from rng_init_seq on (global, rate sources,
+ * dataset sources and replicas), sample s uses the (s + 1)-th next block.
+ *
+ * Args :
+ *  rep (nsat_core *)       : Replica of the cores
+ *  num_cores (int)         : Cores numbers
+ *  sample (int)            : Sample number
+ *  rng (pcg32_random_t *)  : Worker's RNG
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+static void reset_replica(nsat_core *rep, unsigned int num_cores,
+                          unsigned long long sample, pcg32_random_t *rng) {
+    unsigned int p, k;
+    unsigned long long j, size, num_states, seq;
+    global_params *g_pms = rep[0].g_pms;
+    data_src *src = NULL;
+
+    seq = g_pms->rng_init_seq + (sample + 1) * (3 * num_cores + 1);
+    pcg32_srandom_r(rng, g_pms->rng_init_state, seq);
+    normal_reset();
+
+    for (p = 0; p < num_cores; ++p) {
+        num_states = rep[p].core_pms.num_states;
+        for (j = 0; j < rep[p].core_pms.num_neurons; ++j) {
+            for (k = 0; k < num_states; ++k) {
+                rep[p].nsat_neuron[j].s[k].x = rep[p].vars->xinit[j*num_states+k];
+            }
+            rep[p].nsat_neuron[j].counter = -2000;
+            rep[p].nsat_neuron[j].spk_counter = 0;
+            rep[p].nsat_neuron[j].ref_period = 0;
+        }
+        for (j = 0; j < rep[p].core_pms.num_inputs; ++j) {
+            rep[p].ext_neuron[j].counter = -2000;
+        }
+
+        size = rep[p].core_pms.num_neurons * num_states;
+        memset(rep[p].vars->tX, 0, size * sizeof(STATETYPE));
+        memset(rep[p].vars->acm, 0, size * sizeof(STATETYPE));
+        memset(rep[p].vars->g, 0, size * sizeof(STATETYPE));
+
+        array_list_clean(&rep[p].ext_events, 1);
+        array_list_clean(&rep[p].nsat_events, 1);
+        array_list_clean(&rep[p].trans_events, 1);
+
+        /* Only the sample's schedule entry is presented */
+        if ((src = rep[p].data_src) != NULL) {
+            src->entry = sample;
+            src->num_entries = sample + 1;
+            src->t_end = 0;
+            pcg32_srandom_r(&src->rng, g_pms->rng_init_state,
+                            seq + num_cores + base_core_id(rep[p]) + 1);
+        }
+    }
+}
+
+
+/* ************************************************************************
+ * IS_SAMPLE_DECIDED: This function evaluates the stopping rule of the
+ * samples on the counted neurons of the decision core: the first neuron
+ * leads the second one by decision_lead spikes, or has fired
+ * decision_count spikes.
+ *
+ * Args :
+ *  core (nsat_core *)          : Decision core (replica)
+ *  mon_pms (monitors_params *) : Monitors parameters of the decision core
+ *
+ * Returns :
+ *  true if the sample is decided, false otherwise
+ **************************************************************************/
+static bool is_sample_decided(nsat_core *core, monitors_params *mon_pms) {
+    unsigned long long i, cnt, first = 0, second = 0;
+    global_params *g_pms = core->g_pms;
+
+    for (i = 0; i < mon_pms->num_count_ids; ++i) {
+        cnt = core->nsat_neuron[mon_pms->count_ids[i]].spk_counter;
+        if (cnt > first) {
+            second = first;
+            first = cnt;
+        } else if (cnt > second) {
+            second = cnt;
+        }
+    }
+    return (g_pms->decision_lead > 0 && first - second >= g_pms->decision_lead) ||
+           (g_pms->decision_count > 0 && first >= g_pms->decision_count);
+}
+
+
+/* ************************************************************************
+ * RUN_SAMPLE: This function simulates one sample on a replica, from the
+ * earliest start to the latest end of its schedule entries, and gathers
+ * the spike counts of the counted neurons. The cores of the replica are
+ * stepped one after the other and the spikes are routed between them at
+ * every time step, as the cores threads do. If a stopping rule is set,
+ * the sample ends at the tick it is decided.
+ *
+ * Args :
+ *  cores (nsat_core *)     : Cores structs array
+ *  rep (nsat_core *)       : Replica of the cores
+ *  num_cores (int)         : Cores numbers
+ *  sample (int)            : Sample number
+ *  counts (uint32_t **)    : Spike counts per core (samples, counted ids)
+ *
+ * Returns :
+ *  The tick of the decision, ULLONG_MAX if the sample was not decided
+ **************************************************************************/
+static unsigned long long run_sample(nsat_core *cores, nsat_core *rep,
+                                     unsigned int num_cores,
+                                     unsigned long long sample,
+                                     uint32_t **counts) {
+    unsigned int p;
+    unsigned long long t, t_start = ULLONG_MAX, t_end = 0, i, q, id;
+    unsigned long long *entry = NULL, decision = ULLONG_MAX;
+    unsigned int dc = rep[0].g_pms->decision_core;
+    bool is_rule_on = rep[0].g_pms->decision_lead > 0 ||
+                      rep[0].g_pms->decision_count > 0;
+    monitors_params *mon_pms = NULL;
+    unit *neuron = NULL;
+
+    for (p = 0; p < num_cores; ++p) {
+        if (rep[p].data_src != NULL) {
+            entry = &rep[p].data_src->schedule[3*sample];
+            t_start = entry[1] < t_start ? entry[1] : t_start;
+            t_end = entry[1] + entry[2] > t_end ? entry[1] + entry[2] : t_end;
+        }
+    }
+    if (t_start < 1) {
+        t_start = 1;
+    }
+
+    for (t = t_start; t < t_end; ++t) {
+        for (p = 0; p < num_cores; ++p) {
+            if (rep[p].data_src != NULL) {
+                get_dataset_source_events(&rep[p], t);
+            }
+            rep[p].curr_time = t;
+            nsat_dynamics(&rep[p]);
+        }
+
+        if (rep[0].g_pms->is_routing_on) {
+            for (p = 0; p < num_cores; ++p) {
+                for(i = 0; i < rep[p].trans_events->length; ++i) {
+                    neuron = &rep[p].nsat_neuron[rep[p].trans_events->array[i]];
+                    for (q = 0; q < neuron->router_size; ++q) {
+                        array_list_push(&rep[neuron->ptr_cores[q].dst_core_id].ext_events,
+                                        neuron->ptr_cores[q].dst_neuron_id,
+                                        t, 1);
+                    }
+                }
+                array_list_clean(&rep[p].trans_events, 1);
+            }
+        }
+
+        for (p = 0; p < num_cores; ++p) {
+            nsat_events_and_learning(&rep[p]);
+        }
+
+        /* The counts only change when the decision core spikes */
+        if (is_rule_on && rep[dc].nsat_events->length > 0 &&
+            is_sample_decided(&rep[dc], cores[dc].mon_pms)) {
+            decision = t;
+            break;
+        }
+    }
+
+    for (p = 0; p < num_cores; ++p) {
+        mon_pms = cores[p].mon_pms;
+        for (i = 0; i < mon_pms->num_count_ids; ++i) {
+            id = mon_pms->count_ids[i];
+            counts[p][sample * mon_pms->num_count_ids + i] =
+                rep[p].nsat_neuron[id].spk_counter;
+        }
+    }
+    return decision;
+}
+
+
+/* ************************************************************************
+ * INFERENCE_WORKER: This function is the body of a sample worker thread.
+ * It takes the next sample to run until all the samples are done.
+ *
+ * Args :
+ *  args (void *)           : Worker struct (nsat_worker *)
+ *
+ * Returns :
+ *  NULL *
+ **************************************************************************/
+static void *inference_worker(void *args) {
+    nsat_worker *worker = (nsat_worker *)args;
+    nsat_core *rep = NULL;
+    pcg32_random_t rng;
+    unsigned long long sample;
+
+    rep = replicate_cores(worker->cores, worker->num_cores);
+    pcg32_thread_rng(&rng);
+
+    while (1) {
+        pthread_mutex_lock(worker->lock);
+        sample = (*worker->next_sample)++;
+        pthread_mutex_unlock(worker->lock);
+        if (sample >= worker->num_samples) {
+            break;
+        }
+        reset_replica(rep, worker->num_cores, sample, &rng);
+        worker->decisions[sample] = run_sample(worker->cores, rep,
+                                               worker->num_cores, sample,
+                                               worker->counts);
+    }
+
+    pcg32_thread_rng(NULL);
+    dealloc_replica(rep, worker->num_cores);
+    return NULL;
+}
+
+
+/* ************************************************************************
+ * RUN_INFERENCE: This function runs the samples of the dataset sources
+ * as independent simulations (sample-parallel inference). Every sample
+ * starts from the initial states with the synaptic weights frozen and the
+ * samples are distributed over num_workers threads that share the
+ * synapses of the cores. The spike counts of the counted neurons are
+ * written per sample, one row per sample, to the spike counts files (the
+ * window is 0 in the header). The cores must have the same number of
+ * schedule entries. With a stopping rule, the tick at which every sample
+ * was decided (uint64, ULLONG_MAX if it was not) is written to the
+ * decisions file, which is removed otherwise.
+ *
+ * Args :
+ *  fname (fnames *)        : File names struct
+ *  cores (nsat_core *)     : Cores structs array
+ *  g_pms (global_params *) : Global parameters
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void run_inference(fnames *fname, nsat_core *cores, global_params *g_pms) {
+    unsigned int p, w, num_workers;
+    unsigned long long num_samples = ULLONG_MAX, next_sample = 0;
+    unsigned long long window = 0, *decisions = NULL;
+    uint32_t **counts = NULL;
+    char *filename = NULL;
+    FILE *fp = NULL;
+    nsat_worker *workers = NULL;
+    pthread_t *workers_t = NULL;
+    pthread_mutex_t samples_lock = PTHREAD_MUTEX_INITIALIZER;
+
+    for (p = 0; p < g_pms->num_cores; ++p) {
+        if (cores[p].mon_pms->count_window > 0) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Spike counts windows are not available in inference mode!\n");
+            exit(-1);
+        }
+        if (cores[p].data_src == NULL) {
+            continue;
+        }
+        if (num_samples != ULLONG_MAX &&
+            cores[p].data_src->num_entries != num_samples) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("The cores datasets have different numbers of samples!\n");
+            exit(-1);
+        }
+        num_samples = cores[p].data_src->num_entries;
+    }
+    if (num_samples == ULLONG_MAX) {
+        printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+        printf("Inference mode needs the samples of a dataset source!\n");
+        exit(-1);
+    }
+
+    counts = alloc(uint32_t *, g_pms->num_cores);
+    for (p = 0; p < g_pms->num_cores; ++p) {
+        counts[p] = alloc_zeros(uint32_t, num_samples *
+                                cores[p].mon_pms->num_count_ids + 1);
+    }
+
+    if ((g_pms->decision_lead > 0 || g_pms->decision_count > 0) &&
+        cores[g_pms->decision_core].mon_pms->num_count_ids == 0) {
+        printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+        printf("The stopping rule needs the counted neurons of Core %u!\n",
+               g_pms->decision_core);
+        exit(-1);
+    }
+    decisions = alloc(unsigned long long, num_samples + 1);
+
+    num_workers = g_pms->num_workers;
+    if (num_workers > num_samples) {
+        num_workers = num_samples > 0 ? num_samples : 1;
+    }
+    workers = alloc(nsat_worker, num_workers);
+    workers_t = alloc(pthread_t, num_workers);
+    for (w = 0; w < num_workers; ++w) {
+        workers[w].cores = cores;
+        workers[w].num_cores = g_pms->num_cores;
+        workers[w].num_samples = num_samples;
+        workers[w].next_sample = &next_sample;
+        workers[w].lock = &samples_lock;
+        workers[w].counts = counts;
+        workers[w].decisions = decisions;
+        pthread_create(&workers_t[w], NULL, inference_worker,
+                       (void *)&workers[w]);
+    }
+    for (w = 0; w < num_workers; ++w) {
+        pthread_join(workers_t[w], NULL);
+    }
+    pthread_mutex_destroy(&samples_lock);
+
+    for (p = 0; p < g_pms->num_cores; ++p) {
+        filename = gen_fname(fname->spk_counts, p, 1);
+        fp = fopen(filename, "wb");
+        file_test(fp, filename);
+        fwrite(&window, sizeof(unsigned long long), 1, fp);
+        fwrite(&cores[p].mon_pms->num_count_ids, sizeof(unsigned long long),
+               1, fp);
+        fwrite(cores[p].mon_pms->count_ids, sizeof(unsigned long long),
+               cores[p].mon_pms->num_count_ids, fp);
+        fwrite(counts[p], sizeof(uint32_t),
+               num_samples * cores[p].mon_pms->num_count_ids, fp);
+        fclose(fp);
+        dealloc(filename);
+        dealloc(counts[p]);
+    }
+    dealloc(counts);
+
+    if (g_pms->decision_lead > 0 || g_pms->decision_count > 0) {
+        fp = fopen(fname->decisions, "wb");
+        file_test(fp, fname->decisions);
+        fwrite(decisions, sizeof(unsigned long long), num_samples, fp);
+        fclose(fp);
+    } else {
+        remove_stale_output(fname->decisions);
+    }
+    dealloc(decisions);
+    dealloc(workers);
+    dealloc(workers_t);
+}
@@ -45,6 +45,12 @@ void allocate_cores(nsat_core **cores,
         (*cores)[p].mon_pms->mon_final_weights = false;
         (*cores)[p].mon_pms->mon_spikes = false;
         (*cores)[p].mon_pms->mon_stats = false;
+        (*cores)[p].mon_pms->num_rec_states = 0;
+        (*cores)[p].mon_pms->rec_states = NULL;
+        (*cores)[p].mon_pms->rec_stride = 1;
+        (*cores)[p].mon_pms->count_window = 0;
+        (*cores)[p].mon_pms->num_count_ids = 0;
+        (*cores)[p].mon_pms->count_ids = NULL;
 
         /* Allocate and initialize synapses statistics structure */
         (*cores)[p].syn = alloc(synapse_stat, 1);
@@ -84,6 +90,15 @@ void allocate_cores(nsat_core **cores,
         (*cores)[p].files->fw = NULL;
         (*cores)[p].files->fsa = NULL; 
         (*cores)[p].files->fr = NULL;
+        (*cores)[p].files->states_buf = NULL;
+        (*cores)[p].files->rec_ids = NULL;
+        (*cores)[p].files->num_rec_ids = 0;
+        (*cores)[p].files->syn_buf = NULL;
+        (*cores)[p].files->syn_w_ptrs = NULL;
+        (*cores)[p].files->num_syn_mon = 0;
+        (*cores)[p].files->fc = NULL;
+        (*cores)[p].files->counts = NULL;
+        (*cores)[p].files->count_slot = NULL;
 
         /* Build external events names for each core */
         (*cores)[p].ext_evts_fname = gen_ext_evts_fname(fname->ext_events, p);
@@ -104,6 +119,10 @@ void allocate_cores(nsat_core **cores,
         (*cores)[p].mon_events = alloc(array_list, 1);
         array_list_init(&(*cores)[p].mon_events, 1);
 
+        (*cores)[p].spk_stream = NULL;
+        (*cores)[p].rate_src = NULL;
+        (*cores)[p].data_src = NULL;
+
         (*cores)[p].ext_caspk = alloc(array_list, 1);
         array_list_init(&(*cores)[p].ext_caspk, 1);
 
@@ -119,9 +138,12 @@ void allocate_cores(nsat_core **cores,
         (*cores)[p].vars->rec_spk_on = NULL;
 
         (*cores)[p].shared_memory = NULL;
+        (*cores)[p].syn_pool = NULL;
 
         (*cores)[p].curr_time = 0;
         (*cores)[p].g_pms = NULL;
+        (*cores)[p].ctx = NULL;
+        (*cores)[p].prof = NULL;
         (*cores)[p].ext_neuron = NULL;
         (*cores)[p].nsat_neuron = NULL;
 
@@ -239,6 +261,154 @@ int bin_file_size(FILE *fp) {
 }
 
 
+/* ************************************************************************
+ * LINK_SYNAPSE: This function appends a synapse read from a pointer table
+ * to the synapses list of its source unit. Nodes are taken from the core's
+ * synapses pool.
+ *
+ * Args :
+ *  core (nsat_core *)      : NSAT core data structure
+ *  src (uint64_t)          : Source unit (inputs first)
+ *  dst (uint64_t)          : Destination unit (inputs first)
+ *  stt (uint64_t)          : Destination state
+ *  ptr (uint64_t)          : Index in the shared memory
+ *  node (syn_list_node *)  : Pool node to link
+ *
+ * Returns :
+ *  true if the synapse belongs to the core, false otherwise
+ **************************************************************************/
+static bool link_synapse(nsat_core *core, uint64_t src, uint64_t dst,
+                         uint64_t stt, uint64_t ptr, syn_list_node *node) {
+    uint64_t num_inputs = core->core_pms.num_inputs;
+    uint64_t tot_num_neurons = num_inputs + core->core_pms.num_neurons;
+
+    if (ptr >= core->sm_size || stt >= core->core_pms.num_states) {
+        printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+        printf("Invalid synaptic pointer (%"PRIu64", %"PRIu64")!\n", ptr, stt);
+        exit(-1);
+    }
+
+    if (!core->core_pms.is_ext_evts_on) {
+        if (src < core->core_pms.num_neurons) {
+            push_syn_node(&core->nsat_neuron[src].syn_ptr[stt], node,
+                          dst, &core->shared_memory[ptr]);
+            return true;
+        }
+        return false;
+    }
+
+    if (src < num_inputs) {
+        if(dst < num_inputs){
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Invalid synaptic weights destinations!\n");
+            exit(-1);
+        }
+        push_syn_node(&core->ext_neuron[src].syn_ptr[stt], node,
+                      dst - num_inputs, &core->shared_memory[ptr]);
+        return true;
+    } else if (src < tot_num_neurons) {
+        push_syn_node(&core->nsat_neuron[src - num_inputs].syn_ptr[stt], node,
+                      dst - num_inputs, &core->shared_memory[ptr]);
+        return true;
+    }
+    return false;
+}
+
+
+/* ************************************************************************
+ * LOAD_PTR_TABLE: This function reads a pointer table file and links its
+ * synapses. Two formats are supported:
+ *  - compact (magic "NSPT", version, number of rows and states, nnz,
+ *    uint64 row offsets, then uint32 dst, uint32 ptr and uint8 state
+ *    arrays sorted by (src, state)),
+ *  - legacy (uint64 nnz followed by nnz uint64 (src, dst, state, ptr)).
+ * Each array is read with a single fread.
+ *
+ * Args :
+ *  core (nsat_core *)      : NSAT core data structure
+ *  fp (FILE *)             : Pointer table file
+ *
+ * Returns :
+ *  The number of records in the table and the number of linked synapses
+ *  (through parity_check)
+ **************************************************************************/
+static uint64_t load_ptr_table(nsat_core *core, FILE *fp,
+                               uint64_t *parity_check) {
+    char magic[4] = {0};
+    uint32_t header[3] = {0};
+    uint64_t i, r, non_zero_elements = 0, *offsets = NULL, *records = NULL;
+    uint32_t *dst = NULL, *ptr = NULL;
+    uint8_t *stt = NULL;
+    size_t nread;
+
+    *parity_check = 0;
+    nread = fread(magic, sizeof(char), 4, fp);
+    if (nread == 4 && !memcmp(magic, PTR_TABLE_MAGIC, 4)) {
+        if (fread(header, sizeof(uint32_t), 3, fp) != 3 ||
+            fread(&non_zero_elements, sizeof(uint64_t), 1, fp) != 1 ||
+            header[0] != PTR_TABLE_VERSION) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Unsupported synaptic pointer table (version %u)!\n",
+                   header[0]);
+            exit(-1);
+        }
+        offsets = alloc(uint64_t, header[1] + 1);
+        dst = alloc(uint32_t, non_zero_elements + 1);
+        ptr = alloc(uint32_t, non_zero_elements + 1);
+        stt = alloc(uint8_t, non_zero_elements + 1);
+        if (fread(offsets, sizeof(uint64_t), header[1] + 1, fp) != header[1] + 1 ||
+            fread(dst, sizeof(uint32_t), non_zero_elements, fp) != non_zero_elements ||
+            fread(ptr, sizeof(uint32_t), non_zero_elements, fp) != non_zero_elements ||
+            fread(stt, sizeof(uint8_t), non_zero_elements, fp) != non_zero_elements) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Truncated synaptic pointer table!\n");
+            exit(-1);
+        }
+
+        core->syn_pool = alloc(syn_list_node, non_zero_elements + 1);
+        mem_test(core->syn_pool);
+        for (r = 0; r < header[1]; ++r) {
+            for (i = offsets[r]; i < offsets[r+1]; ++i) {
+                if (link_synapse(core, r, dst[i], stt[i], ptr[i],
+                                 &core->syn_pool[*parity_check])) {
+                    (*parity_check)++;
+                }
+            }
+        }
+        dealloc(offsets);
+        dealloc(dst);
+        dealloc(ptr);
+        dealloc(stt);
+    } else {
+        rewind(fp);
+        if (fread(&non_zero_elements, sizeof(uint64_t), 1, fp) != 1) {
+            non_zero_elements = 0;
+        }
+        records = alloc(uint64_t, 4 * non_zero_elements + 1);
+        mem_test(records);
+        if (fread(records, sizeof(uint64_t), 4 * non_zero_elements, fp) !=
+            4 * non_zero_elements) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Truncated synaptic pointer table!\n");
+            exit(-1);
+        }
+
+        core->syn_pool = alloc(syn_list_node, non_zero_elements + 1);
+        mem_test(core->syn_pool);
+        for (i = 0; i < non_zero_elements; ++i) {
+            if (link_synapse(core, records[4*i], records[4*i+1],
+                             records[4*i+2], records[4*i+3],
+                             &core->syn_pool[*parity_check])) {
+                (*parity_check)++;
+            }
+        }
+        dealloc(records);
+    }
+
+    return non_zero_elements;
+}
+
+
 /* ************************************************************************
  * INITIALIZE_INCORES_CONNECTIONS: This function initializes the NSAT
  * synaptic connections reading the synaptic strengths from a file per core.
@@ -253,19 +423,20 @@ int bin_file_size(FILE *fp) {
  **************************************************************************/
 void initialize_incores_connections(fnames *fname, nsat_core **core,
                                     unsigned int num_cores) {
-    int i;
     size_t sm_size;
     unsigned int p;
     unsigned long long j;
-    unsigned long long tot_num_neurons, non_zero_elements = 0;
-    unsigned long long src, dst, stt, ptr;
-    int parity_check = 0;
+    uint64_t non_zero_elements = 0, parity_check = 0;
     char *w_fname = NULL, *ptr_fname = NULL;
 
     FILE *fp, *fw;
 
     for (p = 0; p < num_cores; ++p) {
-        ptr_fname = gen_fname(fname->syn_ptr_table, p, 1);
+        /* Replicas read the tables of their core (see initialize_replicas) */
+        if (is_sharing_synapses((*core)[p])) {
+            continue;
+        }
+        ptr_fname = gen_fname(fname->syn_ptr_table, base_core_id((*core)[p]), 1);
         if(!(fp = fopen(ptr_fname, "rb"))) {
             printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
             printf("File %s not found!\n", fname->syn_ptr_table);
@@ -273,7 +444,7 @@ void initialize_incores_connections(fnames *fname, nsat_core **core,
         }
         dealloc(ptr_fname);
 
-        w_fname = gen_fname(fname->syn_wgt_table, p, 1);
+        w_fname = gen_fname(fname->syn_wgt_table, base_core_id((*core)[p]), 1);
         if(!(fw = fopen(w_fname, "rb"))) {
             printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
             printf("File %s not found!\n", fname->syn_wgt_table);
@@ -298,92 +469,28 @@ void initialize_incores_connections(fnames *fname, nsat_core **core,
             }
         }
 
-        if (!(*core)[p].core_pms.is_ext_evts_on) {
-            non_zero_elements = 0;
-            parity_check = 0;
-
-            /* Read the pointer table */
-            fread(&non_zero_elements, sizeof(unsigned long long), 1, fp);
-            for (i = 0; i < non_zero_elements; ++i) {
-                fread(&src, sizeof(unsigned long long), 1, fp);
-                fread(&dst, sizeof(unsigned long long), 1, fp);
-                fread(&stt, sizeof(unsigned long long), 1, fp);
-                fread(&ptr, sizeof(unsigned long long), 1, fp);
-
-                if (src < (*core)[p].core_pms.num_neurons) {
-                    push_syn(&(*core)[p].nsat_neuron[src].syn_ptr[stt],
-                             dst,
-                             &(*core)[p].shared_memory[ptr]);
-                    parity_check++;
-                } else {
-                    ;
-                }
-            }
+        /* Read the pointer table */
+        non_zero_elements = load_ptr_table(&(*core)[p], fp, &parity_check);
+        fclose(fp);
 
-            /* Check if the number of input weights is valid */
-            if (parity_check != non_zero_elements) {
-                printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
-                printf("Invalid synaptic weights dimension!\n");
-                printf("%d %d %llu\n", parity_check,
-                                     non_zero_elements,
-                                     (*core)[p].core_pms.num_neurons);
-                fclose(fp);
-                exit(-1);
-            }
+        /* Check if the number of input weights is valid */
+        if (parity_check != non_zero_elements) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Invalid synaptic weights dimension!\n");
+            printf("%"PRIu64" %"PRIu64" %llu\n", parity_check,
+                                               non_zero_elements,
+                                               (*core)[p].core_pms.num_neurons);
+            exit(-1);
+        }
 
+        if (!(*core)[p].core_pms.is_ext_evts_on) {
             /* Count number of NSAT synapses */
             count_synapses(&(*core)[p].nsat_neuron,
                            &(*core)[p].syn->tot_nsat_syn_num,
                            (*core)[p].core_pms.num_neurons,
                            (*core)[p].core_pms.num_states);
             (*core)[p].syn->tot_ext_syn_num = 0;
-        
         } else {
-            non_zero_elements = 0;
-            parity_check = 0;
-            tot_num_neurons = (*core)[p].core_pms.num_inputs +
-                              (*core)[p].core_pms.num_neurons;
-        
-            /* Read the non zero elements from fp */
-            fread(&non_zero_elements, sizeof(unsigned long long), 1, fp);
-            for (i = 0; i < non_zero_elements; ++i) {
-                fread(&src, sizeof(unsigned long long), 1, fp);
-                fread(&dst, sizeof(unsigned long long), 1, fp);
-                fread(&stt, sizeof(unsigned long long), 1, fp);
-                fread(&ptr, sizeof(unsigned long long), 1, fp);
-
-                if (src < (*core)[p].core_pms.num_inputs) {
-                    if(dst < (*core)[p].core_pms.num_inputs){
-                        printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
-                        printf("Invalid synaptic weights destinations!\n");
-                        exit(-1);
-                    }
-                    dst = abs(dst - (*core)[p].core_pms.num_inputs);
-                    push_syn(&(*core)[p].ext_neuron[src].syn_ptr[stt],
-                             dst,
-                             &(*core)[p].shared_memory[ptr]);
-                    parity_check++;
-                } else if ((src >= (*core)[p].core_pms.num_inputs) && 
-                           (src < tot_num_neurons)) {
-                    src = abs(src - (*core)[p].core_pms.num_inputs);
-                    dst = abs(dst - (*core)[p].core_pms.num_inputs);
-                    push_syn(&(*core)[p].nsat_neuron[src].syn_ptr[stt],
-                             dst,
-                             &(*core)[p].shared_memory[ptr]);
-                    parity_check++;
-                } else {
-                    ;
-                }
-            }
-
-            /* Check if the number of input weights is valid */
-            if (parity_check != non_zero_elements) {
-                printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
-                printf("Invalid synaptic weights dimension!\n");
-                fclose(fp);
-                exit(-1);
-            }
-
             /* Count number of external synapses */
             count_synapses(&(*core)[p].ext_neuron,
                            &(*core)[p].syn->tot_ext_syn_num,
@@ -396,8 +503,65 @@ void initialize_incores_connections(fnames *fname, nsat_core **core,
                            (*core)[p].core_pms.num_neurons,
                            (*core)[p].core_pms.num_states);
         }
+    }
+}
 
-        fclose(fp);
+
+/* ************************************************************************
+ * INITIALIZE_REPLICAS: This function links the replicas to the cores they
+ * replicate. A replica reads the external events of its core and, unless
+ * it owns a copy of the weights, its units point to the synapses lists
+ * and the shared memory of the core. The RNG of every replica is seeded
+ * with its own sequence.
+ *
+ * Args :
+ *  fname (fnames *)        : File names struct
+ *  cores (nsat_core *)     : NSAT cores data structure
+ *  num_cores (int)         : Number of cores
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void initialize_replicas(fnames *fname, nsat_core *cores,
+                         unsigned int num_cores) {
+    unsigned int p, q, k;
+    unsigned long long j;
+    global_params *g_pms = cores[0].g_pms;
+
+    for (p = 0; p < num_cores; ++p) {
+        if (!is_replica(cores[p])) {
+            continue;
+        }
+        q = base_core_id(cores[p]);
+
+        dealloc(cores[p].ext_evts_fname);
+        cores[p].ext_evts_fname = gen_ext_evts_fname(fname->ext_events, q);
+
+        pcg32_srandom_r(&cores[p].rng, g_pms->rng_init_state,
+                        g_pms->rng_init_seq + 2 * num_cores + p + 1);
+
+        if (!is_sharing_synapses(cores[p])) {
+            continue;
+        }
+        for (j = 0; j < cores[p].core_pms.num_inputs; ++j) {
+            for (k = 0; k < cores[p].core_pms.num_states; ++k) {
+                destroy_list_syn(&cores[p].ext_neuron[j].syn_ptr[k]);
+                free(cores[p].ext_neuron[j].syn_ptr[k]);
+            }
+            free(cores[p].ext_neuron[j].syn_ptr);
+            cores[p].ext_neuron[j].syn_ptr = cores[q].ext_neuron[j].syn_ptr;
+        }
+        for (j = 0; j < cores[p].core_pms.num_neurons; ++j) {
+            for (k = 0; k < cores[p].core_pms.num_states; ++k) {
+                destroy_list_syn(&cores[p].nsat_neuron[j].syn_ptr[k]);
+                free(cores[p].nsat_neuron[j].syn_ptr[k]);
+            }
+            free(cores[p].nsat_neuron[j].syn_ptr);
+            cores[p].nsat_neuron[j].syn_ptr = cores[q].nsat_neuron[j].syn_ptr;
+        }
+        cores[p].shared_memory = cores[q].shared_memory;
+        cores[p].sm_size = cores[q].sm_size;
+        memcpy(cores[p].syn, cores[q].syn, sizeof(synapse_stat));
     }
 }
 
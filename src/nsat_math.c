@@ -48,6 +48,11 @@ extern inline unsigned long long max(int *x, int size);
 extern inline int sign(int x);
 
 
+/* Box-Muller state of the calling thread */
+static __thread double z0, z1;
+static __thread bool generate;
+
+
 /* ************************************************************************
  * NORMAL: This function returns a random number drawn from a normal 
  * distribution. The normal distribution is implemented using the 
@@ -65,8 +70,6 @@ double normal(double mu, double sigma)
 	const double epsilon = DBL_MIN;
 	const double two_pi = 2.0*3.14159265358979323846;
 
-	static double z0, z1;
-	static bool generate;
 	generate = !generate;
 
 	if (!generate)
@@ -86,3 +89,20 @@ double normal(double mu, double sigma)
 	z1 = sqrt(-2.0 * log(u1)) * sin(two_pi * u2);
 	return z0 * sigma + mu;
 }
+
+
+/* ************************************************************************
+ * NORMAL_RESET: This function drops the second number drawn by the last
+ * Box-Muller transform of the calling thread, so that the next numbers
+ * only depend on the RNG state.
+ *
+ * Args : 
+ *  void
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void normal_reset(void)
+{
+	generate = false;
+}
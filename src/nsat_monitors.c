@@ -54,6 +54,7 @@ FILE *open_monitor_file(char *fname) {
  **************************************************************************/
 void open_cores_monitor_files(nsat_core *core, fnames *fname, size_t num_cores) {
     size_t p;
+    unsigned long long j;
     char *filename = NULL;
 
     for(p = 0; p < num_cores; ++p) {
@@ -62,6 +63,19 @@ void open_cores_monitor_files(nsat_core *core, fnames *fname, size_t num_cores)
             filename = gen_fname(fname->states, p, 1);
             core[p].files->fs = open_monitor_file(filename);
             dealloc(filename);
+
+            /* Recorded neurons and buffer holding one record */
+            core[p].files->rec_ids = alloc(unsigned long long,
+                                           core[p].core_pms.num_neurons + 1);
+            core[p].files->num_rec_ids = 0;
+            for (j = 0; j < core[p].core_pms.num_neurons; ++j) {
+                if (core[p].nsat_neuron[j].is_spk_rec_on) {
+                    core[p].files->rec_ids[core[p].files->num_rec_ids++] = j;
+                }
+            }
+            core[p].files->states_buf = alloc(STATETYPE,
+                1 + core[p].files->num_rec_ids * core[p].mon_pms->num_rec_states);
+            mem_test(core[p].files->states_buf);
         }
 
         /* Intialize state monitors for FPGA */
@@ -76,6 +90,39 @@ void open_cores_monitor_files(nsat_core *core, fnames *fname, size_t num_cores)
             filename = gen_fname(fname->synw, p, 1);
             core[p].files->fw = open_monitor_file(filename);
             dealloc(filename);
+            index_synaptic_strength_monitor(&core[p]);
+        }
+
+        /* Initialize spike counts monitors */
+        if (core[p].mon_pms->count_window > 0) {
+            filename = gen_fname(fname->spk_counts, p, 1);
+            core[p].files->fc = open_monitor_file(filename);
+            dealloc(filename);
+
+            core[p].files->counts = alloc_zeros(uint32_t,
+                                    core[p].mon_pms->num_count_ids + 1);
+            core[p].files->count_slot = alloc(long long,
+                                              core[p].core_pms.num_neurons);
+            for (j = 0; j < core[p].core_pms.num_neurons; ++j) {
+                core[p].files->count_slot[j] = -1;
+            }
+            for (j = 0; j < core[p].mon_pms->num_count_ids; ++j) {
+                core[p].files->count_slot[core[p].mon_pms->count_ids[j]] = j;
+            }
+
+            /* Header: window, number of neurons and their ids */
+            fwrite(&core[p].mon_pms->count_window, sizeof(unsigned long long),
+                   1, core[p].files->fc);
+            fwrite(&core[p].mon_pms->num_count_ids, sizeof(unsigned long long),
+                   1, core[p].files->fc);
+            fwrite(core[p].mon_pms->count_ids, sizeof(unsigned long long),
+                   core[p].mon_pms->num_count_ids, core[p].files->fc);
+
+            /* Time step 0 is not simulated, it has a window of its own */
+            if (core[p].mon_pms->count_window == 1) {
+                fwrite(core[p].files->counts, sizeof(uint32_t),
+                       core[p].mon_pms->num_count_ids, core[p].files->fc);
+            }
         }
 #if DAVIS == 1
     open_online_spike_monitor(&core, fname);
@@ -103,12 +150,27 @@ void close_cores_monitor_files(nsat_core *core, size_t num_cores) {
         /* Close all monitor files */
         if (core[p].mon_pms->mon_states) {
             fclose(core[p].files->fs);
+            dealloc(core[p].files->states_buf);
+            dealloc(core[p].files->rec_ids);
         }
         if (core[p].mon_pms->mon_states_fpga) {
             fclose(core[p].files->fsa);
         }
         if (core[p].mon_pms->mon_weights) {
             fclose(core[p].files->fw);
+            dealloc(core[p].files->syn_buf);
+            dealloc(core[p].files->syn_w_ptrs);
+        }
+        if (core[p].mon_pms->count_window > 0) {
+            /* Last (incomplete) window */
+            if ((core[p].g_pms->ticks - 1) % core[p].mon_pms->count_window !=
+                    core[p].mon_pms->count_window - 1) {
+                fwrite(core[p].files->counts, sizeof(uint32_t),
+                       core[p].mon_pms->num_count_ids, core[p].files->fc);
+            }
+            fclose(core[p].files->fc);
+            dealloc(core[p].files->counts);
+            dealloc(core[p].files->count_slot);
         }
     }
 }
@@ -141,8 +203,10 @@ void update_state_monitor_file(nsat_core *core) {
 
 
 /* ************************************************************************
- * UPDATE_STATE_MONITOR_FILE: This functions writes at every predefined
- * time checkpoint all neurons states into a binary file. 
+ * UPDATE_STATE_MONITOR_ONLINE: This functions writes at every predefined
+ * time checkpoint the selected states of the recorded neurons into a
+ * binary file. The record (time followed by the states) is gathered in a
+ * buffer and written with a single call.
  *
  * Args : 
  *  core (nsat_core *)    : Core struct pointer
@@ -151,20 +215,71 @@ void update_state_monitor_file(nsat_core *core) {
  *  void
  **************************************************************************/
 void update_state_monitor_online(nsat_core *core) {
-    unsigned long long j;
+    unsigned long long j, n = 1;
     unsigned int k;
+    STATETYPE *buf = core->files->states_buf;
+    unit *neuron = NULL;
 
-    fwrite(&core->curr_time, sizeof(int), 1, core->files->fs);
-    for(j = 0; j < core->core_pms.num_neurons; ++j) {
-        if (core->nsat_neuron[j].is_spk_rec_on) {
-            for(k = 0; k < core->core_pms.num_states; ++k) {
-                fwrite(&core->nsat_neuron[j].s[k].x,
-                       sizeof(STATETYPE),
-                       1,
-                       core->files->fs);
-            }
+    buf[0] = (STATETYPE) core->curr_time;
+    for(j = 0; j < core->files->num_rec_ids; ++j) {
+        neuron = &core->nsat_neuron[core->files->rec_ids[j]];
+        for(k = 0; k < core->mon_pms->num_rec_states; ++k) {
+            buf[n++] = neuron->s[core->mon_pms->rec_states[k]].x;
         }
     }
+    fwrite(buf, sizeof(STATETYPE), n, core->files->fs);
+}
+
+
+/* ************************************************************************
+ * IS_STATE_MONITOR_TICK: This function decides whether the states are
+ * recorded at the current time step, i.e. at every rec_stride-th monitor
+ * time stamp.
+ *
+ * Args : 
+ *  core (nsat_core *)    : Core struct pointer
+ *  stamps (int)          : Current time modulo the monitors time stamp
+ *
+ * Returns :
+ *  true if the states have to be recorded
+ **************************************************************************/
+bool is_state_monitor_tick(nsat_core *core, int stamps) {
+    return (stamps == 0) &&
+           ((core->curr_time / core->core_pms.timestamp) %
+            core->mon_pms->rec_stride == 0);
+}
+
+
+/* ************************************************************************
+ * UPDATE_SPIKE_COUNT_MONITOR: This function accumulates the spikes of the
+ * counted neurons at the current time step and writes out the counts at
+ * the end of every window. Window w holds the time steps
+ * [w * count_window, (w+1) * count_window).
+ *
+ * Args : 
+ *  core (nsat_core *)    : Core struct pointer
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void update_spike_count_monitor(nsat_core *core) {
+    unsigned long long i;
+    long long slot;
+
+    for (i = 0; i < core->nsat_events->length; ++i) {
+        slot = core->files->count_slot[core->nsat_events->array[i]];
+        if (slot >= 0) {
+            core->files->counts[slot]++;
+        }
+    }
+
+    if (core->curr_time % core->mon_pms->count_window ==
+            core->mon_pms->count_window - 1) {
+        fwrite(core->files->counts, sizeof(uint32_t),
+               core->mon_pms->num_count_ids, core->files->fc);
+        memset(core->files->counts, 0,
+               core->mon_pms->num_count_ids * sizeof(uint32_t));
+    }
 }
 
 
@@ -222,82 +337,149 @@ void update_monitor_next_state(int *x,
 
 
 /* ************************************************************************
- * UPDATE_SYNAPTIC_STRENGTH_MONITOR_FILE: This functions writes at every
- * predefined time checkpoint all neurons synaptic strengths in binary 
- * file. 
+ * FILL_SYN_MON_RECORDS: This function fills the records of a monitored
+ * synapse (repeated once per occurrence of its post neuron in the ids).
  *
  * Args : 
  *  core (nsat_core *)  : Core struct pointer
+ *  pos (uint64_t)      : First record to fill
+ *  rep (unsigned int)  : Number of records
+ *  pre, post (uint64_t): Pre and post units (inputs first)
+ *  state (unsigned int): Post-synaptic state
+ *  w_ptr (WTYPE *)     : Synaptic weight pointer
  *
  * Returns :
  *  void
  **************************************************************************/
-void update_synaptic_strength_monitor_file(nsat_core *core) {
-    unsigned int k;
-    unsigned long long tmp, tmp2;
-    unsigned long long i, num_inputs = core->core_pms.num_inputs;
+static void fill_syn_mon_records(nsat_core *core, uint64_t pos, unsigned int rep,
+                                 uint64_t pre, uint64_t post, unsigned int state,
+                                 WTYPE *w_ptr) {
+    unsigned int r;
+
+    for (r = 0; r < rep; ++r) {
+        core->files->syn_buf[pos + r].time = 0;
+        core->files->syn_buf[pos + r].pre = pre;
+        core->files->syn_buf[pos + r].post = post;
+        core->files->syn_buf[pos + r].state = state;
+        core->files->syn_buf[pos + r].w = 0;
+        core->files->syn_w_ptrs[pos + r] = w_ptr;
+    }
+}
+
+
+/* ************************************************************************
+ * COUNT_REC_IDS: This function counts how many times every unit appears
+ * in a list of monitored ids.
+ *
+ * Args : 
+ *  list (list_id *)     : Monitored ids
+ *  size (uint64_t)      : Number of units
+ *
+ * Returns :
+ *  An array of size counts (to be freed by the caller)
+ **************************************************************************/
+static unsigned int *count_rec_ids(list_id *list, uint64_t size) {
+    unsigned int *count = alloc_zeros(unsigned int, size + 1);
+    id_list_node *ptr_id = list->head;
+
+    while (ptr_id != NULL) {
+        if (ptr_id->id < size) {
+            count[ptr_id->id]++;
+        }
+        ptr_id = ptr_id->next;
+    }
+    return count;
+}
+
+
+/* ************************************************************************
+ * INDEX_SYNAPTIC_STRENGTH_MONITOR: This function collects, once the
+ * synapses are loaded, the monitored synapses into a flat array of weight
+ * pointers and prepares the (pre, post, state) part of their records.
+ * A synapse is monitored when its post neuron is in ext_syn_rec_ids
+ * (external pre units) or nsat_syn_rec_ids (NSAT pre units), once per
+ * occurrence of the id.
+ *
+ * Args : 
+ *  core (nsat_core *)  : Core struct pointer
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void index_synaptic_strength_monitor(nsat_core *core) {
+    unsigned int k, c, pass;
+    unsigned long long i, n, num_units;
+    unsigned long long num_inputs = core->core_pms.num_inputs;
     unsigned long long num_neurons = core->core_pms.num_neurons;
     unsigned int num_states = core->core_pms.num_states;
+    unsigned int *ext_count = NULL, *nsat_count = NULL, *count = NULL;
+    unit *pre = NULL;
     syn_list_node *ptr = NULL;
-    id_list_node *ptr_id = NULL;
-
-    /* Write external neurons weights */
-    for (k = 0; k < num_states; ++k) {
-        for(i = 0; i< num_inputs; ++i) {    /* all pre neurons */
-            ptr = core->ext_neuron[i].syn_ptr[k]->head;  /* pre neuron */
-            while (ptr != NULL) {   /*  loop over post of pre neuron */
-                ptr_id = core->core_pms.ext_syn_rec_ids->head; /* init targets */
-                while (ptr_id != NULL) {  /* loop over targets */
-                    /* Time */
-                    tmp = ptr_id->id; 
-                    if (tmp == ptr->id){   /* if target == post of pre neuron then write */
-                        fwrite(&core->curr_time, sizeof(unsigned long long), 1, core->files->fw);
-                        /* Source */
-                        fwrite(&i, sizeof(unsigned long long), 1, core->files->fw);
-                        /* Destination */
-                        tmp = tmp + num_inputs;
-                        fwrite(&tmp, sizeof(unsigned long long), 1, core->files->fw);
-                        /* State */
-                        fwrite(&k, sizeof(unsigned int), 1, core->files->fw);
-                        /* Weight value */
-                        /* ptr->W is the weight from pre to post */
-                        fwrite(ptr->w_ptr, sizeof(WTYPE), 1, core->files->fw);
+
+    ext_count = count_rec_ids(core->core_pms.ext_syn_rec_ids, num_neurons);
+    nsat_count = count_rec_ids(core->core_pms.nsat_syn_rec_ids, num_neurons);
+
+    /* First pass counts the records, second pass fills them */
+    for (pass = 0; pass < 2; ++pass) {
+        n = 0;
+        for (c = 0; c < 2; ++c) {
+            num_units = (c == 0) ? num_inputs : num_neurons;
+            count = (c == 0) ? ext_count : nsat_count;
+            for (k = 0; k < num_states; ++k) {
+                for (i = 0; i < num_units; ++i) {
+                    pre = (c == 0) ? &core->ext_neuron[i] : &core->nsat_neuron[i];
+                    ptr = pre->syn_ptr[k]->head;
+                    while (ptr != NULL) {
+                        if (ptr->id < num_neurons && count[ptr->id] > 0) {
+                            if (pass == 1) {
+                                fill_syn_mon_records(core, n, count[ptr->id],
+                                                     (c == 0) ? i : i + num_inputs,
+                                                     ptr->id + num_inputs,
+                                                     k, ptr->w_ptr);
+                            }
+                            n += count[ptr->id];
+                        }
+                        ptr = ptr->next;
                     }
-                    ptr_id = ptr_id->next;
                 }
-                ptr = ptr->next;
             }
         }
+        if (pass == 0) {
+            core->files->num_syn_mon = n;
+            core->files->syn_buf = alloc(syn_mon_record, n + 1);
+            core->files->syn_w_ptrs = alloc(WTYPE *, n + 1);
+            mem_test(core->files->syn_buf);
+            mem_test(core->files->syn_w_ptrs);
+        }
     }
 
-    for (k = 0; k < num_states; ++k) {
-        for(i = 0; i < num_neurons; ++i) {   /* all pre neurons */
-            ptr = core->nsat_neuron[i].syn_ptr[k]->head;  /* pre neuron  */
-            while (ptr != NULL) {   /* loop over post of pre neuron  */
-                ptr_id = core->core_pms.nsat_syn_rec_ids->head;   /* init targets  */
-                while (ptr_id != NULL) {  /* loop over targets */
-                    /* Time */
-                    tmp = ptr_id->id; 
-                    if (tmp == ptr->id){  /* if target == post of pre neuron then write */
-                        fwrite(&core->curr_time, sizeof(unsigned long long), 1, core->files->fw);
-                        /* Source */
-                        tmp2 = i + num_inputs;
-                        fwrite(&tmp2, sizeof(unsigned long long), 1, core->files->fw);
-                        /* Destination */
-                        tmp = tmp + num_inputs;
-                        fwrite(&tmp, sizeof(unsigned long long), 1, core->files->fw);
-                        /* State */
-                        fwrite(&k, sizeof(unsigned int), 1, core->files->fw);
-                        /* Weight value */
-                        /* ptr->W is the weight from pre to post */
-                        fwrite(ptr->w_ptr, sizeof(WTYPE), 1, core->files->fw); 
-                    }
-                    ptr_id = ptr_id->next;
-                }
-                ptr = ptr->next;
-            }
-        }
+    dealloc(ext_count);
+    dealloc(nsat_count);
+}
+
+
+/* ************************************************************************
+ * UPDATE_SYNAPTIC_STRENGTH_MONITOR_FILE: This functions writes at every
+ * predefined time checkpoint the monitored synaptic strengths in binary 
+ * file. The weights indexed by index_synaptic_strength_monitor are
+ * gathered in a buffer of records written with a single call.
+ *
+ * Args : 
+ *  core (nsat_core *)  : Core struct pointer
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void update_synaptic_strength_monitor_file(nsat_core *core) {
+    unsigned long long j;
+    syn_mon_record *buf = core->files->syn_buf;
+
+    for (j = 0; j < core->files->num_syn_mon; ++j) {
+        buf[j].time = core->curr_time;
+        buf[j].w = *core->files->syn_w_ptrs[j];
     }
+    fwrite(buf, sizeof(syn_mon_record), core->files->num_syn_mon,
+           core->files->fw);
 }
 
 
@@ -122,6 +122,29 @@ void learning_pms_groups_map_file(char *fname, nsat_core *core,
 }
 
 
+/* ************************************************************************
+ * INFERENCE_OUTPUT_ON: This function disables, with a warning, an output
+ * that the inference samples do not produce.
+ *
+ * Args :
+ *  pms (global_params *)   : Global parameters
+ *  is_on (bool)            : Output requested
+ *  output (char *)         : What the samples are not (e.g. "profiled")
+ *
+ * Returns :
+ *  false in inference mode, is_on otherwise
+ **************************************************************************/
+static bool inference_output_on(global_params *pms, bool is_on,
+                                char *output) {
+    if (is_on && pms->num_workers > 0) {
+        printf(ANSI_COLOR_YELLOW "WARNING:  " ANSI_COLOR_RESET);
+        printf("The inference samples are not %s!\n", output);
+        return false;
+    }
+    return is_on;
+}
+
+
 /* ************************************************************************
  * READ_GLOBAL_PARAMS: This function loads simulations global paremeters 
  * from the corresponding binary file.
@@ -156,6 +179,42 @@ void read_global_params(FILE *fp, global_params *pms) {
     fread(&pms->is_check_wlim_on, sizeof(bool), 1, fp);
     fread(&synapse_prec, sizeof(int), 1, fp);
     pms->syn_precision = pow(2, synapse_prec);
+    fread(&pms->spk_chunk_size, sizeof(unsigned long long), 1, fp);
+    if (pms->spk_chunk_size == 0) {
+        pms->spk_chunk_size = SPK_CHUNK_SIZE;
+    }
+    fread(&pms->spk_format, sizeof(unsigned int), 1, fp);
+    if (pms->spk_format > SPK_FORMAT_BITMAP) {
+        printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+        printf("Unknown spike events format (%u)!\n", pms->spk_format);
+        exit(-1);
+    }
+    fread(&pms->num_workers, sizeof(unsigned int), 1, fp);
+    fread(&pms->decision_core, sizeof(unsigned int), 1, fp);
+    fread(&pms->decision_lead, sizeof(unsigned long long), 1, fp);
+    fread(&pms->decision_count, sizeof(unsigned long long), 1, fp);
+    fread(&pms->is_profile_on, sizeof(bool), 1, fp);
+    pms->is_profile_on = inference_output_on(pms, pms->is_profile_on,
+                                             "profiled");
+    fread(&pms->trace_stride, sizeof(unsigned long long), 1, fp);
+    fread(&pms->trace_size, sizeof(unsigned long long), 1, fp);
+    if (pms->trace_size == 0) {
+        pms->trace_size = TRACE_SIZE;
+    }
+    if (pms->trace_size > TRACE_SIZE_MAX) {
+        printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+        printf("Trace size %llu exceeds %d phases per core!\n",
+               pms->trace_size, TRACE_SIZE_MAX);
+        exit(-1);
+    }
+    if (!inference_output_on(pms, pms->trace_stride > 0, "traced")) {
+        pms->trace_stride = 0;
+    }
+    if (pms->decision_core >= pms->num_cores) {
+        printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+        printf("Invalid decision core (%u)!\n", pms->decision_core);
+        exit(-1);
+    }
 } 
 
 
@@ -182,8 +241,20 @@ void read_core_params(FILE *fp, nsat_core *core, unsigned int num_cores) {
         fread(&core[p].core_pms.is_ext_evts_on, sizeof(bool), 1, fp);
         fread(&core[p].core_pms.is_learning_on, sizeof(bool), 1, fp);
         fread(&core[p].core_pms.is_learning_gated, sizeof(bool), 1, fp);
+        fread(&core[p].core_pms.is_rate_src_on, sizeof(bool), 1, fp);
+        fread(&core[p].core_pms.is_data_src_on, sizeof(bool), 1, fp);
+        fread(&core[p].core_pms.replica_of, sizeof(int), 1, fp);
+        fread(&core[p].core_pms.is_wgt_copy_on, sizeof(bool), 1, fp);
         fread(&core[p].core_pms.num_inputs, sizeof(unsigned long long), 1, fp);
 
+        if ((core[p].core_pms.is_rate_src_on ||
+             core[p].core_pms.is_data_src_on) &&
+            !core[p].core_pms.is_ext_evts_on) {
+            printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+            printf("Core #%d: Input sources need the external events ENABLED!\n", p);
+            exit(-1);
+        }
+
         if (check_compliance(core[p].core_pms.is_ext_evts_on,
                              core[p].core_pms.num_inputs) == -1) {
             printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
@@ -201,6 +272,26 @@ void read_core_params(FILE *fp, nsat_core *core, unsigned int num_cores) {
         fread(&core[p].core_pms.num_neurons, sizeof(unsigned long long), 1, fp);
         fread(&core[p].core_pms.num_states, sizeof(unsigned int), 1, fp);
 
+        if (is_replica(core[p])) {
+            i = core[p].core_pms.replica_of;
+            if (i >= p || is_replica(core[i]) ||
+                core[i].core_pms.num_inputs != core[p].core_pms.num_inputs ||
+                core[i].core_pms.num_neurons != core[p].core_pms.num_neurons ||
+                core[i].core_pms.num_states != core[p].core_pms.num_states ||
+                core[i].core_pms.is_ext_evts_on != core[p].core_pms.is_ext_evts_on) {
+                printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+                printf("CORE #%d: Invalid replica of Core %u!\n", p, i);
+                exit(-1);
+            }
+            if (!core[p].core_pms.is_wgt_copy_on &&
+                (core[i].core_pms.is_learning_on ||
+                 core[p].core_pms.is_learning_on)) {
+                printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+                printf("CORE #%d: Replicas of plastic cores need a copy of the weights!\n", p);
+                exit(-1);
+            }
+        }
+
         fread(&core[p].core_pms.num_nsat_params_groups, sizeof(unsigned int), 1, fp);
         if (core[p].core_pms.num_nsat_params_groups > N_NSATGROUPS) {
             printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
@@ -411,7 +502,9 @@ void read_lrn_params(FILE *fp, nsat_core *core, unsigned int num_cores)
 
 /* ************************************************************************
  * READ_MONITOR_PARAMS: This function sets loads all the monitor parameters
- * per core (file pointers).
+ * per core (file pointers, recorded state components, recording stride
+ * and spike counts window and neurons). No recorded state components
+ * means all of them.
  *
  * Args :
  *  fp (FILE *)           : Input data file pointer  
@@ -422,7 +515,8 @@ void read_lrn_params(FILE *fp, nsat_core *core, unsigned int num_cores)
  *  void
  **************************************************************************/
 void read_monitor_params(FILE *fp, nsat_core *cores, unsigned int num_cores) {
-    unsigned int p;
+    unsigned int p, k;
+    unsigned long long j;
 
     for (p = 0; p < num_cores; ++p) {
         fread(&cores[p].mon_pms->mon_states, sizeof(bool), 1, fp);
@@ -431,6 +525,53 @@ void read_monitor_params(FILE *fp, nsat_core *cores, unsigned int num_cores) {
         fread(&cores[p].mon_pms->mon_final_weights, sizeof(bool), 1, fp);
         fread(&cores[p].mon_pms->mon_spikes, sizeof(bool), 1, fp);
         fread(&cores[p].mon_pms->mon_stats, sizeof(bool), 1, fp);
+
+        /* State components recorded by the state monitor */
+        fread(&cores[p].mon_pms->num_rec_states, sizeof(unsigned int), 1, fp);
+        cores[p].mon_pms->rec_states = alloc(unsigned int,
+                                             cores[p].core_pms.num_states);
+        if (cores[p].mon_pms->num_rec_states == 0) {
+            cores[p].mon_pms->num_rec_states = cores[p].core_pms.num_states;
+            for (k = 0; k < cores[p].core_pms.num_states; ++k) {
+                cores[p].mon_pms->rec_states[k] = k;
+            }
+        } else {
+            if (cores[p].mon_pms->num_rec_states > cores[p].core_pms.num_states) {
+                printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+                printf("CORE #%u: Too many recorded states!\n", p);
+                exit(-1);
+            }
+            fread(cores[p].mon_pms->rec_states, sizeof(unsigned int),
+                  cores[p].mon_pms->num_rec_states, fp);
+            for (k = 0; k < cores[p].mon_pms->num_rec_states; ++k) {
+                if (cores[p].mon_pms->rec_states[k] >= cores[p].core_pms.num_states) {
+                    printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+                    printf("CORE #%u: Invalid recorded state %u!\n", p,
+                           cores[p].mon_pms->rec_states[k]);
+                    exit(-1);
+                }
+            }
+        }
+        fread(&cores[p].mon_pms->rec_stride, sizeof(unsigned long long), 1, fp);
+        if (cores[p].mon_pms->rec_stride == 0) {
+            cores[p].mon_pms->rec_stride = 1;
+        }
+
+        /* Spike counts monitor */
+        fread(&cores[p].mon_pms->count_window, sizeof(unsigned long long), 1, fp);
+        fread(&cores[p].mon_pms->num_count_ids, sizeof(unsigned long long), 1, fp);
+        cores[p].mon_pms->count_ids = alloc(unsigned long long,
+                                            cores[p].mon_pms->num_count_ids + 1);
+        fread(cores[p].mon_pms->count_ids, sizeof(unsigned long long),
+              cores[p].mon_pms->num_count_ids, fp);
+        for (j = 0; j < cores[p].mon_pms->num_count_ids; ++j) {
+            if (cores[p].mon_pms->count_ids[j] >= cores[p].core_pms.num_neurons) {
+                printf(ANSI_COLOR_RED "ERROR:  " ANSI_COLOR_RESET);
+                printf("CORE #%u: Invalid counted neuron %llu!\n", p,
+                       cores[p].mon_pms->count_ids[j]);
+                exit(-1);
+            }
+        }
     }
 }
 
@@ -463,6 +604,8 @@ void print_params2file(fnames *fn, nsat_core *core, global_params *g_pms) {
     fprintf(fp, "Synaptic weights table (IN): %s\n", fn->syn_wgt_table);
     fprintf(fp, "Synaptic weights pointer table (IN): %s\n", fn->syn_ptr_table);
     fprintf(fp, "External events: %s\n", fn->ext_events);
+    fprintf(fp, "External rates: %s\n", fn->ext_rates);
+    fprintf(fp, "External dataset: %s\n", fn->ext_dataset);
     fprintf(fp, "Synaptic weights matrix (OUT): %s\n", fn->synw);
     fprintf(fp, "Synaptic weights matrix final (OUT): %s\n", fn->synw_final);
     fprintf(fp, "Spikes list (time, id): %s\n", fn->events);
@@ -491,6 +634,10 @@ void print_params2file(fnames *fn, nsat_core *core, global_params *g_pms) {
     fprintf(fp, "Benchmark clock is ");
     print_enabled_or_disabled(fp, g_pms->is_clock_on);
     fprintf(fp, "\n");
+    fprintf(fp, "Profiling is ");
+    print_enabled_or_disabled(fp, g_pms->is_profile_on);
+    fprintf(fp, "\n");
+    fprintf(fp, "Traced ticks period: %llu\n", g_pms->trace_stride);
 
     for (p = 0; p < g_pms->num_cores; ++p) {
         fprintf(fp, "+++++++++++++++++++++++++++++++++++++++++++++++++++++++\n");
@@ -503,6 +650,12 @@ void print_params2file(fnames *fn, nsat_core *core, global_params *g_pms) {
         fprintf(fp, "External events are ");
         print_enabled_or_disabled(fp, core[p].core_pms.is_ext_evts_on);
         fprintf(fp, "\n");
+        fprintf(fp, "Rate coded sources are ");
+        print_enabled_or_disabled(fp, core[p].core_pms.is_rate_src_on);
+        fprintf(fp, "\n");
+        fprintf(fp, "Dataset sources are ");
+        print_enabled_or_disabled(fp, core[p].core_pms.is_data_src_on);
+        fprintf(fp, "\n");
         fprintf(fp, "Learning is ");
         print_enabled_or_disabled(fp, core[p].core_pms.is_learning_on);
         fprintf(fp, "\n");
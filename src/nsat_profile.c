@@ -0,0 +1,222 @@
+/* ************************************************************************
+ * NSATlib_v2 This is a C implementation of the NSATlib_v2 python
+ * script. It simulates the NSAT.
+ * Copyright (C) <2016>  UCI, Georgios Detorakis (gdetor@protonmail.com)
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation, either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program.  If not, see <http://www.gnu.org/licenses/>.
+ **************************************************************************/
+#include "nsat.h"
+
+/* Names of the phases in the traces (see PROF_* and PROFILE_PHASES) */
+static const char *phase_names[PROF_NUM_PHASES] = {
+    "ext_ingest", "integrate", "spike_detection", "barrier_wait", "routing",
+    "accumulation", "stdp", "reset", "monitor_io"};
+
+
+/* ************************************************************************
+ * MONOTONIC_NS: This function returns the time of the monotonic clock
+ * (wall-clock time, unlike clock() which is the CPU time of the process).
+ *
+ * Args :
+ *  void
+ *
+ * Returns :
+ *  The monotonic time in nanoseconds.
+ **************************************************************************/
+uint64_t monotonic_ns(void) {
+    struct timespec ts;
+
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t) ts.tv_sec * 1000000000ULL + (uint64_t) ts.tv_nsec;
+}
+
+
+/* ************************************************************************
+ * OPEN_PROFILES: This function allocates the profiles of the cores if
+ * the profiling or the tracing is on, and the ring buffers of the traces.
+ *
+ * Args :
+ *  cores (nsat_core *)     : NSAT cores
+ *  num_cores (int)         : Cores numbers
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void open_profiles(nsat_core *cores, unsigned int num_cores) {
+    unsigned int p;
+
+    for (p = 0; p < num_cores; ++p) {
+        cores[p].prof = NULL;
+        if (cores[p].g_pms->is_profile_on || cores[p].g_pms->trace_stride > 0) {
+            cores[p].prof = alloc_zeros(core_profile, 1);
+            mem_test(cores[p].prof);
+        }
+        if (cores[p].g_pms->trace_stride > 0) {
+            cores[p].prof->trace = alloc(trace_event,
+                                         cores[p].g_pms->trace_size);
+            mem_test(cores[p].prof->trace);
+        }
+    }
+}
+
+
+/* ************************************************************************
+ * START_PROFILE: This function starts the clock of the first phase of a
+ * tick (see profile_tick). With the profiling on, the phases follow each
+ * other and the clock only starts at the first tick. With the tracing
+ * only, it starts at every traced tick.
+ *
+ * Args :
+ *  core (nsat_core *)      : NSAT core
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void start_profile(nsat_core *core) {
+    core_profile *prof = core->prof;
+
+    if (prof->last_ns == 0 || (!core->g_pms->is_profile_on &&
+        core->curr_time % core->g_pms->trace_stride == 0)) {
+        prof->last_ns = monotonic_ns();
+    }
+}
+
+
+/* ************************************************************************
+ * UPDATE_PROFILE: This function charges the time elapsed since the end
+ * of the previous phase to a phase (see profile_phase). The phases of
+ * the traced ticks are stored in the ring buffer of the core, which keeps
+ * the last trace_size phases. With the tracing only, the clock is not read
+ * on the other ticks.
+ *
+ * Args :
+ *  core (nsat_core *)      : NSAT core
+ *  phase (int)             : Phase (PROF_*)
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void update_profile(nsat_core *core, unsigned int phase) {
+    uint64_t now;
+    core_profile *prof = core->prof;
+    trace_event *evt = NULL;
+    bool is_traced = prof->trace != NULL &&
+                     core->curr_time % core->g_pms->trace_stride == 0;
+
+    if (!is_traced && !core->g_pms->is_profile_on) {
+        return;
+    }
+
+    now = monotonic_ns();
+    if (is_traced) {
+        evt = &prof->trace[prof->trace_count % core->g_pms->trace_size];
+        evt->tick = core->curr_time;
+        evt->start_ns = prof->last_ns;
+        evt->end_ns = now;
+        evt->phase = phase;
+        prof->trace_count++;
+    }
+
+    prof->phase_ns[phase] += now - prof->last_ns;
+    prof->last_ns = now;
+}
+
+
+/* ************************************************************************
+ * WRITE_PROFILES: This function writes the profiles of the cores, one
+ * record per core: the time of each phase (ns) followed by the numbers
+ * of synaptic events and of weight updates (uint64). The profile file is
+ * removed if the profiling is off.
+ *
+ * Args :
+ *  fname (fnames *)        : File names struct
+ *  cores (nsat_core *)     : NSAT cores
+ *  num_cores (int)         : Cores numbers
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void write_profiles(fnames *fname, nsat_core *cores, unsigned int num_cores) {
+    unsigned int p;
+    FILE *fp = NULL;
+
+    if (!cores[0].g_pms->is_profile_on) {
+        remove_stale_output(fname->profile);
+        return;
+    }
+
+    fp = fopen(fname->profile, "wb");
+    file_test(fp, fname->profile);
+    for (p = 0; p < num_cores; ++p) {
+        fwrite(cores[p].prof->phase_ns, sizeof(uint64_t), PROF_NUM_PHASES, fp);
+        fwrite(&cores[p].prof->syn_events, sizeof(uint64_t), 1, fp);
+        fwrite(&cores[p].prof->wgt_updates, sizeof(uint64_t), 1, fp);
+    }
+    fclose(fp);
+}
+
+
+/* ************************************************************************
+ * WRITE_TRACES: This function writes the phases of the traced ticks as a
+ * Chrome trace (JSON), which opens in Perfetto or chrome://tracing. Each
+ * core is a thread of the trace, the times are in microseconds since the
+ * start of the simulation. The trace file is removed if the tracing is off.
+ *
+ * Args :
+ *  fname (fnames *)        : File names struct
+ *  cores (nsat_core *)     : NSAT cores
+ *  num_cores (int)         : Cores numbers
+ *
+ * Returns :
+ *  void
+ **************************************************************************/
+void write_traces(fnames *fname, nsat_core *cores, unsigned int num_cores) {
+    unsigned int p;
+    uint64_t i, first, size, t0;
+    trace_event *evt = NULL;
+    FILE *fp = NULL;
+
+    if (cores[0].g_pms->trace_stride == 0) {
+        remove_stale_output(fname->trace);
+        return;
+    }
+
+    size = cores[0].g_pms->trace_size;
+    t0 = cores[0].ctx->t0_ns;
+    fp = fopen(fname->trace, "w");
+    file_test(fp, fname->trace);
+    fprintf(fp, "{\"displayTimeUnit\": \"ns\",\n\"traceEvents\": [\n");
+    for (p = 0; p < num_cores; ++p) {
+        fprintf(fp, "%s{\"name\": \"thread_name\", \"ph\": \"M\", "
+                "\"pid\": 0, \"tid\": %u, \"args\": {\"name\": "
+                "\"Core %u\"}}", p == 0 ? "" : ",\n", p, p);
+    }
+    for (p = 0; p < num_cores; ++p) {
+        first = cores[p].prof->trace_count > size ?
+                cores[p].prof->trace_count - size : 0;
+        for (i = first; i < cores[p].prof->trace_count; ++i) {
+            evt = &cores[p].prof->trace[i % size];
+            fprintf(fp, ",\n{\"name\": \"%s\", \"cat\": \"tick\", "
+                    "\"ph\": \"X\", \"pid\": 0, \"tid\": %u, "
+                    "\"ts\": %.3f, \"dur\": %.3f, "
+                    "\"args\": {\"tick\": %" PRIu64 "}}",
+                    phase_names[evt->phase], p,
+                    (double) (evt->start_ns - t0) * 1e-3,
+                    (double) (evt->end_ns - evt->start_ns) * 1e-3,
+                    evt->tick);
+        }
+    }
+    fprintf(fp, "\n]}\n");
+    fclose(fp);
+}
@@ -20,60 +20,77 @@
 
 extern inline void progress_bar(int x, int n);
 
-pthread_mutex_t lock = PTHREAD_MUTEX_INITIALIZER;
-pthread_cond_t cond = PTHREAD_COND_INITIALIZER;
-pthread_barrier_t barrier;
-
 
 void *nsat_thread(void *args)
 {
     unsigned long long t, q, i;
 
     nsat_core *core = (nsat_core *)args;
-    clock_t t_s, t_f;
+    nsat_core *cores = core - core->core_id;
+    uint64_t t_s, t_f;
     unsigned long long id;
     FILE *fext;
 
     if (core->core_pms.is_ext_evts_on) {
         fext = fopen(core->ext_evts_fname, "rb");
-        if (!fext) {
+        if (!fext && !core->core_pms.is_rate_src_on &&
+            !core->core_pms.is_data_src_on) {
             printf(ANSI_COLOR_YELLOW "WARNING:  " ANSI_COLOR_RESET);
             printf("No external events file for Core %u !\n", core->core_id);
         }
     }
 
-    t_s = clock();
+    /* Replicas draw their random numbers from their own RNG, the other
+     * cores from the RNG of their simulation */
+    if (is_replica(*core)) {
+        pcg32_thread_rng(&core->rng);
+    } else {
+        pcg32_thread_rng(&core->ctx->rng);
+    }
+
+    t_s = monotonic_ns();
     for (t = 1; t < core->g_pms->ticks; ++t) {
+        core->curr_time = t;
+        profile_tick(core);
         if (core->core_pms.is_ext_evts_on) {
             get_external_events_per_core(fext, &core, t);
         }
+        if (core->rate_src != NULL) {
+            get_rate_source_events(core, t);
+        }
+        if (core->data_src != NULL) {
+            get_dataset_source_events(core, t);
+        }
+        profile_phase(core, PROF_EXT_INGEST);
 
-        core->curr_time = t;
         nsat_dynamics((void *)&core[0]);
 
-        pthread_barrier_wait(&barrier);
+        pthread_barrier_wait(&core->ctx->barrier);
+        profile_phase(core, PROF_BARRIER_WAIT);
 
         if (core->g_pms->is_routing_on) {
-            pthread_mutex_lock(&lock);
+            pthread_mutex_lock(&core->ctx->lock);
             for(i = 0; i < core->trans_events->length; ++i) {
                 id = core->trans_events->array[i];
                 for (q = 0; q < core->nsat_neuron[id].router_size; ++q) {
-                    array_list_push(&core[core->nsat_neuron[id].ptr_cores[q].dst_core_id].ext_events,
+                    array_list_push(&cores[core->nsat_neuron[id].ptr_cores[q].dst_core_id].ext_events,
                                     core->nsat_neuron[id].ptr_cores[q].dst_neuron_id,
                                     t, 1);
                 }
             }
             array_list_clean(&core->trans_events, 1);
+            pthread_mutex_unlock(&core->ctx->lock);
         }
-        pthread_mutex_unlock(&lock);
+        profile_phase(core, PROF_ROUTING);
 
-        pthread_barrier_wait(&barrier);
+        pthread_barrier_wait(&core->ctx->barrier);
+        profile_phase(core, PROF_BARRIER_WAIT);
 
         nsat_events_and_learning((void *)&core[0]);
     }
-    t_f = clock();
+    t_f = monotonic_ns();
     printf("Thread %u execution time: %lf seconds\n",
-           core->core_id, (double) (t_f - t_s) / CLOCKS_PER_SEC);
+           core->core_id, (double) (t_f - t_s) * 1e-9);
 
     if (core->core_pms.is_ext_evts_on && fext!=NULL) {
         fclose(fext);
@@ -95,10 +112,11 @@ int iterate_nsat(fnames *fname) {
 #if OLD == 0
 int iterate_nsat_new(fnames *fname) {
     unsigned int p;
-    clock_t t0, tf;
+    uint64_t t0, tf;
     FILE *fp=NULL;
 
     global_params g_pms;
+    nsat_context ctx = {.rng = PCG32_INITIALIZER};
     nsat_core *cores = NULL;
 
     pthread_t *cores_t=NULL;
@@ -113,11 +131,14 @@ int iterate_nsat_new(fnames *fname) {
     /* Allocate memory for all the cores */
     cores = alloc(nsat_core, g_pms.num_cores);
     allocate_cores(&cores, fname, g_pms.num_cores);
-    for(p = 0; p < g_pms.num_cores; ++p) { cores[p].g_pms = &g_pms; }
+    for(p = 0; p < g_pms.num_cores; ++p) {
+        cores[p].g_pms = &g_pms;
+        cores[p].ctx = &ctx;
+    }
 
     /* Initialize RNG with seed */
     if (g_pms.is_bm_rng_on) {
-        pcg32_srandom(g_pms.rng_init_state, g_pms.rng_init_seq);
+        pcg32_srandom_r(&ctx.rng, g_pms.rng_init_state, g_pms.rng_init_seq);
     }
 
     /* Read/Load cores basic parameters */
@@ -151,41 +172,66 @@ int iterate_nsat_new(fnames *fname) {
     /* Load all the synaptic weights to units */
     initialize_incores_connections(fname, &cores, g_pms.num_cores);
 
+    /* Link the replicas to the synapses and inputs of their cores */
+    initialize_replicas(fname, cores, g_pms.num_cores);
+
     /* Load all the inter-core connections */
     initialize_cores_connections(fname->l1_conn, cores);
 
     /* Open all necessary monitor files */
     open_cores_monitor_files(cores, fname, g_pms.num_cores);
+
+    /* Start streaming the spike events to disk */
+    open_spikes_streams(fname, cores, g_pms.num_cores);
+
+    /* Open the rate coded and dataset input sources */
+    open_rate_sources(fname, cores, g_pms.num_cores);
+    open_dataset_sources(fname, cores, g_pms.num_cores);
     
     /* Initialize all threads variables */
     cores_t = alloc(pthread_t, g_pms.num_cores);
-    pthread_mutex_init(&lock, NULL);
-    pthread_cond_init(&cond, NULL);
-    pthread_barrier_init(&barrier, NULL, g_pms.num_cores);
+    pthread_mutex_init(&ctx.lock, NULL);
+    pthread_barrier_init(&ctx.barrier, NULL, g_pms.num_cores);
 
-    /* Check if clock is on */
-    t0 = clock();
+    /* Allocate the per-phase profiles of the cores */
+    open_profiles(cores, g_pms.num_cores);
 
-    /* Create and run threads (NSAT Cores) */
-    for (p = 0; p < g_pms.num_cores; ++p) {
-        pthread_create(&cores_t[p], NULL, nsat_thread, (void *)&cores[p]);
-    }
+    /* Check if clock is on */
+    t0 = monotonic_ns();
+    ctx.t0_ns = t0;
+
+    if (g_pms.num_workers > 0) {
+        /* Run the samples independently */
+        run_inference(fname, cores, &g_pms);
+    } else {
+        /* Create and run threads (NSAT Cores) */
+        for (p = 0; p < g_pms.num_cores; ++p) {
+            pthread_create(&cores_t[p], NULL, nsat_thread, (void *)&cores[p]);
+        }
 
-    /* Join threads */
-    for (p = 0; p < g_pms.num_cores; ++p) {
-        pthread_join(cores_t[p], NULL);
+        /* Join threads */
+        for (p = 0; p < g_pms.num_cores; ++p) {
+            pthread_join(cores_t[p], NULL);
+        }
     }
 
     /* If clock is turned on then print out the execution time */
-    tf = clock();
+    tf = monotonic_ns();
     if (g_pms.is_clock_on) {
         printf("Simulation execution time: %lf seconds\n",
-               (double) (tf - t0) / CLOCKS_PER_SEC);
+               (double) (tf - t0) * 1e-9);
     }
 
-    pthread_mutex_destroy(&lock);
-    pthread_cond_destroy(&cond);
-    pthread_barrier_destroy(&barrier);
+    /* Write the per-phase profiles and the traced ticks */
+    write_profiles(fname, cores, g_pms.num_cores);
+    write_traces(fname, cores, g_pms.num_cores);
+
+    pthread_mutex_destroy(&ctx.lock);
+    pthread_barrier_destroy(&ctx.barrier);
+
+    /* Close the rate coded and dataset input sources */
+    close_rate_sources(cores, g_pms.num_cores);
+    close_dataset_sources(cores, g_pms.num_cores);
 
     /* Write spikes events */
     write_spikes_events(fname, cores, g_pms.num_cores);
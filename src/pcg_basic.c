@@ -28,12 +28,27 @@
  * your project.
  */
 
+#include <stddef.h>
 #include "pcg_basic.h"
 
 // state for global RNGs
 
 static pcg32_random_t pcg32_global = PCG32_INITIALIZER;
 
+// generator of the calling thread, the global one when NULL
+static __thread pcg32_random_t* pcg32_thread = NULL;
+
+#define pcg32_current() (pcg32_thread != NULL ? pcg32_thread : &pcg32_global)
+
+// pcg32_thread_rng(rng)
+//     Make the global RNG functions of the calling thread use rng (NULL
+//     restores the global RNG)
+
+void pcg32_thread_rng(pcg32_random_t* rng)
+{
+    pcg32_thread = rng;
+}
+
 // pcg32_srandom(initstate, initseq)
 // pcg32_srandom_r(rng, initstate, initseq):
 //     Seed the rng.  Specified in two parts, state initializer and a
@@ -68,7 +83,7 @@ uint32_t pcg32_random_r(pcg32_random_t* rng)
 
 uint32_t pcg32_random()
 {
-    return pcg32_random_r(&pcg32_global);
+    return pcg32_random_r(pcg32_current());
 }
 
 
@@ -111,6 +126,6 @@ uint32_t pcg32_boundedrand_r(pcg32_random_t* rng, uint32_t bound)
 
 uint32_t pcg32_boundedrand(uint32_t bound)
 {
-    return pcg32_boundedrand_r(&pcg32_global, bound);
+    return pcg32_boundedrand_r(pcg32_current(), bound);
 }
 
@@ -21,6 +21,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 import numpy as np
 import matplotlib.pylab as plt
+from pyNSATlib import stimuli
 
 
 class correlated_spikes(object):
@@ -74,7 +75,7 @@ class correlated_spikes(object):
 
         return L
 
-    def cox_process(self, tau_c=10, time=100, dt=1):
+    def cox_process(self, tau_c=10, time=100, dt=1, seed=None):
         """ Cox process (doubly stochastic process). It generates n_proc
             number of correlated spike trains based on C matrix. 
 
@@ -82,31 +83,15 @@ class correlated_spikes(object):
                 tau_c (float)   : Time constant (lambda, see [1])
                 time (int)      : Duration of spike trains (ms)
                 dt (float)      : Time step (discretization)
+                seed (int)      : Seed of the random generator
         """
         ticks = int(time / dt)      # Simulation ticks
 
-        Lambda = np.exp(-dt / tau_c)
-        Sigma = np.sqrt(1 - np.exp(-2 * dt / tau_c))
-
-        # Set up rates vector
-        R = np.diag(self.C)
-        Y = np.random.normal(0, 1, (self.n_proc,))
+        # Vectorized Cox process, see pyNSATlib.stimuli.correlated_trains
+        spks = stimuli.collect_events(stimuli.correlated_trains(
+            self.C, time, tau_c=tau_c, dt=dt, seed=seed))
         S = np.zeros((ticks, self.n_proc))
-
-        # Rectify C
-        L = self.rectify_and_decomp_corr()
-
-        for t in range(ticks):
-            # Compute N independent Ornstein-Uhlberg processes
-            Y = Y * Lambda + np.random.normal(0, Sigma, (self.n_proc,))
-
-            # Compute instantaneous rates
-            X = R + np.dot(L, Y)
-        
-            # Create spikes list
-            prob = np.random.uniform(0, 1, (self.n_proc,))
-            idx = (X * 0.001 * dt) > prob
-            S[t, idx] = 1
+        S[spks[:, 0], spks[:, 1]] = 1
 
         self.spikes = S.copy()
         return S
@@ -262,15 +247,8 @@ class correlated_spikes(object):
             Returns:
                 tmp (array)   : A spike list that is compatible to pyNCS AER. 
         """
-        time, id_end = self.spikes.shape
-        id_end += id_init
-        ids = list(range(id_init, id_end))
-        tmp = []
-        for t in range(time):
-            for i, j in enumerate(ids):
-                if self.spikes[t, i] != 0:
-                    tmp.append((j, t))
-        return np.array(tmp, dtype='int')
+        t, i = np.nonzero(self.spikes)
+        return np.column_stack([i + id_init, t]).astype('int')
 
     def raster_plot(self):
         """ raster_plot - Draws the raster plot of already generated spike
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: Simulations run concurrently with run_c_nsat_async give the same
+#          results as the same simulations run one after the other.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.nsat_reader import read_events
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 5000            # Simulation time
+N_CORES = 1                 # Number of cores
+N_NEURONS = [6]             # Number of neurons per core
+N_INPUTS = [16]             # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+def write_simulation(seed, prefix):
+    '''
+    Writes a noisy network driven by rate coded inputs, so that the results
+    depend on the random streams of the simulation.
+    '''
+    rs = np.random.RandomState(seed)
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 bm_rng=True,
+                                 monitor_states=True)
+    cfg.seed = seed
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[-3, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].sA[0] = [[-1, 1],
+                              [1, 1]]
+    cfg.core_cfgs[0].sigma[0] = [30, 0]
+    cfg.core_cfgs[0].Xth[0] = 60
+    cfg.core_cfgs[0].t_ref[0] = 2
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[:N_INPUTS[0], N_INPUTS[0]:, 0] = rs.randint(0, 30, size=(N_INPUTS[0],
+                                                              N_NEURONS[0]))
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+    cfg.set_ext_rates(rs.uniform(10, 50, size=(5, N_INPUTS[0])),
+                      t_sample=sim_ticks // 5)
+
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp', prefix=prefix)
+    c_nsat_writer.write()
+    return cfg, c_nsat_writer.fname
+
+
+def read_results(cfg, fname):
+    ids, times = read_events(fname.events + b'_core_0.dat')
+    states = nsat.C_NSATReader(cfg, fname).read_c_nsat_states()[0][1]
+    return ids, times, states
+
+
+if __name__ == '__main__':
+    seeds = [1, 2]
+    serial = []
+    for seed in seeds:
+        cfg, fname = write_simulation(seed, 'test_async_serial_%d' % seed)
+        nsat.run_c_nsat(fname)
+        serial.append(read_results(cfg, fname))
+    assert not np.array_equal(serial[0][0], serial[1][0]), "Same spikes"
+
+    sims = [write_simulation(seed, 'test_async_%d' % seed) for seed in seeds]
+    futures = [nsat.run_c_nsat_async(fname) for cfg, fname in sims]
+    for future in futures:
+        future.result()
+    for (cfg, fname), ref in zip(sims, serial):
+        res = read_results(cfg, fname)
+        print("{0} spikes".format(len(res[0])))
+        for a, b in zip(res, ref):
+            assert np.array_equal(a, b), "Concurrent and serial runs differ"
+    print("Async test passed")
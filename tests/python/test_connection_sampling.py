@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The sparse connection samplers of laxesis draw the expected
+#          number of connections, without duplicates, and are reproducible
+#          for a given seed.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+from pyNSATlib.laxesis import sample_random_connections, \
+    sample_shuffle_connections
+
+N_SRC = 300                 # Number of source neurons
+N_DST = 200                 # Number of target neurons
+P_CONN = 0.1                # Connection probability
+ITERATIONS = 20             # Iterations of the shuffle construction
+
+
+if __name__ == '__main__':
+    # Random connections: binomial counts, sorted without duplicates
+    rows, cols = sample_random_connections(N_SRC, N_DST, P_CONN, seed=1,
+                                           chunk_size=64)
+    keys = rows * N_DST + cols
+    assert np.all(np.diff(keys) > 0), "Connections not sorted or duplicated"
+    assert rows.min() >= 0 and rows.max() < N_SRC, "Source out of range"
+    assert cols.min() >= 0 and cols.max() < N_DST, "Target out of range"
+    n = N_SRC * N_DST
+    mean, std = n * P_CONN, np.sqrt(n * P_CONN * (1 - P_CONN))
+    print("Random connections: {0} (expected {1:.0f})".format(len(rows),
+                                                              mean))
+    assert abs(len(rows) - mean) < 5 * std, "Wrong number of connections"
+    counts = np.bincount(rows, minlength=N_SRC)
+    row_std = np.sqrt(N_DST * P_CONN * (1 - P_CONN))
+    assert abs(counts.std() - row_std) < 0.2 * row_std, \
+        "Row counts are not binomial"
+    # Full and empty probabilities
+    rows, cols = sample_random_connections(10, 7, 1.0, seed=2)
+    assert np.array_equal(rows * 7 + cols, np.arange(70)), "p=1 not full"
+    rows, cols = sample_random_connections(10, 7, 0.0, seed=2)
+    assert len(rows) == 0, "p=0 not empty"
+
+    # Seed reproducibility, also with numpy's global seed
+    a = sample_random_connections(N_SRC, N_DST, P_CONN, seed=3)
+    b = sample_random_connections(N_SRC, N_DST, P_CONN, seed=3)
+    c = sample_random_connections(N_SRC, N_DST, P_CONN, seed=4)
+    assert all(np.array_equal(x, y) for x, y in zip(a, b)), \
+        "Same seed, different connections"
+    assert not np.array_equal(a[0] * N_DST + a[1], c[0] * N_DST + c[1]), \
+        "Different seeds, same connections"
+    np.random.seed(5)
+    a = sample_random_connections(N_SRC, N_DST, P_CONN)
+    np.random.seed(5)
+    b = sample_random_connections(N_SRC, N_DST, P_CONN)
+    assert all(np.array_equal(x, y) for x, y in zip(a, b)), \
+        "np.random.seed does not control the connections"
+
+    # Shuffle connections: weights sum to zero per target, 4*iterations
+    # slots of unit weight
+    rows, cols, w = sample_shuffle_connections(N_SRC, N_DST, ITERATIONS,
+                                               seed=6, chunk_size=64)
+    keys = rows * N_DST + cols
+    assert np.all(np.diff(keys) > 0), "Connections not sorted or duplicated"
+    assert np.all(w != 0), "Zero weights are kept"
+    assert np.all(np.bincount(cols, weights=w, minlength=N_DST) == 0), \
+        "Weights of a target do not sum to zero"
+    assert np.all(np.bincount(cols, weights=np.abs(w), minlength=N_DST)
+                  <= 4 * ITERATIONS), "Too many slots per target"
+    print("Shuffle connections: {0}".format(len(rows)))
+    a = sample_shuffle_connections(N_SRC, N_DST, ITERATIONS, seed=7)
+    b = sample_shuffle_connections(N_SRC, N_DST, ITERATIONS, seed=7)
+    assert all(np.array_equal(x, y) for x, y in zip(a, b)), \
+        "Same seed, different shuffle connections"
+    print("Connection sampling test passed")
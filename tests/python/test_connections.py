@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The ptr and wgt tables merged by NSATSetup.do_connections are
+#          those of the former block by block assignment, including
+#          overlapping connections where the last one declared wins.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+from scipy.sparse import csr_matrix
+from pyNSATlib.laxesis import NSATSetup, Connection, erf_ntype
+
+N_INPUTS = 6                # Number of external neurons
+N_NEURONS = [5, 7]          # Number of neurons per population
+
+
+def legacy_do_connections(setup, core):
+    # Former do_connections: the ptr table of every connection is assigned
+    # to its (src, dst) block of a CSR matrix, one after the other
+    n_neurons = setup.nneurons[core]
+    n_states = setup.normalize_n_states(core)
+    n_inputs = setup.ninputs[core]
+    wgt_table = []
+    offset = 0
+    ptr_table = csr_matrix((n_neurons + n_inputs,
+                            (n_neurons + n_inputs) * n_states),
+                           dtype='uint64')
+    connections = [(cs, 0) for cs in setup.connections_external[core]]
+    connections += [(cs, n_inputs) for cs in setup.connections[core]]
+    for cs, src_offset in connections:
+        pt = cs.ptr_table.copy()
+        pt.data = pt.data + offset
+        dst_offset = n_inputs + (n_inputs + n_neurons) * cs.dst_state
+        ptr_table[(src_offset + cs.src_bgn):(src_offset + cs.src_end),
+                  (dst_offset + cs.dst_bgn):(dst_offset + cs.dst_end)] = pt
+        wgt_table += list(cs.wgt_table)
+        offset += len(cs.wgt_table)
+    return ptr_table, wgt_table
+
+
+def build_setup(overlap):
+    np.random.seed(0)
+    setup = NSATSetup(ncores=1)
+    pop_in = setup.create_external_population(N_INPUTS, 0)
+    pop_a = setup.create_population(N_NEURONS[0], 0, erf_ntype)
+    pop_b = setup.create_population(N_NEURONS[1], 0, erf_ntype)
+    Connection(setup, pop_in, pop_a, 0).connect_random_uniform(
+        -10, 10, p=0.5, seed=1)
+    Connection(setup, pop_a, pop_b, 1).connect_random_uniform(-10, 10)
+    Connection(setup, pop_b, pop_b, 0).connect_random_uniform(
+        -10, 10, p=0.3, seed=2)
+    if overlap:
+        # A dense block over a sparse one, a sparse block over a dense one
+        # and a sparse block over a sparse one
+        Connection(setup, pop_in, pop_a, 0).connect_random_uniform(10, 20)
+        Connection(setup, pop_a, pop_b, 1).connect_random_uniform(
+            20, 30, p=0.4, seed=3)
+        Connection(setup, pop_b, pop_b, 0).connect_random_uniform(
+            30, 40, p=0.3, seed=4)
+    return setup
+
+
+if __name__ == '__main__':
+    for overlap in [False, True]:
+        setup = build_setup(overlap)
+        ptr_table, wgt_table = setup.do_connections(0)
+        ptr_ref, wgt_ref = legacy_do_connections(setup, 0)
+        assert isinstance(wgt_table, np.ndarray), "wgt_table is not an array"
+        assert np.array_equal(wgt_table, wgt_ref), "wgt tables differ"
+        assert np.array_equal(ptr_table.toarray(), ptr_ref.toarray()), \
+            "ptr tables differ"
+        # The synapses of a block are those of its last connection, the
+        # cleared entries are not kept as zero pointers
+        n_units = setup.ninputs[0] + setup.nneurons[0]
+        last = {}
+        connections = [(cs, 0) for cs in setup.connections_external[0]]
+        connections += [(cs, setup.ninputs[0]) for cs in setup.connections[0]]
+        for cs, src_offset in connections:
+            last[(src_offset + cs.src_bgn, cs.dst_bgn, cs.dst_state)] = \
+                (cs, src_offset)
+        for cs, src_offset in last.values():
+            dst_offset = setup.ninputs[0] + n_units * cs.dst_state
+            block = ptr_table[src_offset + cs.src_bgn:
+                              src_offset + cs.src_end,
+                              dst_offset + cs.dst_bgn:
+                              dst_offset + cs.dst_end].tocoo()
+            pt = cs.ptr_table.tocoo()
+            ndst = len(cs.dst_pop)
+            assert np.array_equal(np.sort(block.row * ndst + block.col),
+                                  np.sort(pt.row * ndst + pt.col)), \
+                "Synapses left in the block of a later connection"
+        assert ptr_table.nnz == sum(cs.ptr_table.nnz
+                                    for cs, _ in last.values()), \
+            "Synapses outside the connection blocks"
+        print("Overlapping connections={0}: {1} synapses".format(
+            overlap, ptr_table.nnz))
+    print("Connections test passed")
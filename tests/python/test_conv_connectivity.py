@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The conv2d and loccon2d connectivity generated from the cached
+#          indices is that of the former dense padded construction, for
+#          several convolution geometries.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+from pyNSATlib.laxesis import conv2d, conv2d_indices, conv2d_filterbank, \
+    connections_dense_to_sparse_nonshared, gen_filterbank, loccon2d, \
+    loccon2d_filterbank
+
+# (imsize, ksize, stride) of the tested convolutions
+GEOMETRIES = [(28, 5, 2), (12, 3, 1), (10, 4, 2), (9, 3, 3)]
+N_FILTERS_IN = 2            # Number of input filters
+N_FILTERS_OUT = 3           # Number of output filters
+INIT = 5                    # Range of the loccon2d weights
+
+
+def legacy_padded(imsize, ksize, stride, values):
+    # Former construction: the kernel of every pixel is written to a padded
+    # 4d array, then cropped and strided
+    padded = np.zeros([imsize + ksize, imsize + ksize,
+                       imsize, imsize], dtype='int') - 1
+    for i in range(imsize):
+        for j in range(imsize):
+            padded[i:i + ksize, j:j + ksize, i, j] = values()
+    k2 = ksize // 2
+    k2o = ksize - ksize // 2
+    padded_strided = padded[k2:-k2o, k2:-k2o, ::stride, ::stride]
+    return padded_strided.reshape(imsize * imsize,
+                                  imsize * imsize // stride**2)
+
+
+def legacy_conv2d(imsize=28, ksize=5, stride=2):
+    Y = np.arange(ksize**2).reshape(ksize, ksize)
+    Wd = legacy_padded(imsize, ksize, stride, lambda: Y)
+    return Wd, 2 * (Wd != -1), np.zeros(ksize**2, 'int')
+
+
+def legacy_loccon2d_cw(imsize=28, ksize=5, stride=2):
+    return legacy_padded(imsize, ksize, stride, lambda: 1)
+
+
+def legacy_gen_filterbank(func, nfilterin, nfilterout, low=0, high=0,
+                          **kwargs):
+    W = []
+    shared = []
+    offset = 0
+    for j in range(nfilterin):
+        W_slice = []
+        for i in range(nfilterout):
+            w, cw, s = func(**kwargs)
+            s = np.random.uniform(low=low, high=high,
+                                  size=s.shape[0]).astype('int')
+            w[w != -1] += offset
+            offset += len(s)
+            W_slice += [w]
+            shared.extend(s)
+        W += [np.column_stack(W_slice)]
+    return np.vstack(W), np.array(shared)
+
+
+if __name__ == '__main__':
+    for imsize, ksize, stride in GEOMETRIES:
+        geometry = dict(imsize=imsize, ksize=ksize, stride=stride)
+
+        # Shared conv2d pattern
+        W, CW, K = conv2d(**geometry)
+        W_ref, CW_ref, K_ref = legacy_conv2d(**geometry)
+        assert np.array_equal(W, W_ref), "conv2d pointers differ"
+        assert np.array_equal(CW, CW_ref), "conv2d connections differ"
+        assert np.array_equal(K, K_ref), "conv2d kernels differ"
+        src, dst, kidx = conv2d_indices(**geometry)
+        assert not src.flags.writeable, "Cached indices are writeable"
+
+        # Filter banks of shared filters, same weights for the same seed
+        np.random.seed(0)
+        ptr, wgt = gen_filterbank(conv2d, N_FILTERS_IN, N_FILTERS_OUT,
+                                  low=-8, high=8, **geometry)
+        np.random.seed(0)
+        ptr_ref, wgt_ref = legacy_gen_filterbank(
+            legacy_conv2d, N_FILTERS_IN, N_FILTERS_OUT, low=-8, high=8,
+            **geometry)
+        assert np.array_equal(ptr, ptr_ref), "Filter bank pointers differ"
+        assert np.array_equal(wgt, wgt_ref), "Filter bank weights differ"
+        ptr_table, wgt_table = conv2d_filterbank(
+            N_FILTERS_IN, N_FILTERS_OUT, **geometry)
+        pt = ptr_table.tocoo()
+        rows, cols = np.nonzero(ptr_ref != -1)
+        assert np.array_equal(np.sort(pt.row * ptr_ref.shape[1] + pt.col),
+                              rows * ptr_ref.shape[1] + cols), \
+            "Sparse filter bank connections differ"
+        assert np.array_equal(pt.data, ptr_ref[pt.row, pt.col]), \
+            "Sparse filter bank pointers differ"
+
+        # Locally connected layers, the weights are random but the
+        # connections are those of the former construction
+        W, CW, _ = loccon2d(init=INIT, **geometry)
+        CW_ref = legacy_loccon2d_cw(**geometry)
+        assert np.array_equal(CW, CW_ref), "loccon2d connections differ"
+        assert np.all(np.abs(W[CW == 1]) < INIT), "loccon2d weights range"
+        assert np.all(W[CW != 1] == -1), "loccon2d weights off the kernels"
+        ptr_table, data = loccon2d_filterbank(
+            N_FILTERS_IN, N_FILTERS_OUT, init=INIT, **geometry)
+        CW_ref = np.vstack([np.column_stack([CW_ref] * N_FILTERS_OUT)] *
+                           N_FILTERS_IN)
+        ptr_ref, _ = connections_dense_to_sparse_nonshared(
+            np.zeros(CW_ref.shape, 'int'), CW_ref)
+        assert ptr_table.shape == ptr_ref.shape, "loccon2d bank shape"
+        assert np.array_equal(ptr_table.indptr, ptr_ref.indptr) and \
+            np.array_equal(ptr_table.indices, ptr_ref.indices) and \
+            np.array_equal(ptr_table.data, ptr_ref.data), \
+            "loccon2d bank pointers differ"
+        assert len(data) == ptr_table.nnz and np.all(np.abs(data) < INIT), \
+            "loccon2d bank weights"
+        print("Geometry {0}: {1} connections per filter pair".format(
+            (imsize, ksize, stride), len(src)))
+    print("Convolution connectivity test passed")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The dataset inputs (set_ext_dataset) present the samples in the
+#          order and at the times of the schedule.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.nsat_reader import read_events
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+t_sample = 200              # Duration of a sample
+N_CORES = 1                 # Number of cores
+N_NEURONS = [8]             # Number of neurons per core
+N_INPUTS = [8]              # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+if __name__ == '__main__':
+    # Sample k only drives input k. The entries of the schedule are given
+    # out of order, with a repeated sample and a gap between two samples.
+    data = np.eye(N_INPUTS[0], dtype='uint8') * 255
+    indices = [5, 2, 7, 0, 2, 3, 6, 1]
+    schedule = nsat.stimuli.sample_schedule(indices, t_sample, t_start=100)
+    schedule[4:, 1] += t_sample
+    schedule = schedule[np.random.RandomState(0).permutation(len(indices))]
+    sim_ticks = int(schedule[:, 1].max()) + 2 * t_sample
+
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES)
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[OFF, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].Xth[0] = 50
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+
+    # Every neuron relays the spikes of one input
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[np.arange(N_INPUTS[0]), N_INPUTS[0] + np.arange(N_NEURONS[0]), 0] = 100
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+
+    cfg.set_ext_dataset(data, schedule, max_rate=100., regular=True)
+
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_dataset_sources')
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+
+    ids, times = read_events(c_nsat_writer.fname.events + b'_core_0.dat')
+    ids, times = ids.astype('int64'), times.astype('int64')
+
+    # Sample presented at every tick (the relays spike one tick later)
+    presented = np.full(sim_ticks + 1, -1)
+    for idx, start, duration in schedule:
+        presented[start + 1:start + duration + 1] = idx
+    assert np.all(presented[times] == ids), "Spikes of another sample"
+
+    # Order of the samples, as spiked by the relays
+    order = ids[np.r_[True, ids[1:] != ids[:-1]]].tolist()
+    print("Samples order: {0}".format(order))
+    assert order == indices, "Samples out of order"
+    print("Dataset sources test passed")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The external events files written from numpy events and from pyST
+#          events are identical to the files of the legacy pyST writer, for
+#          the per-core and the single thread writers.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+from collections import Counter
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.global_vars import CHANNEL_OFFSET, ADDR_MASK
+from pyNSATlib.nsat_writer import pack, C_NSATWriterSingleThread
+
+sim_ticks = 200             # Simulation time
+N_CORES = 2                 # Number of cores
+N_NEURONS = [4, 4]          # Number of neurons per core
+N_INPUTS = [10, 10]         # Number of inputes per core
+N_STATES = [2, 2]           # Number of states per core
+
+
+def legacy_pack(ad, tm):
+    # The loop of the legacy pyST writer, one (t, count) pair and the
+    # records of its events per tick
+    out = b''
+    tm_count = Counter(tm)
+    pos_t = 0
+    for t in range(1, sim_ticks):
+        tc = tm_count[t]
+        out += pack([t, tc], 'Q')
+        if tc > 0:
+            delta_pos = list(tm[pos_t:]).index(t)
+            data = ad[(pos_t + delta_pos):(pos_t + delta_pos + tc)]
+            pos_t = pos_t + delta_pos + tc
+            out += pack(data, 'Q')
+    return out
+
+
+def random_events(rs):
+    # Several events per tick, sorted by (time, addr) without duplicates
+    ev = []
+    for core in range(N_CORES):
+        cells = np.nonzero(rs.rand(sim_ticks - 1, N_INPUTS[core]) < 0.2)
+        ev.append(np.column_stack([cells[0] + 1,
+                                   np.full(len(cells[0]), core),
+                                   cells[1]]))
+    return np.concatenate(ev)
+
+
+def write_events(events, prefix, writer=nsat.C_NSATWriter):
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES)
+    cfg.set_ext_events(events)
+    c_nsat_writer = writer(cfg, path='/tmp', prefix=prefix)
+    c_nsat_writer.write_ext_events()
+    return c_nsat_writer.fname.ext_events
+
+
+def read_bytes(fname):
+    with open(fname, 'rb') as f:
+        return f.read()
+
+
+if __name__ == '__main__':
+    rs = np.random.RandomState(0)
+    events = random_events(rs)
+    pyst_events = nsat.exportAER(
+        [nsat.build_SpikeList(events[events[:, 1] == core, 0],
+                              events[events[:, 1] == core, 2])
+         for core in range(N_CORES)])
+
+    # Per-core files
+    fname_np = write_events(events[rs.permutation(len(events))],
+                            'test_ext_events_np')
+    fname_st = write_events(pyst_events, 'test_ext_events_st')
+    for core in range(N_CORES):
+        ev = events[events[:, 1] == core]
+        ref = legacy_pack(ev[:, 2], ev[:, 0])
+        suffix = ('_core_' + str(core) + '.dat').encode('utf-8')
+        assert read_bytes(fname_np + suffix) == ref, \
+            "Numpy events differ from the legacy writer"
+        assert read_bytes(fname_st + suffix) == ref, \
+            "pyST events differ from the legacy writer"
+    print("Per-core writer: {0} events".format(len(events)))
+
+    # Single thread writer, (core, addr) records in a single file
+    order = np.lexsort((events[:, 2], events[:, 1], events[:, 0]))
+    ev = events[order]
+    ad = (ev[:, 1] << CHANNEL_OFFSET) + ev[:, 2]
+    ref = legacy_pack(np.column_stack([ad >> CHANNEL_OFFSET, ad & ADDR_MASK]),
+                      ev[:, 0])
+    fname_np = write_events(events[rs.permutation(len(events))],
+                            'test_ext_events_np_st', C_NSATWriterSingleThread)
+    fname_st = write_events(pyst_events, 'test_ext_events_st_st',
+                            C_NSATWriterSingleThread)
+    assert read_bytes(fname_np) == ref, \
+        "Numpy events differ from the legacy single thread writer"
+    assert read_bytes(fname_st) == ref, \
+        "pyST events differ from the legacy single thread writer"
+
+    # Events of stimuli.to_ext_events are written to their core
+    ev = events[events[:, 1] == 1]
+    fname_np = write_events(
+        nsat.stimuli.to_ext_events(ev[:, [0, 2]], core=1),
+        'test_ext_events_stim')
+    assert read_bytes(fname_np + b'_core_1.dat') == \
+        legacy_pack(ev[:, 2], ev[:, 0]), "to_ext_events differs"
+    print("External events writer test passed")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Import time benchmark of pyNSATlib. Fails if the import exceeds the
+# budget, or if it loads plotting and heavy optional dependencies.
+#
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import sys
+import subprocess
+
+# Budget of "import pyNSATlib" in seconds (best of N_REPEATS)
+BUDGET = 0.5
+N_REPEATS = 5
+# Modules that must only be imported by the functions that use them
+LAZY_MODULES = ['matplotlib', 'pylab', 'scipy', 'pyNCSre']
+
+CODE = '''
+import sys
+import time
+t0 = time.perf_counter()
+import pyNSATlib
+print(time.perf_counter() - t0)
+print(' '.join(m for m in {} if m in sys.modules))
+'''.format(LAZY_MODULES)
+
+
+if __name__ == '__main__':
+    times = []
+    for i in range(N_REPEATS):
+        out = subprocess.check_output([sys.executable, '-c', CODE],
+                                      universal_newlines=True).split('\n')
+        times.append(float(out[0]))
+        loaded = out[1].split()
+        if loaded:
+            sys.exit('import pyNSATlib loads {}'.format(', '.join(loaded)))
+
+    print("import pyNSATlib: {:.3f}s (budget {:.3f}s)".format(min(times),
+                                                             BUDGET))
+    if min(times) > BUDGET:
+        sys.exit('import pyNSATlib exceeds its time budget')
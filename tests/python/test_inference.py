@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The inference samples (set_inference) give the same spike counts
+#          with one or several workers, repeated samples draw different
+#          inputs, and rate coded inputs and external events are refused.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+t_sample = 300              # Duration of a sample
+n_samples = 12              # Number of samples
+N_CORES = 1                 # Number of cores
+N_NEURONS = [6]             # Number of neurons per core
+N_INPUTS = [16]             # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+def build_configuration(samples=np.arange(n_samples)):
+    rs = np.random.RandomState(0)
+    cfg = nsat.ConfigurationNSAT(sim_ticks=n_samples * t_sample,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES)
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[-3, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].sA[0] = [[-1, 1],
+                              [1, 1]]
+    cfg.core_cfgs[0].Xth[0] = 60
+    cfg.core_cfgs[0].t_ref[0] = 2
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[:N_INPUTS[0], N_INPUTS[0]:, 0] = rs.randint(0, 30, size=(N_INPUTS[0],
+                                                              N_NEURONS[0]))
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+
+    data = rs.uniform(size=(n_samples, N_INPUTS[0]))
+    cfg.set_ext_dataset(data, nsat.stimuli.sample_schedule(
+        samples, t_sample), max_rate=200.)
+    return cfg
+
+
+def run_inference(n_workers, samples=np.arange(n_samples)):
+    cfg = build_configuration(samples)
+    cfg.set_inference(n_workers)
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_inference_%d' % n_workers)
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    c_nsat_reader = nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+    return c_nsat_reader.read_spike_counts()
+
+
+if __name__ == '__main__':
+    counts = run_inference(1)
+    print("Spike counts (1 worker):\n{0}".format(counts))
+    assert counts.shape == (n_samples, N_NEURONS[0]), "Wrong counts shape"
+    assert counts.sum() > 0, "No spikes"
+    for n_workers in (2, 5):
+        assert np.array_equal(run_inference(n_workers), counts), \
+            "Spike counts depend on the number of workers"
+
+    # Every sample draws its inputs from a stream of its own
+    counts = run_inference(2, samples=np.zeros(n_samples, 'int'))
+    print("Spike counts of a repeated sample:\n{0}".format(counts))
+    assert counts.sum() > 0, "No spikes"
+    assert len(np.unique(counts, axis=0)) == n_samples, \
+        "Repeated samples draw the same inputs"
+
+    # The rate coded inputs are not supported in inference mode
+    cfg = build_configuration()
+    cfg.set_ext_rates(np.full((1, N_INPUTS[0]), 10.), t_sample=t_sample)
+    try:
+        cfg.set_inference(2)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Rate coded inputs accepted in inference mode")
+    cfg = build_configuration()
+    cfg.set_inference(2)
+    try:
+        cfg.set_ext_rates(np.full((1, N_INPUTS[0]), 10.), t_sample=t_sample)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Rate coded inputs accepted in inference mode")
+
+    # Neither are the external events
+    events = np.array([[1, 0, 0]])
+    cfg = build_configuration()
+    cfg.set_ext_events(events)
+    try:
+        cfg.set_inference(2)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("External events accepted in inference mode")
+    cfg = build_configuration()
+    cfg.set_inference(2)
+    try:
+        cfg.set_ext_events(events)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("External events accepted in inference mode")
+    print("Inference test passed")
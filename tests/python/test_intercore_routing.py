@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The spikes of a neuron are routed to the inputs of another core.
+#          A relay neuron on core 1 drives a relay neuron on core 0 through
+#          an L1 connection.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 100             # Simulation time
+N_CORES = 2                 # Number of cores
+N_NEURONS = [1, 1]          # Number of neurons per core
+N_INPUTS = [1, 1]           # Number of inputes per core
+N_STATES = [2, 2]           # Number of states per core
+N_UNITS = [sum(i) for i in zip(N_INPUTS, N_NEURONS)]
+
+
+if __name__ == '__main__':
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_spikes=True)
+
+    # Relay neurons: every input spike makes the neuron spike
+    OFF = -16
+    for p in range(N_CORES):
+        cfg.core_cfgs[p].A[0] = [[OFF, OFF],
+                                 [OFF, OFF]]
+        cfg.core_cfgs[p].sA[0] = [[-1, 1],
+                                  [1, 1]]
+        cfg.core_cfgs[p].Xth[0] = 50
+        cfg.core_cfgs[p].t_ref[0] = 0
+        cfg.core_cfgs[p].nmap = np.zeros((N_NEURONS[p],), dtype='int')
+
+        W = np.zeros([N_UNITS[p], N_UNITS[p], N_STATES[p]], 'int')
+        W[0, 1, 0] = 100
+        CW = W.astype('bool')
+        wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+        cfg.core_cfgs[p].wgt_table = wgt_table
+        cfg.core_cfgs[p].ptr_table = ptr_table
+
+    # The neuron of core 1 projects to the input of core 0
+    cfg.set_L1_connectivity({(1, N_INPUTS[1]): ((0, 0),)})
+
+    # External events drive the input of core 1 only
+    times = np.arange(10, sim_ticks, 10)
+    cfg.set_ext_events(np.column_stack([times, np.ones_like(times),
+                                        np.zeros_like(times)]))
+
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_intercore_routing')
+    c_nsat_writer.write()
+    c_nsat_writer.write_L1connectivity()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+
+    c_nsat_reader = nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+    spikes = c_nsat_reader.read_c_nsat_raw_events()
+    times1 = spikes[1].reshape(-1, 2)[:, 1]
+    times0 = spikes[0].reshape(-1, 2)[:, 1]
+    print("Core 1 spikes: {0}".format(times1))
+    print("Core 0 spikes: {0}".format(times0))
+    assert np.array_equal(times1, times + 1), "Core 1 misses input spikes"
+    assert np.array_equal(times0, times + 2), "Routed spikes are lost"
+    print("Inter-core routing test passed")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The per-phase profile of the cores (profile=True) is read with
+#          C_NSATReader.read_profile, and is not written in inference mode.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import os
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.global_vars import PROFILE_PHASES
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 2000            # Simulation time
+N_CORES = 1                 # Number of cores
+N_NEURONS = [6]             # Number of neurons per core
+N_INPUTS = [16]             # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+def build_configuration():
+    rs = np.random.RandomState(0)
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 profile=True)
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[-3, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].sA[0] = [[-1, 1],
+                              [1, 1]]
+    cfg.core_cfgs[0].Xth[0] = 60
+    cfg.core_cfgs[0].t_ref[0] = 2
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[:N_INPUTS[0], N_INPUTS[0]:, 0] = rs.randint(1, 30, size=(N_INPUTS[0],
+                                                              N_NEURONS[0]))
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+    return cfg
+
+
+def run(cfg):
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp', prefix='test_profile')
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    return nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+
+
+if __name__ == '__main__':
+    rs = np.random.RandomState(1)
+    cfg = build_configuration()
+    cfg.set_ext_rates(rs.uniform(20, 100, size=(1, N_INPUTS[0])),
+                      t_sample=sim_ticks)
+    profile = run(cfg).read_profile()
+    print(profile)
+    assert profile.dtype.names == \
+        tuple(PROFILE_PHASES) + ('syn_events', 'wgt_updates'), "Wrong fields"
+    assert len(profile) == N_CORES, "One record per core expected"
+    times = np.array([profile[ph] for ph in PROFILE_PHASES])
+    assert np.all(times >= 0) and times.sum() > 0, "Invalid phases times"
+    assert profile['integrate'][0] > 0, "Integration not profiled"
+    assert profile['syn_events'][0] > 0, "No synaptic events"
+    assert profile['wgt_updates'][0] == 0, "Weight updates without STDP"
+
+    # The inference samples are not profiled
+    cfg = build_configuration()
+    cfg.set_ext_dataset(rs.uniform(size=(4, N_INPUTS[0])),
+                        nsat.stimuli.sample_schedule(np.arange(4), 500))
+    cfg.set_inference(2)
+    reader = run(cfg)
+    assert not os.path.exists(reader.fname.profile), "Profile of inference"
+    try:
+        reader.read_profile()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Profile of inference read")
+    print("Profile test passed")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The compact (NSPT) and the legacy (uint64 records) ptr table
+#          formats of the same tables are read to the same synapses, by
+#          read_ptr_table and by the simulator, and give identical spikes.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+from scipy.sparse import csr_matrix
+import pyNSATlib as nsat
+from pyNSATlib.global_vars import PTR_TABLE_MAGIC
+from pyNSATlib.nsat_reader import read_ptr_table
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW, ptr_table_to_records
+
+sim_ticks = 500             # Simulation time
+N_CORES = 2                 # Number of cores
+N_NEURONS = [6, 8]          # Number of neurons per core
+N_INPUTS = [10, 5]          # Number of inputes per core
+N_STATES = [2, 3]           # Number of states per core
+
+
+def build_configuration(rs):
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_weights_final=True)
+    OFF = -16
+    for p in range(N_CORES):
+        n_units = N_INPUTS[p] + N_NEURONS[p]
+        core_cfg = cfg.core_cfgs[p]
+        core_cfg.A[0] = np.full((N_STATES[p], N_STATES[p]), OFF)
+        core_cfg.A[0][0, 0] = -3
+        core_cfg.sA[0] = np.ones((N_STATES[p], N_STATES[p]), 'int')
+        core_cfg.sA[0][0, 0] = -1
+        core_cfg.Xth[0] = 60
+        core_cfg.t_ref[0] = 2
+        core_cfg.nmap = np.zeros((N_NEURONS[p],), dtype='int')
+        # Inputs and recurrent connections to every state of the neurons
+        CW = rs.rand(n_units, n_units, N_STATES[p]) < 0.4
+        CW[:, :N_INPUTS[p]] = False
+        W = CW * rs.randint(-10, 30, size=CW.shape)
+        if p == 0:
+            wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+        else:
+            # Sparse table, pointer 0 is a valid (explicit) entry
+            src, dst, state = np.nonzero(CW)
+            ptr_table = csr_matrix(
+                (np.arange(len(src)), (src, state * n_units + dst)),
+                shape=(n_units, n_units * N_STATES[p]), dtype='uint64')
+            wgt_table = W[src, dst, state]
+        core_cfg.wgt_table = wgt_table
+        core_cfg.ptr_table = ptr_table
+    t, c = np.nonzero(rs.rand(sim_ticks - 1, N_CORES) < 0.6)
+    cfg.set_ext_events(np.column_stack(
+        [t + 1, c, rs.randint(0, min(N_INPUTS), size=len(t))]))
+    return cfg
+
+
+def write_legacy_ptr_table(fname, core_cfg):
+    src, dst, state, ptr = ptr_table_to_records(
+        core_cfg.ptr_table, core_cfg.n_units, core_cfg.n_states)
+    with open(fname, 'wb') as f:
+        f.write(np.array([len(src)], '<u8').tobytes())
+        f.write(np.column_stack([src, dst, state, ptr]).astype('<u8')
+                .tobytes())
+
+
+def run(c_nsat_writer, cfg):
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    reader = nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+    outputs = []
+    for p in range(N_CORES):
+        with open(c_nsat_writer.fname.synw_final +
+                  ('_core_' + str(p) + '.dat').encode('utf-8'), 'rb') as f:
+            outputs.append(f.read())
+    return reader.read_c_nsat_raw_events(), outputs
+
+
+if __name__ == '__main__':
+    rs = np.random.RandomState(0)
+    cfg = build_configuration(rs)
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_ptr_formats')
+    c_nsat_writer.write()
+    fnames = [c_nsat_writer.fname.syn_ptr_table +
+              ('_core_' + str(p) + '.dat').encode('utf-8')
+              for p in range(N_CORES)]
+
+    compact = []
+    for fname in fnames:
+        with open(fname, 'rb') as f:
+            assert f.read(len(PTR_TABLE_MAGIC)) == PTR_TABLE_MAGIC, \
+                "The writer does not use the compact format"
+        compact.append(read_ptr_table(fname))
+    events, synw = run(c_nsat_writer, cfg)
+
+    for fname, (p, core_cfg) in zip(fnames, cfg):
+        write_legacy_ptr_table(fname, core_cfg)
+        ref = np.column_stack(ptr_table_to_records(
+            core_cfg.ptr_table, core_cfg.n_units, core_cfg.n_states))
+        assert np.array_equal(read_ptr_table(fname), ref), \
+            "Legacy table read differs"
+        assert np.array_equal(compact[p], ref), "Compact table read differs"
+    events_legacy, synw_legacy = run(c_nsat_writer, cfg)
+
+    for p in range(N_CORES):
+        print("Core {0}: {1} synapses, {2} spikes".format(
+            p, len(compact[p]), len(events[p]) // 2))
+        assert len(events[p]) > 0, "No spikes"
+        assert np.array_equal(events[p], events_legacy[p]), \
+            "Spikes differ between the formats"
+        assert len(synw[p]) > 0 and synw[p] == synw_legacy[p], \
+            "Synapse lists differ between the formats"
+    print("Ptr formats test passed")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The rate coded inputs (set_ext_rates) spike at the requested
+#          rates in each sample window, and are silent outside the windows.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.nsat_reader import read_events
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+t_start = 500               # First sample window
+t_sample = 2000             # Duration of a sample window
+sim_ticks = t_start + 4 * t_sample
+N_CORES = 1                 # Number of cores
+N_NEURONS = [8]             # Number of neurons per core
+N_INPUTS = [8]              # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+if __name__ == '__main__':
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES)
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[OFF, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].Xth[0] = 50
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+
+    # Every neuron relays the spikes of one input
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[np.arange(N_INPUTS[0]), N_INPUTS[0] + np.arange(N_NEURONS[0]), 0] = 100
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+
+    # Rates (Hz) of the sample windows, the third one is silent
+    rates = np.zeros((3, N_INPUTS[0]))
+    rates[0] = np.linspace(0, 70, N_INPUTS[0])
+    rates[1] = 20
+    rates[2] = 0
+    cfg.set_ext_rates(rates, t_sample=t_sample, t_start=t_start)
+
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_rate_sources')
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+
+    ids, times = read_events(c_nsat_writer.fname.events + b'_core_0.dat')
+    ids, times = ids.astype('int64'), times.astype('int64')
+    assert times.min() > t_start, "Spikes before t_start"
+    assert times.max() <= t_start + 2 * t_sample + 1, \
+        "Spikes in a silent window"
+
+    # Spike counts of the windows, the inputs spike at most once per tick
+    window = (times - t_start - 1) // t_sample
+    counts = np.zeros((3, N_NEURONS[0]), 'int')
+    np.add.at(counts, (window, ids), 1)
+    expected = rates * t_sample * 1e-3
+    print("Counts:\n{0}\nExpected:\n{1}".format(counts, expected))
+    assert np.all(counts[expected == 0] == 0), "Spikes of silent inputs"
+    assert np.all(np.abs(counts - expected) <= 5 * np.sqrt(expected) + 1), \
+        "Spike counts do not match the rates"
+    print("Rate sources test passed")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: A replica with the parameters of its core reproduces the spikes
+#          of the core, with external events, rate coded and dataset input
+#          sources. A replica with different parameters diverges from its
+#          core, and so do the weights of a plastic replica.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 1000            # Simulation time
+N_CORES = 1                 # Number of cores
+N_NEURONS = [4]             # Number of neurons per core
+N_INPUTS = [10]             # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+def build_configuration(plastic=False):
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 plasticity_en=[plastic],
+                                 tstdpmax=[100])
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[-3, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].sA[0] = [[-1, 1],
+                              [1, 1]]
+    cfg.core_cfgs[0].Xth[0] = 60
+    cfg.core_cfgs[0].t_ref[0] = 2
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+    if plastic:
+        cfg.core_cfgs[0].plastic[0] = True
+        cfg.core_cfgs[0].stdp_en[0] = True
+        # The STDP updates are scaled by the (constant) state 1
+        cfg.core_cfgs[0].Xinit[0] = [0, 1]
+
+    # All the inputs project to all the neurons
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[:N_INPUTS[0], N_INPUTS[0]:, 0] = 20
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+    return cfg, W
+
+
+def run_with_replicas(cfg, prefix, params=[{}], own_weights=False):
+    reps = cfg.add_replicas(0, params, own_weights=own_weights)
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp', prefix=prefix)
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    c_nsat_reader = nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+    events = c_nsat_reader.read_c_nsat_raw_events()
+    return c_nsat_reader, events[0], [events[r] for r in reps]
+
+
+def ext_events(rs, rate=0.05):
+    t, a = np.nonzero(rs.rand(sim_ticks - 1, N_INPUTS[0]) < rate)
+    return np.column_stack([t + 1, np.zeros_like(t), a])
+
+
+if __name__ == '__main__':
+    rs = np.random.RandomState(0)
+
+    # External events, an identity replica and a lower threshold
+    cfg, _ = build_configuration()
+    cfg.set_ext_events(ext_events(rs))
+    Xth = cfg.core_cfgs[0].Xth.copy()
+    Xth[0] = 30
+    _, base, (same, lower) = run_with_replicas(cfg, 'test_replicas_events',
+                                               [{}, {'Xth': Xth}])
+    print("External events: {0} vs {1} vs {2} spikes".format(
+        len(base), len(same), len(lower)))
+    assert len(base) > 0, "No spikes"
+    assert np.array_equal(base, same), "Replica inputs differ (events)"
+    assert len(lower) > len(base), "Replica parameters are not used"
+
+    # Plastic core, the weights of an identity replica follow the core
+    cfg, W0 = build_configuration(plastic=True)
+    cfg.set_ext_events(ext_events(rs, rate=0.1))
+    Xth = cfg.core_cfgs[0].Xth.copy()
+    Xth[0] = 30
+    reader, base, (same, lower) = run_with_replicas(
+        cfg, 'test_replicas_plastic', [{}, {'Xth': Xth}], own_weights=True)
+    W = reader.read_synaptic_weights()
+    print("Plastic core: {0} vs {1} vs {2} spikes".format(
+        len(base), len(same), len(lower)))
+    assert not np.array_equal(W[0], W0), "No weight updates"
+    assert np.array_equal(W[0], W[1]), "Replica weights differ"
+    assert not np.array_equal(W[0], W[2]), "Replica weights are shared"
+
+    # Rate coded inputs
+    cfg, _ = build_configuration()
+    cfg.set_ext_rates(rs.uniform(20, 100, size=(4, N_INPUTS[0])),
+                      t_sample=250)
+    _, base, (rep,) = run_with_replicas(cfg, 'test_replicas_rates')
+    print("Rate sources: {0} vs {1} spikes".format(len(base), len(rep)))
+    assert len(base) > 0, "No spikes"
+    assert np.array_equal(base, rep), "Replica inputs differ (rates)"
+
+    # Dataset inputs
+    cfg, _ = build_configuration()
+    data = rs.uniform(size=(3, N_INPUTS[0]))
+    cfg.set_ext_dataset(data, nsat.stimuli.sample_schedule([0, 1, 2], 300),
+                        max_rate=100.)
+    _, base, (rep,) = run_with_replicas(cfg, 'test_replicas_dataset')
+    print("Dataset sources: {0} vs {1} spikes".format(len(base), len(rep)))
+    assert len(base) > 0, "No spikes"
+    assert np.array_equal(base, rep), "Replica inputs differ (dataset)"
+    print("Replicas test passed")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: run_experiments runs a batch of configurations, reuses the
+#          results of the finished runs and reports the failed simulations
+#          without affecting the other ones.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.runner import DONE_FNAME
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+
+def build_configuration(bias, n_inputs=0):
+    N_NEURONS = [2]             # Number of neurons per core
+    N_INPUTS = [n_inputs]       # Number of inputes per core
+    N_STATES = [4]              # Number of states per core
+    N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+    cfg = nsat.ConfigurationNSAT(sim_ticks=100,
+                                 N_CORES=1,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_states=True)
+    cfg.core_cfgs[0].b[0] = np.array([bias, 0, 0, 0], dtype='int')
+    cfg.core_cfgs[0].Xth[0] = 100
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[N_INPUTS[0], N_INPUTS[0] + 1, 0] = 50
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+    return cfg
+
+
+if __name__ == '__main__':
+    path = tempfile.mkdtemp(prefix='test_runner')
+    try:
+        # The invalid configuration (inputs without external events) makes
+        # the simulator exit
+        cfgs = [build_configuration(50), build_configuration(20, n_inputs=2),
+                build_configuration(30)]
+        readers = nsat.run_experiments(cfgs, path, n_workers=2)
+        assert isinstance(readers[1].error(), RuntimeError), "No error"
+        assert not os.path.exists(os.path.join(readers[1].path, DONE_FNAME))
+        try:
+            readers[1].read_c_nsat_states()
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("Failed simulation read")
+        states = []
+        for r in (readers[0], readers[2]):
+            assert r.error() is None, r.error()
+            assert not r.cached, "Simulation not run"
+            assert os.path.exists(os.path.join(r.path, DONE_FNAME))
+            states.append(r.read_c_nsat_states()[0][1])
+        assert not np.array_equal(states[0], states[1]), "Same results"
+
+        # The finished runs are reused, the failed one runs again
+        done = os.path.join(readers[0].path, DONE_FNAME)
+        mtime = os.stat(done).st_mtime_ns
+        cached = nsat.run_experiments(cfgs, path)
+        assert cached[0].cached and cached[2].cached, "Results not reused"
+        assert cached[0].path == readers[0].path, "Digest changed"
+        assert os.stat(done).st_mtime_ns == mtime, "Simulation run again"
+        assert not cached[1].cached and cached[1].error() is not None
+        assert np.array_equal(cached[0].read_c_nsat_states()[0][1], states[0])
+
+        # A modified configuration runs in its own directory
+        cfg = build_configuration(50)
+        cfg.core_cfgs[0].Xth[0] = 90
+        other = nsat.run_experiments([cfg], path)[0]
+        assert other.path != readers[0].path, "Same digest"
+        assert not other.cached and other.error() is None
+
+        # Without the cache, the configuration runs again
+        rerun = nsat.run_experiments(cfgs[:1], path, cache=False)[0]
+        assert not rerun.cached and rerun.error() is None
+        assert os.stat(done).st_mtime_ns != mtime, "Simulation not run"
+        assert np.array_equal(rerun.read_c_nsat_states()[0][1], states[0])
+    finally:
+        shutil.rmtree(path)
+    print("Runner test passed")
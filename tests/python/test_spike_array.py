@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: SpikeArray gives the same spike trains, histograms and firing
+#          rates as a pyST SpikeList of the same events, for unsorted
+#          events and for the presorted spikes read from the simulator.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.spikes import SpikeArray
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 1000            # Simulation time
+time_bin = 50               # Time bin of the histograms
+N_CORES = 1                 # Number of cores
+N_NEURONS = [8]             # Number of neurons per core
+N_INPUTS = [10]             # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+def compare(sa, sl, name):
+    assert np.array_equal(sa.id_list(), np.sort(sl.id_list())), \
+        "{0}: id lists differ".format(name)
+    trains = sa.split()
+    for id in sl.id_list():
+        assert np.array_equal(trains[id], sl[id].spike_times), \
+            "{0}: spike times of {1} differ".format(name, id)
+        assert np.array_equal(sa[id], sl[id].spike_times), \
+            "{0}: spike times of {1} differ".format(name, id)
+    order = np.argsort(sl.id_list())
+    assert np.allclose(sa.spike_histogram(time_bin),
+                       sl.spike_histogram(time_bin)[order]), \
+        "{0}: spike histograms differ".format(name)
+    assert np.allclose(sa.firing_rate(time_bin),
+                       sl.firing_rate(time_bin)[order]), \
+        "{0}: firing rates differ".format(name)
+    assert np.allclose(sa.firing_rate(time_bin, average=True),
+                       sl.firing_rate(time_bin, average=True)), \
+        "{0}: average firing rates differ".format(name)
+    assert np.allclose(sa.mean_rates(), sl.mean_rates()[order]), \
+        "{0}: mean rates differ".format(name)
+    assert np.allclose(sa.mean_rates(200, 700),
+                       sl.mean_rates(200, 700)[order]), \
+        "{0}: mean rates of an interval differ".format(name)
+
+
+def run_simulation(rs):
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_spikes=True)
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[-3, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].sA[0] = [[-1, 1],
+                              [1, 1]]
+    cfg.core_cfgs[0].Xth[0] = 60
+    cfg.core_cfgs[0].t_ref[0] = 2
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[:N_INPUTS[0], N_INPUTS[0]:, 0] = rs.randint(0, 40, size=(N_INPUTS[0],
+                                                              N_NEURONS[0]))
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+    t, a = np.nonzero(rs.rand(sim_ticks - 1, N_INPUTS[0]) < 0.2)
+    cfg.set_ext_events(np.column_stack([t + 1, np.zeros_like(t), a]))
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_spike_array')
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    return nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+
+
+if __name__ == '__main__':
+    rs = np.random.RandomState(0)
+
+    # Unsorted events, the last bin includes t_stop
+    times = rs.randint(0, sim_ticks + 1, size=2000)
+    ids = rs.randint(0, 12, size=2000)
+    times[:5] = sim_ticks
+    sa = SpikeArray(times, ids, t_start=0, t_stop=sim_ticks)
+    sl = nsat.build_SpikeList(times, ids, sim_ticks=sim_ticks)
+    compare(sa, sl, "Unsorted events")
+    compare(sa.time_slice(300, 650), sl.time_slice(300, 650), "Time slice")
+    compare(sa.id_slice([1, 4, 7]), sl.id_slice([1, 4, 7]), "Id slice")
+    compare(SpikeArray.from_spikelist(sl), sl, "From SpikeList")
+    compare(sa, sa.to_spikelist(), "To SpikeList")
+    print("Unsorted events: {0} spikes".format(sa.n_spikes))
+
+    # Presorted spikes of the simulator
+    c_nsat_reader = run_simulation(rs)
+    sa = c_nsat_reader.read_spikelist(spike_array=True)
+    sl = c_nsat_reader.read_spikelist(spike_array=False)
+    assert sa.n_spikes > 0, "No spikes"
+    resorted = SpikeArray(sa.times, sa.ids, t_stop=sim_ticks)
+    assert np.array_equal(sa.times, resorted.times) and \
+        np.array_equal(sa.ids, resorted.ids), "Recorded spikes not sorted"
+    compare(sa, sl, "Recorded spikes")
+    print("Recorded spikes: {0} spikes".format(sa.n_spikes))
+    print("SpikeArray test passed")
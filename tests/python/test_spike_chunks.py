@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The spike events streamed to disk in many small chunks
+#          (spk_chunk_size) are those of a run written in a single chunk,
+#          in the legacy and compact formats.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import os
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.nsat_reader import read_events
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 2000            # Simulation time
+N_CORES = 1                 # Number of cores
+N_NEURONS = [64]            # Number of neurons per core
+N_INPUTS = [0]              # Number of inputes per core
+N_STATES = [4]              # Number of states per core
+
+
+def run_chunks(spk_format, spk_chunk_size):
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_spikes=True,
+                                 spk_format=spk_format,
+                                 spk_chunk_size=spk_chunk_size)
+    # Neurons driven by different biases fire with different periods
+    n_groups = 8
+    cfg.core_cfgs[0].nmap = np.arange(N_NEURONS[0]) % n_groups
+    for g in range(n_groups):
+        cfg.core_cfgs[0].b[g] = np.array([3 + 7 * g, 0, 0, 0], dtype='int')
+        cfg.core_cfgs[0].Xth[g] = 100
+    W = np.zeros([N_NEURONS[0], N_NEURONS[0], N_STATES[0]], 'int')
+    W[0, 1, 0] = 1
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+
+    c_nsat_writer = nsat.C_NSATWriter(
+        cfg, path='/tmp', prefix='test_spike_chunks_{0}_{1}'.format(
+            spk_format, spk_chunk_size))
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    fname = c_nsat_writer.fname.events + b'_core_0.dat'
+    assert not os.path.exists(fname + b'.part'), "Partial events file left"
+    assert not os.path.exists(fname + b'.times'), "Times file left"
+    return read_events(fname)
+
+
+if __name__ == '__main__':
+    for spk_format in ('legacy', 'compact'):
+        ids, times = run_chunks(spk_format, nsat.SPK_CHUNK_SIZE)
+        assert sim_ticks < len(ids) < nsat.SPK_CHUNK_SIZE, \
+            "The reference run is not written in a single chunk"
+        # Chunks of a few ticks
+        for spk_chunk_size in (1, 7, 50):
+            ids_c, times_c = run_chunks(spk_format, spk_chunk_size)
+            print("{0}, chunks of {1}: {2} spikes".format(
+                spk_format, spk_chunk_size, len(ids_c)))
+            assert np.array_equal(ids_c, ids), "Chunked ids differ"
+            assert np.array_equal(times_c, times), "Chunked times differ"
+    print("Spike chunks test passed")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The spike counts accumulated by the simulator (spk_count_window)
+#          match the per-window counts of the recorded spikes.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.nsat_reader import read_events
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 1000            # Simulation time
+window = 64                 # Spike counts window, does not divide sim_ticks
+N_CORES = 1                 # Number of cores
+N_NEURONS = [8]             # Number of neurons per core
+N_INPUTS = [16]             # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+def build_configuration(spk_count_mon):
+    rs = np.random.RandomState(0)
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_spikes=True,
+                                 spk_count_window=window,
+                                 spk_count_mon=spk_count_mon)
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[-3, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].sA[0] = [[-1, 1],
+                              [1, 1]]
+    cfg.core_cfgs[0].Xth[0] = 60
+    cfg.core_cfgs[0].t_ref[0] = 2
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[:N_INPUTS[0], N_INPUTS[0]:, 0] = rs.randint(0, 30, size=(N_INPUTS[0],
+                                                              N_NEURONS[0]))
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+
+    # Rates changing every 250 ticks
+    cfg.set_ext_rates(rs.uniform(10, 200, size=(4, N_INPUTS[0])),
+                      t_sample=250)
+    return cfg
+
+
+if __name__ == '__main__':
+    counted = [5, 1, 3, 6]
+    cfg = build_configuration([counted])
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_spike_counts')
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    c_nsat_reader = nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+
+    # Window w holds the time steps [w * window, (w + 1) * window)
+    ids, times = read_events(c_nsat_writer.fname.events + b'_core_0.dat')
+    n_windows = (sim_ticks - 1) // window + 1
+    ref = np.zeros((n_windows, N_NEURONS[0]), 'int')
+    np.add.at(ref, (times.astype('intp') // window, ids.astype('intp')), 1)
+
+    counts = c_nsat_reader.read_spike_counts()
+    print("Spike counts:\n{0}".format(counts))
+    assert counts.sum() > 0, "No spikes"
+    assert np.array_equal(counts, ref[:, counted]), \
+        "Spike counts differ from the recorded spikes"
+    assert np.array_equal(c_nsat_reader.read_spike_counts(id_list=[3, 5]),
+                          ref[:, [3, 5]]), "Wrong neurons selected"
+
+    # A neuron is counted once
+    try:
+        build_configuration([[5, 1, 5]])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Duplicate counted neurons accepted")
+    print("Spike counts test passed")
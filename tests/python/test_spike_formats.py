@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The legacy, compact and bitmap spike events files of a large
+#          network hold the same spikes, and the readers decode them.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import time
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.global_vars import SPK_BITMAP_FLAG
+from pyNSATlib.nsat_reader import read_events
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 5000            # Simulation time
+N_CORES = 1                 # Number of cores
+N_NEURONS = [1024]          # Number of neurons per core
+N_INPUTS = [0]              # Number of inputes per core
+N_STATES = [4]              # Number of states per core
+
+
+def run_format(spk_format):
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_spikes=True,
+                                 spk_format=spk_format)
+    # Neurons driven by different biases fire with different periods, so
+    # that the ticks have few (compact records) or many (bitmaps) spikes
+    n_groups = 8
+    nmap = np.arange(N_NEURONS[0]) % n_groups
+    nmap[8 * n_groups:] = n_groups - 1
+    cfg.core_cfgs[0].nmap = nmap
+    for g in range(n_groups):
+        cfg.core_cfgs[0].b[g] = np.array([3 + 7 * g, 0, 0, 0], dtype='int')
+        cfg.core_cfgs[0].Xth[g] = 100
+    W = np.zeros([N_NEURONS[0], N_NEURONS[0], N_STATES[0]], 'int')
+    W[0, 1, 0] = 1
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_spike_formats_' + spk_format)
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    fname = c_nsat_writer.fname.events + b'_core_0.dat'
+    t0 = time.perf_counter()
+    ids, times = read_events(fname)
+    t_read = time.perf_counter() - t0
+    order = np.lexsort((ids, times))
+    return fname, ids[order], times[order], t_read
+
+
+if __name__ == '__main__':
+    results = {}
+    for spk_format in ('legacy', 'compact', 'bitmap'):
+        fname, ids, times, t_read = run_format(spk_format)
+        results[spk_format] = (ids, times)
+        print("{0}: {1} spikes read in {2:.3f}s".format(spk_format, len(ids),
+                                                       t_read))
+        if spk_format == 'bitmap':
+            data = np.fromfile(fname, dtype='<u4')
+            n_records = int(data[6:8].view('<u8')[0])
+            records = data[len(data) - 2 * n_records:].view('<u8')
+            is_bitmap = (data[records + 1] & SPK_BITMAP_FLAG) != 0
+            assert is_bitmap.any() and not is_bitmap.all(), \
+                "No bitmap and id list records"
+
+    ids, times = results['legacy']
+    assert len(ids) > sim_ticks, "Too few spikes"
+    for spk_format in ('compact', 'bitmap'):
+        assert np.array_equal(results[spk_format][0], ids), \
+            "{0} ids differ".format(spk_format)
+        assert np.array_equal(results[spk_format][1], times), \
+            "{0} times differ".format(spk_format)
+    print("Spike formats test passed")
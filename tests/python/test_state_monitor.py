@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: State monitor restricted to some state components, recorded
+#          every few time stamps, against a monitor of all the states at
+#          every time stamp.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+
+sim_ticks = 100             # Simulation time
+N_CORES = 1                 # Number of cores
+N_NEURONS = [2]             # Number of neurons per core
+N_INPUTS = [0]              # Number of inputes per core
+N_STATES = [4]              # Number of states per core
+
+
+def run_state_monitor(states_rec_mon=None, states_rec_stride=None):
+    # Constants
+    XMAX = nsat.XMAX
+    OFF = -16
+
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_states=True,
+                                 states_rec_mon=states_rec_mon,
+                                 states_rec_stride=states_rec_stride)
+
+    # Transition matrix
+    cfg.core_cfgs[0].A[0] = [[-1,  OFF, OFF, OFF],
+                             [OFF, OFF, OFF, OFF],
+                             [OFF, OFF, OFF, OFF],
+                             [OFF, OFF, OFF, OFF]]
+
+    # Sign matrix
+    cfg.core_cfgs[0].sA[0] = [[-1, 1, 1, 1],
+                              [1, 1, 1, 1],
+                              [1, 1, 1, 1],
+                              [1, 1, 1, 1]]
+
+    # Bias, every state follows its own course
+    cfg.core_cfgs[0].b[0] = np.array([50, 3, 7, 1], dtype='int')
+    # Threshold
+    cfg.core_cfgs[0].Xth[0] = 100
+    # Reset value
+    cfg.core_cfgs[0].Xreset[0] = np.array([0, XMAX, XMAX, XMAX], 'int')
+    # Turn reset on
+    cfg.core_cfgs[0].XresetOn[0] = np.array([True, False, False, False],
+                                            'bool')
+
+    # Mapping function between neurons and NSAT parameters groups
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+
+    # Write C NSAT parameters binary files
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_state_monitor')
+    c_nsat_writer.write()
+
+    # Call the C NSAT
+    print("Running C NSAT!")
+    nsat.run_c_nsat(c_nsat_writer.fname)
+
+    # Load the results (read binary files)
+    c_nsat_reader = nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+    states = c_nsat_reader.read_c_nsat_states()
+    return states[0][0][:, 0], states[0][1]
+
+
+if __name__ == '__main__':
+    # All the states at every time stamp: the initial states, then the
+    # states of every tick (sim_ticks rows, the last one is left empty)
+    time_all, states_all = run_state_monitor()
+    n_all = sim_ticks - 1
+    assert states_all.shape == (sim_ticks, N_NEURONS[0], N_STATES[0])
+    assert np.array_equal(time_all[1:n_all], np.arange(1, n_all)), \
+        "Missing time stamps"
+    # The states 1 to 3 integrate their bias
+    for k, b in zip((1, 2, 3), (3, 7, 1)):
+        assert np.all(states_all[:n_all, :, k] ==
+                      b * np.arange(n_all)[:, None]), "Wrong states"
+
+    # The states 0 and 2, every third time stamp
+    stride = 3
+    rec_mon = [0, 2]
+    time_sel, states_sel = run_state_monitor([rec_mon], [stride])
+    print("Recorded {0} time stamps of {1} state(s)".format(
+        states_sel.shape[0], states_sel.shape[2]))
+    ticks = np.arange(stride, sim_ticks, stride)
+    assert np.array_equal(time_sel, np.concatenate([[1], ticks])), \
+        "Time stamps do not follow the stride"
+    assert states_sel.shape == (len(ticks) + 1, N_NEURONS[0], len(rec_mon)), \
+        "Wrong states recorded"
+    assert np.array_equal(states_sel[0], states_all[0][:, rec_mon]), \
+        "Initial states differ"
+    common = ticks < n_all
+    assert np.array_equal(states_sel[1:][common],
+                          states_all[ticks[common]][:, :, rec_mon]), \
+        "Recorded states differ from the full monitor"
+    print("State monitor test passed")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The stopping rules (set_stopping_rule) end the inference samples
+#          at their decision, and the decision ticks are written only when
+#          a rule is set.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import os
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+t_sample = 300              # Duration of a sample
+n_samples = 10              # Number of samples
+N_CORES = 1                 # Number of cores
+N_NEURONS = [3]             # Number of neurons per core
+N_INPUTS = [16]             # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+def run_inference(lead=0, first_to=0):
+    rs = np.random.RandomState(0)
+    cfg = nsat.ConfigurationNSAT(sim_ticks=n_samples * t_sample,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES)
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[-3, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].sA[0] = [[-1, 1],
+                              [1, 1]]
+    cfg.core_cfgs[0].Xth[0] = 60
+    cfg.core_cfgs[0].t_ref[0] = 2
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[:N_INPUTS[0], N_INPUTS[0]:, 0] = rs.randint(0, 30, size=(N_INPUTS[0],
+                                                              N_NEURONS[0]))
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+
+    data = rs.uniform(size=(n_samples, N_INPUTS[0]))
+    schedule = nsat.stimuli.sample_schedule(np.arange(n_samples), t_sample)
+    cfg.set_ext_dataset(data, schedule, max_rate=200.)
+    cfg.set_inference(2)
+    if lead or first_to:
+        cfg.set_stopping_rule(lead=lead, first_to=first_to)
+
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_stopping_rules')
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    c_nsat_reader = nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+    return c_nsat_reader, schedule
+
+
+def check_decisions(counts, ref, ticks, schedule, decided):
+    '''
+    Checks the decision ticks and the spike counts of a stopping rule:
+    *decided*: True for the counts (sorted) of a decided sample
+    '''
+    counts = np.sort(counts, axis=1)[:, ::-1]
+    print("Decision ticks: {0}".format(ticks))
+    assert np.all(counts <= np.sort(ref, axis=1)[:, ::-1]), \
+        "More spikes with the stopping rule"
+    for c, r, t, (idx, start, duration) in zip(counts, ref, ticks, schedule):
+        if t == -1:
+            assert not decided(c), "Decided sample not stopped"
+            assert np.array_equal(c, np.sort(r)[::-1]), \
+                "Undecided sample stopped"
+        else:
+            assert start <= t < start + duration, "Decision out of the sample"
+            assert decided(c), "Undecided sample stopped"
+    assert np.any(ticks != -1) and np.any(ticks == -1), \
+        "Decided and undecided samples expected"
+
+
+if __name__ == '__main__':
+    # Without a rule, the samples run to their end
+    reader, schedule = run_inference()
+    ref = reader.read_spike_counts()
+    print("Spike counts:\n{0}".format(ref))
+
+    lead = 5
+    reader, schedule = run_inference(lead=lead)
+    check_decisions(reader.read_spike_counts(), ref,
+                    reader.read_decision_ticks(), schedule,
+                    lambda c: c[0] - c[1] == lead)
+
+    first_to = 60
+    reader, schedule = run_inference(first_to=first_to)
+    check_decisions(reader.read_spike_counts(), ref,
+                    reader.read_decision_ticks(), schedule,
+                    lambda c: c[0] == first_to)
+
+    # The decisions of a previous run are not left behind
+    reader, schedule = run_inference()
+    assert not os.path.exists(reader.fname.decisions), "Stale decisions"
+    try:
+        reader.read_decision_ticks()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Decision ticks read without a stopping rule")
+    print("Stopping rules test passed")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The dense and sparse readers of the synaptic weights return the
+#          weights used to build the ptr and wgt tables, for the tables
+#          written by the writer and for the final shared memory of all the
+#          cores, with and without shared weights.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 100             # Simulation time
+N_CORES = 2                 # Number of cores
+N_NEURONS = [5, 8]          # Number of neurons per core
+N_INPUTS = [6, 4]           # Number of inputes per core
+N_STATES = [2, 3]           # Number of states per core
+sharedW = [7, -9, 11]       # Shared weights of core 1
+
+
+def build_configuration(rs, monitor_weights_final):
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_weights_final=monitor_weights_final)
+    expected = []
+    for p in range(N_CORES):
+        n_units = N_INPUTS[p] + N_NEURONS[p]
+        cfg.core_cfgs[p].nmap = np.zeros((N_NEURONS[p],), dtype='int')
+        W = rs.randint(-20, 20, size=(n_units, n_units, N_STATES[p]))
+        CW = (rs.rand(*W.shape) < 0.3).astype('int')
+        # Only the neurons receive synapses
+        CW[:, :N_INPUTS[p]] = 0
+        # Connected synapses with a zero weight are kept
+        W[tuple(np.argwhere(CW)[::5].T)] = 0
+        Wexp = W * CW
+        if p == 1:
+            shared = rs.rand(*W.shape) < 0.1
+            shared[:, :N_INPUTS[p]] = False
+            CW[shared] = 2
+            W[shared] = rs.randint(len(sharedW), size=shared.sum())
+            Wexp[shared] = np.array(sharedW)[W[shared]]
+        wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(
+            W, CW, sharedW if p == 1 else [])
+        cfg.core_cfgs[p].wgt_table = wgt_table
+        cfg.core_cfgs[p].ptr_table = ptr_table
+        expected.append((Wexp, CW > 0))
+    # The inputs of the cores are dropped without external events
+    cfg.set_ext_events(np.array([[1, p, 0] for p in range(N_CORES)]))
+    return cfg, expected
+
+
+def check_weights(reader, expected, final):
+    Wd, CWd = reader.read_synaptic_weights(return_cw=True)
+    Ws = reader.read_synaptic_weights(sparse=True)
+    for p, (Wexp, CWexp) in enumerate(expected):
+        assert np.array_equal(Wd[p], Wexp), "Dense weights differ"
+        assert np.array_equal(CWd[p], CWexp), "Dense connections differ"
+        assert len(Ws[p]) == N_STATES[p], "One sparse matrix per state"
+        for k in range(N_STATES[p]):
+            assert np.array_equal(Ws[p][k].toarray(), Wexp[:, :, k]), \
+                "Sparse weights differ"
+            assert Ws[p][k].nnz == CWexp[:, :, k].sum(), \
+                "Connected zero weights are dropped"
+    if not final:
+        return
+    Wd = reader.read_c_nsat_synaptic_weights()
+    Ws = reader.read_c_nsat_synaptic_weights(sparse=True)
+    for p, (Wexp, CWexp) in enumerate(expected):
+        assert np.array_equal(Wd[p], Wexp), "Final dense weights differ"
+        for k in range(N_STATES[p]):
+            assert np.array_equal(Ws[p][k].toarray(), Wexp[:, :, k]), \
+                "Final sparse weights differ"
+
+
+if __name__ == '__main__':
+    rs = np.random.RandomState(0)
+    for final in [False, True]:
+        cfg, expected = build_configuration(rs, final)
+        c_nsat_writer = nsat.C_NSATWriter(
+            cfg, path='/tmp', prefix='test_synaptic_weights')
+        c_nsat_writer.write()
+        if final:
+            nsat.run_c_nsat(c_nsat_writer.fname)
+        c_nsat_reader = nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+        check_weights(c_nsat_reader, expected, final)
+        print("Weights (monitor_weights_final={0}): {1} synapses".format(
+            final, [CW.sum() for _, CW in expected]))
+    print("Synaptic weights test passed")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The trace of the ticks phases (set_trace) follows the stride and
+#          keeps the last phases of every core in a ring of the given size.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import os
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.global_vars import PROFILE_PHASES, TRACE_SIZE_MAX
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 500             # Simulation time
+N_CORES = 2                 # Number of cores
+N_NEURONS = [6, 6]          # Number of neurons per core
+N_INPUTS = [16, 16]         # Number of inputes per core
+N_STATES = [2, 2]           # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+def build_configuration(rates=True):
+    rs = np.random.RandomState(0)
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES)
+    OFF = -16
+    for p in range(N_CORES):
+        cfg.core_cfgs[p].A[0] = [[-3, OFF],
+                                 [OFF, OFF]]
+        cfg.core_cfgs[p].sA[0] = [[-1, 1],
+                                  [1, 1]]
+        cfg.core_cfgs[p].Xth[0] = 60
+        cfg.core_cfgs[p].nmap = np.zeros((N_NEURONS[p],), dtype='int')
+        W = np.zeros([N_UNITS, N_UNITS, N_STATES[p]], 'int')
+        W[:N_INPUTS[p], N_INPUTS[p]:, 0] = rs.randint(
+            1, 30, size=(N_INPUTS[p], N_NEURONS[p]))
+        CW = W.astype('bool')
+        wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+        cfg.core_cfgs[p].wgt_table = wgt_table
+        cfg.core_cfgs[p].ptr_table = ptr_table
+        if rates:
+            cfg.set_ext_rates(rs.uniform(20, 100, size=(1, N_INPUTS[p])),
+                              t_sample=sim_ticks, core=p)
+    return cfg
+
+
+def run(cfg):
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp', prefix='test_trace')
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    return nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+
+
+def phases_of_core(trace, core):
+    return [(e['args']['tick'], e['name']) for e in trace if e['tid'] == core]
+
+
+if __name__ == '__main__':
+    stride = 7
+    cfg = build_configuration()
+    cfg.set_trace(stride=stride)
+    trace = run(cfg).read_trace()
+    ticks = np.array([e['args']['tick'] for e in trace])
+    print("{0} phases, ticks {1}...".format(len(trace), np.unique(ticks)[:5]))
+    assert np.all(ticks % stride == 0), "Ticks do not follow the stride"
+    assert np.array_equal(np.unique(ticks),
+                          np.arange(stride, sim_ticks, stride)), \
+        "Traced ticks missing"
+    assert set(e['name'] for e in trace) <= set(PROFILE_PHASES), \
+        "Unknown phases"
+    assert all(e['dur'] >= 0 for e in trace), "Negative durations"
+    for p in range(N_CORES):
+        ts = [e['ts'] for e in trace if e['tid'] == p]
+        assert len(ts) > 0 and np.all(np.diff(ts) >= 0), \
+            "Phases of core {0} out of order".format(p)
+
+    # A ring of size phases keeps the last ones
+    size = 20
+    cfg = build_configuration()
+    cfg.set_trace(stride=stride, size=size)
+    ring = run(cfg).read_trace()
+    for p in range(N_CORES):
+        assert phases_of_core(ring, p) == phases_of_core(trace, p)[-size:], \
+            "Ring of core {0} does not hold the last phases".format(p)
+
+    # The size of the ring is bounded
+    try:
+        cfg.set_trace(stride=stride, size=TRACE_SIZE_MAX + 1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Unbounded trace size")
+
+    # The inference samples are not traced
+    cfg = build_configuration(rates=False)
+    for p in range(N_CORES):
+        cfg.set_ext_dataset(np.ones((2, N_INPUTS[p])),
+                            nsat.stimuli.sample_schedule([0, 1], 100), core=p)
+    cfg.set_inference(2)
+    cfg.set_trace(stride=stride)
+    reader = run(cfg)
+    assert not os.path.exists(reader.fname.trace), "Trace of inference"
+    try:
+        reader.read_trace()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Trace of inference read")
+    print("Trace test passed")
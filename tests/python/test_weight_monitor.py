@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The synaptic weights monitor records only the synapses selected
+#          by syn_ids_rec, and the last monitored weights are the final
+#          weights of the plastic synapses.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.nsat_reader import read_weight_records
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 400             # Simulation time
+N_CORES = 1                 # Number of cores
+N_NEURONS = [4]             # Number of neurons per core
+N_INPUTS = [6]              # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+# Ids below N_INPUTS select the synapses from the inputs to that neuron,
+# the others the synapses from the neurons to neuron id - N_INPUTS
+syn_ids_rec = [[0, 2, N_INPUTS[0] + 2]]
+
+
+if __name__ == '__main__':
+    rs = np.random.RandomState(0)
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_weights=True,
+                                 monitor_weights_final=True,
+                                 syn_ids_rec=syn_ids_rec,
+                                 plasticity_en=[True],
+                                 tstdpmax=[100])
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[-3, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].sA[0] = [[-1, 1],
+                              [1, 1]]
+    cfg.core_cfgs[0].Xth[0] = 40
+    cfg.core_cfgs[0].t_ref[0] = 2
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+    cfg.core_cfgs[0].plastic[0] = True
+    cfg.core_cfgs[0].stdp_en[0] = True
+    # The STDP updates are scaled by the (constant) state 1
+    cfg.core_cfgs[0].Xinit[0] = [0, 1]
+
+    # All the inputs and neurons project to all the other neurons
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[:, N_INPUTS[0]:, 0] = rs.randint(5, 25, size=(N_UNITS, N_NEURONS[0]))
+    W[np.arange(N_INPUTS[0], N_UNITS), np.arange(N_INPUTS[0], N_UNITS)] = 0
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+
+    t, a = np.nonzero(rs.rand(sim_ticks - 1, N_INPUTS[0]) < 0.1)
+    cfg.set_ext_events(np.column_stack([t + 1, np.zeros_like(t), a]))
+
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_weight_monitor')
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    c_nsat_reader = nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+    rec = read_weight_records(c_nsat_writer.fname.synw + b'_core_0.dat')
+    W_final = c_nsat_reader.read_synaptic_weights()[0]
+
+    # Only the selected synapses are recorded
+    inputs = rec['pre'] < N_INPUTS[0]
+    assert np.array_equal(np.unique(rec['post'][inputs]),
+                          N_INPUTS[0] + np.array([0, 2])), \
+        "Wrong synapses from the inputs"
+    assert np.array_equal(np.unique(rec['post'][~inputs]),
+                          N_INPUTS[0] + np.array([2])), \
+        "Wrong synapses from the neurons"
+    syn = np.unique(rec[['pre', 'post', 'state']])
+    ref = np.argwhere(CW)
+    ref = ref[((ref[:, 0] < N_INPUTS[0]) &
+               np.isin(ref[:, 1], N_INPUTS[0] + np.array([0, 2]))) |
+              ((ref[:, 0] >= N_INPUTS[0]) & (ref[:, 1] == N_INPUTS[0] + 2))]
+    assert len(syn) == len(ref), "Missing monitored synapses"
+    times = np.unique(rec['time'])
+    print("{0} monitored synapses, {1} snapshots".format(len(syn),
+                                                         len(times)))
+
+    # The weights of the last snapshot are the final weights
+    last = rec[rec['time'] == times[-1]]
+    assert len(last) == len(syn), "Incomplete last snapshot"
+    assert np.array_equal(last['value'],
+                          W_final[last['pre'], last['post'], last['state']]), \
+        "Monitored weights differ from the final weights"
+    changed = W_final[last['pre'], last['post'], last['state']] != \
+        W[last['pre'], last['post'], last['state']]
+    assert np.any(changed), "No weight updates of the monitored synapses"
+    for post in N_INPUTS[0] + np.array([0, 2]):
+        Wh = c_nsat_reader.read_synaptic_weights_history(post=post)[0]
+        pre = np.unique(rec['pre'][rec['post'] == post])
+        assert np.array_equal(Wh[times[-1] - 1][pre, 0],
+                              W_final[pre, post, 0]), \
+            "Weights history differs from the final weights"
+    print("Weight monitor test passed")
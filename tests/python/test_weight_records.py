@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: The synaptic weights monitor (monitor_weights=True) is read as
+#          record tables and as per post-synaptic neuron histories, which
+#          match a record by record reading of the monitor file.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.nsat_reader import read_from_file_weights, read_weight_records
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+sim_ticks = 300             # Simulation time
+N_CORES = 1                 # Number of cores
+N_NEURONS = [3]             # Number of neurons per core
+N_INPUTS = [4]              # Number of inputes per core
+N_STATES = [2]              # Number of states per core
+N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+
+if __name__ == '__main__':
+    rs = np.random.RandomState(0)
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES,
+                                 monitor_weights=True,
+                                 plasticity_en=[True],
+                                 tstdpmax=[100])
+    OFF = -16
+    cfg.core_cfgs[0].A[0] = [[-3, OFF],
+                             [OFF, OFF]]
+    cfg.core_cfgs[0].sA[0] = [[-1, 1],
+                              [1, 1]]
+    cfg.core_cfgs[0].Xth[0] = 40
+    cfg.core_cfgs[0].t_ref[0] = 2
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+    cfg.core_cfgs[0].plastic[0] = True
+    cfg.core_cfgs[0].stdp_en[0] = True
+    # The STDP updates are scaled by the (constant) state 1
+    cfg.core_cfgs[0].Xinit[0] = [0, 1]
+
+    # All the inputs project to all the neurons
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[:N_INPUTS[0], N_INPUTS[0]:, 0] = rs.randint(10, 30, size=(N_INPUTS[0],
+                                                               N_NEURONS[0]))
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+
+    t, a = np.nonzero(rs.rand(sim_ticks - 1, N_INPUTS[0]) < 0.1)
+    cfg.set_ext_events(np.column_stack([t + 1, np.zeros_like(t), a]))
+
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_weight_records')
+    c_nsat_writer.write()
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    c_nsat_reader = nsat.C_NSATReader(cfg, c_nsat_writer.fname)
+
+    # The record tables hold the fields of the monitor file
+    synw = c_nsat_writer.fname.synw + b'_core_0.dat'
+    ref = read_from_file_weights(synw).reshape(-1, 5)
+    rec = read_weight_records(synw)
+    print("{0} weight records".format(len(rec)))
+    assert len(rec) > 0, "No weight records"
+    for k, field in enumerate(('time', 'pre', 'post', 'state', 'value')):
+        assert np.array_equal(rec[field], ref[:, k]), \
+            "Wrong {0} field".format(field)
+    assert len(np.unique(rec['value'])) > 1, "No weight updates"
+
+    # The records of some post-synaptic neurons
+    posts = np.unique(rec['post'])
+    assert len(posts) == N_NEURONS[0], "Missing post-synaptic neurons"
+    sel = c_nsat_reader.read_synaptic_weights_records(post=posts[1:])[0]
+    assert np.array_equal(sel, rec[rec['post'] != posts[0]]), \
+        "Wrong records selected"
+    assert np.array_equal(c_nsat_reader.read_synaptic_weights_records()[0],
+                          rec), "Wrong records"
+
+    # The history of every post-synaptic neuron
+    W_all, P_all = c_nsat_reader.read_synaptic_weights_history_all()
+    assert np.array_equal(P_all[0], posts), "Wrong post-synaptic neurons"
+    for j, post in enumerate(posts):
+        Wp = np.zeros((sim_ticks, N_UNITS, N_STATES[0]), 'int')
+        for time, pre, post_, state, val in ref:
+            if post_ == post:
+                Wp[time, pre, state] = val
+        Wh = c_nsat_reader.read_synaptic_weights_history(post=post)[0]
+        assert np.array_equal(Wh, Wp[1:]), "Wrong weights history"
+        assert np.array_equal(W_all[0][:, :, j], Wp[1:]), \
+            "Wrong weights history (all posts)"
+    try:
+        c_nsat_reader.read_synaptic_weights_history()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Weights of all the posts merged")
+    print("Weight records test passed")
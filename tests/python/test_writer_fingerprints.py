@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# ---------------------------------------------------------------------------
+# Purpose: C_NSATWriter.write skips the unchanged sections, and writes
+#          again the files that were modified or truncated since.
+#
+# Copyright : (c)
+# Licence : GPLv2
+# ---------------------------------------------------------------------------
+import os
+import numpy as np
+import pyNSATlib as nsat
+from pyNSATlib.utils import gen_ptr_wgt_table_from_W_CW
+
+
+def read_bytes(fname):
+    with open(fname, 'rb') as f:
+        return f.read()
+
+
+if __name__ == '__main__':
+    sim_ticks = 100             # Simulation time
+    N_CORES = 1                 # Number of cores
+    N_NEURONS = [2]             # Number of neurons per core
+    N_INPUTS = [0]              # Number of inputes per core
+    N_STATES = [4]              # Number of states per core
+    N_UNITS = N_INPUTS[0] + N_NEURONS[0]
+
+    cfg = nsat.ConfigurationNSAT(sim_ticks=sim_ticks,
+                                 N_CORES=N_CORES,
+                                 N_INPUTS=N_INPUTS,
+                                 N_NEURONS=N_NEURONS,
+                                 N_STATES=N_STATES)
+    cfg.core_cfgs[0].b[0] = np.array([50, 0, 0, 0], dtype='int')
+    cfg.core_cfgs[0].Xth[0] = 100
+    cfg.core_cfgs[0].nmap = np.zeros((N_NEURONS[0],), dtype='int')
+    W = np.zeros([N_UNITS, N_UNITS, N_STATES[0]], 'int')
+    W[0, 1, 0] = 50
+    W[1, 0, 0] = 30
+    CW = W.astype('bool')
+    wgt_table, ptr_table = gen_ptr_wgt_table_from_W_CW(W, CW, [])
+    cfg.core_cfgs[0].wgt_table = wgt_table
+    cfg.core_cfgs[0].ptr_table = ptr_table
+
+    c_nsat_writer = nsat.C_NSATWriter(cfg, path='/tmp',
+                                      prefix='test_writer_fingerprints')
+    c_nsat_writer.write(force=True)
+    fname = c_nsat_writer.fname
+    params = fname.params
+    wgt_fname = fname.syn_wgt_table + b'_core_0.dat'
+    params_ref = read_bytes(params)
+    wgt_ref = read_bytes(wgt_fname)
+
+    # Unchanged sections are skipped
+    mtime = os.stat(params).st_mtime_ns
+    c_nsat_writer.write()
+    assert os.stat(params).st_mtime_ns == mtime, "Parameters written again"
+
+    # A truncated file is written again
+    open(params, 'wb').close()
+    c_nsat_writer.write()
+    assert read_bytes(params) == params_ref, "Truncated parameters reused"
+
+    # A file modified in place (same size) is written again
+    with open(wgt_fname, 'r+b') as f:
+        f.write(b'\xff' * 4)
+    c_nsat_writer.write()
+    assert read_bytes(wgt_fname) == wgt_ref, "Modified weights reused"
+
+    # Fingerprints of another writer version are ignored
+    with open(c_nsat_writer.fingerprints_fname, 'w') as f:
+        f.write('{"version": "0", "sections": {}}')
+    open(params, 'wb').close()
+    os.utime(params, ns=(mtime, mtime))
+    c_nsat_writer.write()
+    assert read_bytes(params) == params_ref, "Stale fingerprints used"
+
+    print("Running C NSAT!")
+    nsat.run_c_nsat(c_nsat_writer.fname)
+    print("Fingerprints test passed")